@@ -1,11 +1,32 @@
+import os
+
 from fastapi.templating import Jinja2Templates
 
-from app.services.theater import TheaterService
+from app.services.theater import CommandJournal, PricingPolicy, SharedSQLiteStore, SQLiteStore, TheaterService
+
+# Directory for the command journal and its snapshots; unset keeps state in memory only
+DATA_DIR_ENV = "THEATER_DATA_DIR"
+# SQLite database file for the theater state (optional, independent of the journal)
+DB_PATH_ENV = "THEATER_DB_PATH"
+# SQLite database shared by several worker processes (uvicorn --workers N); replaces the two above
+SHARED_DB_PATH_ENV = "THEATER_SHARED_DB"
+# "1" prices seats by sector occupancy and time to the show instead of the bound price
+DYNAMIC_PRICING_ENV = "THEATER_DYNAMIC_PRICING"
 
 
 class AppContainer:
     def __init__(self) -> None:
-        self._theater_service = TheaterService()
+        pricing = PricingPolicy() if os.environ.get(DYNAMIC_PRICING_ENV) == "1" else None
+        shared_db_path = os.environ.get(SHARED_DB_PATH_ENV)
+        if shared_db_path:
+            # The shared database is durable and ordered by itself, a per-process journal would diverge
+            self._theater_service = TheaterService(store=SharedSQLiteStore(shared_db_path), pricing=pricing)
+        else:
+            data_dir = os.environ.get(DATA_DIR_ENV)
+            journal = CommandJournal(data_dir) if data_dir else None
+            db_path = os.environ.get(DB_PATH_ENV)
+            store = SQLiteStore(db_path) if db_path else None
+            self._theater_service = TheaterService(journal=journal, store=store, pricing=pricing)
         self._templates = Jinja2Templates(directory="app/templates")
 
     @property
@@ -2,5 +2,10 @@ from app.container import container
 from app.services.theater import TheaterService
 
 
-def get_theater_service() -> TheaterService:
-    return container.theater_service
+async def get_theater_service() -> TheaterService:
+    service = container.theater_service
+    # With a shared store another worker may have changed the state since the last request.
+    # Sync runs on the event loop: handlers read the theater there without locks, so a
+    # catch-up on a worker thread could show them a half-replaced state
+    service.sync()
+    return service
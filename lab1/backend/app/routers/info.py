@@ -1,9 +1,15 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+import json
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from app.dependencies import get_theater_service
 from app.services.theater import TheaterService
+from app.services.theater.domain_imports import DEFAULT_PRICE_BAND_WIDTH
+from app.services.theater.helpers import ticket_view
 
 router = APIRouter(tags=["info"])
 
@@ -39,8 +45,68 @@ async def theater_performances(service: TheaterService = Depends(get_theater_ser
 
 
 @router.get("/info/tickets")
-async def theater_tickets(service: TheaterService = Depends(get_theater_service)):
-    return service.info_tickets()
+async def theater_tickets(
+    cursor: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    setting: str | None = Query(default=None),
+    hall_id: str | None = Query(default=None),
+    sold: bool | None = Query(default=None),
+    service: TheaterService = Depends(get_theater_service),
+):
+    return service.info_tickets(cursor, limit, setting, hall_id, sold)
+
+
+@router.get("/info/tickets/stream")
+async def theater_tickets_stream(
+    setting: str | None = Query(default=None),
+    hall_id: str | None = Query(default=None),
+    sold: bool | None = Query(default=None),
+    service: TheaterService = Depends(get_theater_service),
+):
+    def lines():
+        for _, ticket in service.iter_tickets_filtered(0, setting, hall_id, sold):
+            yield json.dumps(ticket_view(ticket), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/info/analytics")
+async def theater_analytics(
+    setting: str | None = Query(default=None),
+    hall_id: str | None = Query(default=None),
+    band_width: float = Query(default=DEFAULT_PRICE_BAND_WIDTH, gt=0),
+    service: TheaterService = Depends(get_theater_service),
+):
+    return service.info_analytics(setting, hall_id, band_width)
+
+
+@router.get("/info/analytics/groups")
+async def theater_analytics_groups(
+    by: list[str] = Query(min_length=1),
+    setting: str | None = Query(default=None),
+    hall_id: str | None = Query(default=None),
+    band_width: float = Query(default=DEFAULT_PRICE_BAND_WIDTH, gt=0),
+    service: TheaterService = Depends(get_theater_service),
+):
+    try:
+        return service.info_analytics_groups(by, setting, hall_id, band_width)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.get("/info/schedule/conflicts")
+async def theater_schedule_conflicts(service: TheaterService = Depends(get_theater_service)):
+    return service.schedule_conflicts()
+
+
+@router.get("/info/schedule/rehearsals")
+async def theater_rehearsal_plan(
+    count: int = Query(default=3, ge=1, le=50),
+    hours: float = Query(default=3.0, gt=0, le=12),
+    not_before: datetime | None = Query(default=None),
+    service: TheaterService = Depends(get_theater_service),
+):
+    return service.propose_rehearsals(count, hours, not_before)
 
 
 @router.get("/info/resources")
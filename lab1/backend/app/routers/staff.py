@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, Form, Request
+from starlette.concurrency import run_in_threadpool
 
 from app.dependencies import get_theater_service
 from app.services.theater import TheaterService
@@ -165,11 +166,19 @@ async def save_state(
     return render_staff_dashboard(request, service, result.message, not result.ok)
 
 
+@router.get("/state/save/status")
+async def save_status(service: TheaterService = Depends(get_theater_service)):
+    return service.save_status()
+
+
 @router.post("/state/load")
 async def load_state(
     request: Request,
     path: str = Form(...),
     service: TheaterService = Depends(get_theater_service),
 ):
-    result = service.load_state(path)
+    # Parsing a large file must not block the event loop. The swap itself stays on the loop:
+    # handlers run there one at a time, so none of them sees a half-replaced state
+    read = await run_in_threadpool(service.read_state, path)
+    result = service.replace_state(read.payload, path) if read.ok else read
     return render_staff_dashboard(request, service, result.message, not result.ok)
@@ -1,13 +1,27 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Form, Query, Request
+import asyncio
+import json
+from typing import Any, AsyncIterator
+
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
 
 from app.dependencies import get_theater_service
 from app.services.theater import TheaterService
+from app.services.theater.helpers import ticket_view
 from app.web.renderers import render_user_catalog, render_user_hall
 
 router = APIRouter(tags=["user"])
 
+SSE_KEEPALIVE_SECONDS = 15.0
+SSE_SYNC_SECONDS = 1.0
+
+
+class BatchPurchaseRequest(BaseModel):
+    ticket_ids: list[str]
+
 
 @router.get("/tickets")
 async def user_tickets_catalog(request: Request, service: TheaterService = Depends(get_theater_service)):
@@ -21,7 +35,22 @@ async def user_setting_hall(
     hall_id: str | None = Query(default=None),
     service: TheaterService = Depends(get_theater_service),
 ):
-    return render_user_hall(request, service, setting_idx, hall_id)
+    etag = service.user_setting_hall_etag(setting_idx, hall_id)
+    if etag is not None and _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response = render_user_hall(request, service, setting_idx, hall_id)
+    if etag is not None and response.status_code == 200:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison (RFC 9110): the W/ prefix is ignored on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
 
 
 @router.post("/tickets/purchase")
@@ -34,3 +63,136 @@ async def user_purchase_ticket(
 ):
     result = service.sell_ticket(ticket_id)
     return render_user_hall(request, service, setting_idx, hall_id, result.message, not result.ok)
+
+
+@router.get("/api/tickets/setting/{setting_idx}/best")
+async def api_best_seats(
+    setting_idx: int,
+    hall_id: str = Query(...),
+    count: int = Query(default=1, ge=1),
+    max_price: float | None = Query(default=None),
+    service: TheaterService = Depends(get_theater_service),
+):
+    return {"tickets": service.find_best_seats(setting_idx, hall_id, count, max_price)}
+
+
+@router.get("/api/tickets/setting/{setting_idx}/seats")
+async def api_seat_status(
+    setting_idx: int,
+    hall_id: str | None = Query(default=None),
+    since: int | None = Query(default=None, ge=0),
+    service: TheaterService = Depends(get_theater_service),
+):
+    view = service.seat_status_view(setting_idx, hall_id, since)
+    if view is None:
+        raise HTTPException(status_code=404, detail="Постановка или зал не найдены")
+    return view
+
+
+@router.get("/api/tickets/setting/{setting_idx}/events")
+async def api_seat_events(
+    request: Request,
+    setting_idx: int,
+    hall_id: str | None = Query(default=None),
+    service: TheaterService = Depends(get_theater_service),
+):
+    """Server-Sent Events stream of seat state changes of one hall."""
+    view = service.seat_status_view(setting_idx, hall_id)
+    if view is None:
+        raise HTTPException(status_code=404, detail="Постановка или зал не найдены")
+    key = (service.settings[setting_idx].name, view["hall_id"])
+    # Subscribing before reading the version means no change falls between the two
+    subscription = service.events.subscribe(key)
+    hello = service.seat_status_view(setting_idx, view["hall_id"], view["version"])
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            yield _sse_event("hello", {"version": hello["version"], "available_count": hello["available_count"]})
+            idle = 0.0
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.get(), SSE_SYNC_SECONDS)
+                except asyncio.TimeoutError:
+                    # Sales made by other workers reach this one's listeners only through sync,
+                    # which changes the theater and so stays on the event loop
+                    service.sync()
+                    idle += SSE_SYNC_SECONDS
+                    if idle >= SSE_KEEPALIVE_SECONDS:
+                        idle = 0.0
+                        yield ": keepalive\n\n"
+                    continue
+                idle = 0.0
+                yield _sse_event(event["type"], event)
+        finally:
+            service.events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse_event(name: str, data: dict[str, Any]) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/tickets/purchase/batch")
+async def user_purchase_tickets(
+    request: Request,
+    setting_idx: int = Form(...),
+    hall_id: str = Form(...),
+    ticket_ids: list[str] = Form([]),
+    service: TheaterService = Depends(get_theater_service),
+):
+    result = service.sell_tickets(ticket_ids)
+    return render_user_hall(request, service, setting_idx, hall_id, result.message, not result.ok)
+
+
+@router.post("/api/tickets/purchase")
+async def api_purchase_tickets(
+    payload: BatchPurchaseRequest,
+    service: TheaterService = Depends(get_theater_service),
+):
+    result = service.sell_tickets(payload.ticket_ids)
+    return {
+        "ok": result.ok,
+        "message": result.message,
+        "tickets": [ticket_view(ticket) for ticket in result.payload or []],
+    }
+
+
+@router.post("/tickets/hold")
+async def user_hold_tickets(
+    request: Request,
+    setting_idx: int = Form(...),
+    hall_id: str = Form(...),
+    ticket_ids: list[str] = Form([]),
+    service: TheaterService = Depends(get_theater_service),
+):
+    result = service.hold_tickets(ticket_ids)
+    return render_user_hall(request, service, setting_idx, hall_id, result.message, not result.ok, result.payload)
+
+
+@router.post("/tickets/hold/confirm")
+async def user_confirm_hold(
+    request: Request,
+    setting_idx: int = Form(...),
+    hall_id: str = Form(...),
+    hold_id: str = Form(...),
+    service: TheaterService = Depends(get_theater_service),
+):
+    result = service.confirm_hold(hold_id)
+    return render_user_hall(request, service, setting_idx, hall_id, result.message, not result.ok)
+
+
+@router.post("/tickets/hold/release")
+async def user_release_hold(
+    request: Request,
+    setting_idx: int = Form(...),
+    hall_id: str = Form(...),
+    hold_id: str = Form(...),
+    service: TheaterService = Depends(get_theater_service),
+):
+    result = service.release_hold(hold_id)
+    return render_user_hall(request, service, setting_idx, hall_id, result.message, not result.ok)
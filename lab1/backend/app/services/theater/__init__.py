@@ -1,4 +1,7 @@
 from app.services.theater.base import OperationResult
+from app.services.theater.domain_imports import PricingPolicy
+from app.services.theater.journal import CommandJournal
 from app.services.theater.service import TheaterService
+from app.services.theater.store import SharedSQLiteStore, SQLiteStore
 
-__all__ = ["OperationResult", "TheaterService"]
+__all__ = ["CommandJournal", "OperationResult", "PricingPolicy", "SharedSQLiteStore", "SQLiteStore", "TheaterService"]
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from typing import Any
 
 from app.services.theater.domain_imports import Actor, AuditoryHall, Director, Repetition, Setting
 
@@ -9,16 +10,17 @@ from app.services.theater.domain_imports import Actor, AuditoryHall, Director, R
 class OperationResult:
     ok: bool
     message: str
+    payload: Any = None
 
 
 class TheaterBaseMixin:
     @property
     def actors(self) -> list[Actor]:
-        return [staff for staff in self._theater.staff_manager.staff if isinstance(staff, Actor)]
+        return self._theater.staff_manager.actors
 
     @property
     def directors(self) -> list[Director]:
-        return [staff for staff in self._theater.staff_manager.staff if isinstance(staff, Director)]
+        return self._theater.staff_manager.directors
 
     @property
     def settings(self) -> list[Setting]:
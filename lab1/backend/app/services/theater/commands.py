@@ -1,104 +1,251 @@
 from __future__ import annotations
 
+from contextlib import nullcontext
 from datetime import datetime
+from typing import Any
 
 from app.services.theater.base import OperationResult
-from app.services.theater.domain_imports import Actor, AuditoryHall, Director, Repetition, Setting, TheaterException
+from app.services.theater.domain_imports import Actor, AuditoryHall, Director, Repetition, Setting, Theater, TheaterException
+from app.services.theater.journal import journaled
+
+HOLD_TTL_SECONDS = 300
+CONFLICTS_IN_MESSAGE = 5
+
+
+def _with_conflicts(message: str, conflicts: list[Any]) -> str:
+    """Appends schedule overlaps to a command message; they are reported, not rejected."""
+    if not conflicts:
+        return message
+    overlaps = "; ".join(
+        f"{c.other.name} ({c.other.date:%Y-%m-%d %H:%M}): "
+        f"{'зал ' + c.resource[1] if c.resource[0] == 'hall' else c.resource[1]}"
+        for c in conflicts[:CONFLICTS_IN_MESSAGE]
+    )
+    more = f" и ещё {len(conflicts) - CONFLICTS_IN_MESSAGE}" if len(conflicts) > CONFLICTS_IN_MESSAGE else ""
+    return f"{message} Пересечения в расписании: {overlaps}{more}."
+
+
+def _batch_sale_record(tickets: list[Any], hold_id: str | None) -> dict[str, Any]:
+    record: dict[str, Any] = {
+        "ticket_ids": [t.ticket_id for t in tickets],
+        "prices": {t.ticket_id: t.price for t in tickets},
+    }
+    if hold_id is not None:
+        record["hold_id"] = hold_id
+    return record
 
 
 class TheaterCommandsMixin:
+    @journaled
     def rename_theater(self, new_name: str) -> OperationResult:
         if not new_name.strip():
             return OperationResult(False, "Название не может быть пустым.")
         self._theater.name = new_name.strip()
         return OperationResult(True, "Название театра обновлено.")
 
+    @journaled
     def add_hall(self, name: str, sectors: int, rows: int, seats: int, hall_id: str) -> OperationResult:
         hall = AuditoryHall(name.strip(), sectors, rows, seats, hall_id.strip())
         self._theater.add_hall(hall)
         return OperationResult(True, f"Зал '{name}' добавлен.")
 
+    @journaled
     def add_actor(self, name: str, age: int, salary: float, role: str | None) -> OperationResult:
         actor = Actor(name.strip(), age, salary, role.strip() if role else None)
         self._theater.add_staff(actor)
         return OperationResult(True, f"Актер '{name}' добавлен.")
 
+    @journaled
     def add_director(self, name: str, age: int, salary: float) -> OperationResult:
         director = Director(name.strip(), age, salary)
         self._theater.add_staff(director)
         return OperationResult(True, f"Режиссер '{name}' добавлен.")
 
+    @journaled
     def add_setting(self, name: str, durability: float, date: str, director_name: str) -> OperationResult:
-        director = next((d for d in self.directors if d.name == director_name), None)
+        director = self._theater.staff_manager.get_director(director_name)
         if not director:
             return OperationResult(False, "Режиссер не найден.")
         setting = Setting(durability, name.strip(), datetime.fromisoformat(date), director)
-        self._theater.add_setting(setting)
-        return OperationResult(True, f"Постановка '{name}' добавлена.")
+        conflicts = self._theater.add_setting(setting)
+        return OperationResult(True, _with_conflicts(f"Постановка '{name}' добавлена.", conflicts), conflicts)
 
+    @journaled
     def create_costume(self, name: str, size: str, color: str) -> OperationResult:
         self._theater.create_costume(name.strip(), size.strip().upper(), color.strip())
         return OperationResult(True, f"Костюм '{name}' создан.")
 
-    def bind_setting_to_hall(self, setting_name: str, hall_id: str, base_price: float) -> OperationResult:
-        tickets = self._theater.bind_setting_to_hall(setting_name, hall_id, base_price)
-        return OperationResult(True, f"Создано {len(tickets)} билетов.")
+    # Ticket ids come from a process-wide counter, so replay pins the range that was issued
+    @journaled(record=lambda result, args: ("bind_setting_to_hall", {**args, "first_id": result.payload.first_id}))
+    def bind_setting_to_hall(
+        self, setting_name: str, hall_id: str, base_price: float, first_id: int | None = None
+    ) -> OperationResult:
+        tickets = self._theater.bind_setting_to_hall(setting_name, hall_id, base_price, lazy=True, first_id=first_id)
+        self._stats.record_bind(tickets)
+        return OperationResult(True, f"Создано {len(tickets)} билетов.", tickets)
 
+    @journaled
     def add_actor_to_setting(self, actor_name: str, setting_name: str) -> OperationResult:
-        actor = next((a for a in self.actors if a.name == actor_name), None)
-        setting = next((s for s in self.settings if s.name == setting_name), None)
+        actor = self._theater.staff_manager.get_actor(actor_name)
+        setting = self._theater.performance_manager.get_setting(setting_name)
         if not actor or not setting:
             return OperationResult(False, "Актер или постановка не найдены.")
-        setting.add_cast(actor)
-        return OperationResult(True, f"Актер '{actor.name}' добавлен в '{setting.name}'.")
+        conflicts = self._theater.add_actor_to_setting(actor, setting)
+        message = f"Актер '{actor.name}' добавлен в '{setting.name}'."
+        return OperationResult(True, _with_conflicts(message, conflicts), conflicts)
 
+    @journaled
     def assign_costume_to_actor(self, costume_name: str, actor_name: str) -> OperationResult:
-        actor = next((a for a in self.actors if a.name == actor_name), None)
-        costume = next((c for c in self._theater.resource_manager.costumes if c.name == costume_name), None)
+        actor = self._theater.staff_manager.get_actor(actor_name)
+        costume = self._theater.resource_manager.get_costume(costume_name)
         if not actor or not costume:
             return OperationResult(False, "Актер или костюм не найдены.")
         self._theater.assign_costume_to_actor(costume, actor)
         return OperationResult(True, f"Костюм '{costume_name}' назначен актеру '{actor_name}'.")
 
+    @journaled
     def add_repetition(self, setting_name: str, date: str, durability: float) -> OperationResult:
-        setting = next((s for s in self.settings if s.name == setting_name), None)
+        setting = self._theater.performance_manager.get_setting(setting_name)
         if not setting:
             return OperationResult(False, "Постановка не найдена.")
         repetition = Repetition(durability, f"Репетиция: {setting.name}", datetime.fromisoformat(date), setting)
-        self._theater.add_repetition(repetition)
-        return OperationResult(True, "Репетиция добавлена.")
+        conflicts = self._theater.add_repetition(repetition)
+        return OperationResult(True, _with_conflicts("Репетиция добавлена.", conflicts), conflicts)
 
+    @journaled
     def mark_actors_at_repetition(self, repetition_name: str, actor_names: list[str]) -> OperationResult:
-        repetition = next((rep for rep in self.repetitions if rep.name == repetition_name), None)
+        repetition = self._theater.performance_manager.get_repetition(repetition_name)
         if not repetition:
             return OperationResult(False, "Репетиция не найдена.")
 
-        actors_map = {actor.name: actor for actor in self.actors}
+        staff_manager = self._theater.staff_manager
         added = 0
+        conflicts = []
         for name in actor_names:
-            actor = actors_map.get(name)
+            actor = staff_manager.get_actor(name)
             if actor and actor not in repetition.attendance_list:
-                repetition.check_list(actor)
+                conflicts += self._theater.mark_attendance(repetition, actor)
                 added += 1
-        return OperationResult(True, f"Отмечено актеров: {added}.")
+        return OperationResult(True, _with_conflicts(f"Отмечено актеров: {added}.", conflicts), conflicts)
 
-    def sell_ticket(self, ticket_id: str) -> OperationResult:
+    # With dynamic pricing the charged price depends on the moment of sale, so it is recorded
+    @journaled(record=lambda result, args: ("sell_ticket", {**args, "price": result.payload.price}))
+    def sell_ticket(self, ticket_id: str, price: float | None = None) -> OperationResult:
         try:
+            prices = {ticket_id: price} if price is not None else self._live_prices([ticket_id])
             self._theater.sell_ticket(ticket_id)
-            return OperationResult(True, f"Билет #{ticket_id} продан.")
+            ticket = self._charge([self._theater.ticket_manager.get_ticket(ticket_id)], prices)[0]
+            return OperationResult(True, f"Билет #{ticket_id} продан.", ticket)
+        except TheaterException as exc:
+            return OperationResult(False, str(exc))
+
+    # Holds are not journaled, but a shared store hands them to the other workers
+    def hold_tickets(self, ticket_ids: list[str], ttl: float = HOLD_TTL_SECONDS) -> OperationResult:
+        store = self._store
+        with store.command(self) if store is not None else nullcontext():
+            try:
+                hold_id = store.next_hold_id() if store is not None else None
+                hold = self._theater.hold_tickets(ticket_ids, ttl, hold_id)
+            except TheaterException as exc:
+                return OperationResult(False, str(exc))
+            if store is not None:
+                store.record_hold(hold, ttl)
+        return OperationResult(True, f"Удержано мест: {len(hold.tickets)}. Бронь №{hold.hold_id}.", hold)
+
+    @journaled(record=lambda result, args: ("sell_tickets", _batch_sale_record(result.payload, args["hold_id"])))
+    def sell_tickets(
+        self, ticket_ids: list[str], prices: dict[str, float] | None = None, hold_id: str | None = None
+    ) -> OperationResult:
+        if not ticket_ids:
+            return OperationResult(False, "Не выбрано ни одного билета.")
+        try:
+            prices = prices if prices is not None else self._live_prices(ticket_ids)
+            tickets = self._theater.sell_tickets(ticket_ids, hold_id)
+        except TheaterException as exc:
+            return OperationResult(False, f"Покупка отменена: {exc}")
+        return OperationResult(True, f"Куплено билетов: {len(tickets)}.", self._charge(tickets, prices))
+
+    # On replay the confirmed purchase is a batch sale; the hold id lets a shared store match its hold
+    @journaled(record=lambda result, args: ("sell_tickets", _batch_sale_record(result.payload, args["hold_id"])))
+    def confirm_hold(self, hold_id: str) -> OperationResult:
+        hold = self._theater.ticket_manager.holds.get(hold_id)
+        prices = self._live_prices(hold.ticket_ids) if hold is not None else None
+        try:
+            tickets = self._theater.confirm_hold(hold_id)
         except TheaterException as exc:
+            if hold is not None and self._store is not None:
+                # The failed purchase released the hold, so other workers free its seats too
+                self._store.record_release(hold_id)
             return OperationResult(False, str(exc))
+        return OperationResult(True, f"Куплено билетов: {len(tickets)}.", self._charge(tickets, prices))
+
+    def _live_prices(self, ticket_ids: list[str]) -> dict[str, float] | None:
+        """Dynamic prices quoted before the sale changes occupancy; None keeps the bound prices."""
+        if self._pricer is None:
+            return None
+        ticket_manager = self._theater.ticket_manager
+        hall_manager = self._theater.resource_manager.hall_manager
+        prices = {}
+        for ticket_id in ticket_ids:
+            ticket = ticket_manager.get_ticket(ticket_id)
+            if ticket is None or ticket.setting is None:
+                continue
+            partition = ticket_manager.get_partition(ticket.setting.name, ticket.hall_id)
+            hall = hall_manager.get_hall_by_id(ticket.hall_id)
+            prices[ticket_id] = self._pricer.quote(ticket, ticket.setting, hall, partition)
+        return prices
+
+    def _charge(self, tickets: list[Any], prices: dict[str, float] | None) -> list[Any]:
+        # A sold ticket no longer counts towards available prices, so its price can change now;
+        # the change goes through the hall lock so analytics never caches a half-charged sale
+        ticket_manager = self._theater.ticket_manager
+        for ticket in tickets:
+            if prices and ticket.ticket_id in prices:
+                ticket_manager.set_sold_price(ticket, prices[ticket.ticket_id])
+            self._stats.record_sale(ticket)
+        return tickets
+
+    def release_hold(self, hold_id: str) -> OperationResult:
+        store = self._store
+        with store.command(self) if store is not None else nullcontext():
+            if not self._theater.release_hold(hold_id):
+                return OperationResult(False, "Бронь не найдена или уже истекла.")
+            if store is not None:
+                store.record_release(hold_id)
+        return OperationResult(True, "Бронь отменена.")
 
     def save_state(self, path: str) -> OperationResult:
         try:
-            self._theater.save_to_file(path)
-            return OperationResult(True, f"Сохранено в: {path}")
+            self._saver.submit(self._theater, path)
+            return OperationResult(True, f"Сохранение запущено в фоне: {path}")
         except Exception as exc:  # noqa: BLE001
             return OperationResult(False, f"Ошибка сохранения: {exc}")
 
     def load_state(self, path: str) -> OperationResult:
+        read = self.read_state(path)
+        return self.replace_state(read.payload, path) if read.ok else read
+
+    def read_state(self, path: str) -> OperationResult:
+        """Parses a saved state into a new theater; the current one is untouched, so it may run off the loop."""
+        try:
+            # A save still being written may target the same file
+            self._saver.wait()
+            return OperationResult(True, f"Прочитано из: {path}", Theater.read_file(path))
+        except Exception as exc:  # noqa: BLE001
+            return OperationResult(False, f"Ошибка загрузки: {exc}")
+
+    def replace_state(self, loaded: Theater, path: str) -> OperationResult:
+        """Swaps in a state returned by ``read_state``; no other command may run meanwhile."""
         try:
-            self._theater.load_from_file(path)
+            # The command bracket of a shared store keeps its catch-up and other workers' commands out
+            with self._store.command(self) if self._store is not None else nullcontext():
+                self._theater.replace_state(loaded)
+                self.state_replaced()
+                if self._journal is not None:
+                    # The loaded file replaces the state, so the journal restarts from it
+                    self._journal.compact(self._theater)
+                if self._store is not None:
+                    self._store.replace(self._theater)
             return OperationResult(True, f"Загружено из: {path}")
         except Exception as exc:  # noqa: BLE001
             return OperationResult(False, f"Ошибка загрузки: {exc}")
@@ -10,17 +10,34 @@ if str(SRC_PATH) not in sys.path:
     sys.path.insert(0, str(SRC_PATH))
 
 from actions import Repetition, Setting
+from analytics import DEFAULT_BAND_WIDTH as DEFAULT_PRICE_BAND_WIDTH, DIMENSIONS as ANALYTICS_DIMENSIONS, TicketAnalytics
 from exception import TheaterException
 from halls import AuditoryHall
+from pricing import DynamicPricer, PricingPolicy
+from repository import SQLiteTheaterRepository
+from scheduling import plan_rehearsals
+from seat_status import seat_state
+from snapshot import backend_for_path, dump_snapshot, write_snapshot
 from staff import Actor, Director
 from theater import Theater
 
 __all__ = [
+    "ANALYTICS_DIMENSIONS",
+    "DEFAULT_PRICE_BAND_WIDTH",
     "Actor",
     "AuditoryHall",
     "Director",
+    "DynamicPricer",
+    "PricingPolicy",
     "Repetition",
     "Setting",
+    "SQLiteTheaterRepository",
+    "TicketAnalytics",
     "Theater",
     "TheaterException",
+    "backend_for_path",
+    "dump_snapshot",
+    "plan_rehearsals",
+    "seat_state",
+    "write_snapshot",
 ]
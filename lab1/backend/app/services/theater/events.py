@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Hashable
+
+SUBSCRIBER_QUEUE_SIZE = 256
+RESYNC_EVENT: dict[str, Any] = {"type": "resync"}
+
+
+class Subscription:
+    """One subscriber's bounded event queue, fed from any thread through its event loop.
+
+    When the queue is full its backlog is replaced with a single ``resync`` event:
+    the client refetches the seat map instead of the server buffering an unbounded
+    backlog for a slow reader.
+    """
+
+    def __init__(self, key: Hashable, loop: asyncio.AbstractEventLoop, maxsize: int) -> None:
+        self.key = key
+        self.dropped = 0
+        self._loop = loop
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, event: dict[str, Any]) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's event loop is already closed
+            pass
+
+    def _put(self, event: dict[str, Any]) -> None:
+        if self._queue.full():
+            self.dropped += self._queue.qsize()
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            event = RESYNC_EVENT
+        self._queue.put_nowait(event)
+
+    async def get(self) -> dict[str, Any]:
+        return await self._queue.get()
+
+
+class EventBus:
+    """In-process publish/subscribe keyed by topic, e.g. ``(setting name, hall id)``.
+
+    ``publish`` may run on any thread (commands execute in the threadpool under a
+    hall lock), so it only hands events over to the subscribers' event loops.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE) -> None:
+        self._queue_size = queue_size
+        self._subscribers: dict[Hashable, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key: Hashable) -> Subscription:
+        """Registers a subscriber on the running event loop."""
+        subscription = Subscription(key, asyncio.get_running_loop(), self._queue_size)
+        with self._lock:
+            self._subscribers.setdefault(key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.key]
+
+    def has_subscribers(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._subscribers
+
+    def publish(self, key: Hashable, event: dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    def publish_all(self, event: dict[str, Any]) -> None:
+        """Sends one event to every subscriber, e.g. ``resync`` after the whole state was replaced."""
+        with self._lock:
+            subscribers = [s for subscribers in self._subscribers.values() for s in subscribers]
+        for subscription in subscribers:
+            subscription.offer(event)
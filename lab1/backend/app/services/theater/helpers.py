@@ -2,12 +2,24 @@ from __future__ import annotations
 
 from typing import Any
 
+from app.services.theater.domain_imports import seat_state
 
-def tickets_for_setting(all_tickets: list[Any], setting_name: str) -> list[Any]:
-    return [ticket for ticket in all_tickets if ticket.setting and ticket.setting.name == setting_name]
 
+def ticket_view(ticket: Any) -> dict[str, Any]:
+    return {
+        "ticket_id": ticket.ticket_id,
+        "setting": ticket.setting.name if ticket.setting else None,
+        "hall_id": ticket.hall_id,
+        "sector": ticket.sector,
+        "row": ticket.row,
+        "seat": ticket.seat,
+        "price": ticket.price,
+        "is_sold": ticket.is_sold,
+    }
 
-def build_hall_sectors_view(hall: Any, hall_tickets: list[Any]) -> list[dict[str, Any]]:
+
+def build_hall_sectors_view(hall: Any, hall_tickets: list[Any], prices: Any | None = None) -> list[dict[str, Any]]:
+    """Seat grid of a hall; ``prices`` (sector, row, seat array) overrides prices of seats still on sale."""
     ticket_map = {(ticket.sector, ticket.row, ticket.seat): ticket for ticket in hall_tickets}
     sectors: list[dict[str, Any]] = []
 
@@ -31,15 +43,20 @@ def build_hall_sectors_view(hall: Any, hall_tickets: list[Any]) -> list[dict[str
                     )
                     continue
 
+                status = seat_state(ticket)
+                price = ticket.price
+                if prices is not None and status == "available":
+                    price = float(prices[sector_idx, row_idx, seat_idx])
                 seats.append(
                     {
                         "exists": True,
+                        "index": (sector_idx * hall.rows_per_sector + row_idx) * hall.seats_per_row + seat_idx,
                         "ticket_id": ticket.ticket_id,
                         "seat_label": seat_idx + 1,
                         "row_label": row_idx + 1,
                         "sector_label": sector_idx + 1,
-                        "price": ticket.price,
-                        "status": "sold" if ticket.is_sold else "available",
+                        "price": price,
+                        "status": status,
                     }
                 )
 
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from app.services.theater.base import OperationResult
+from app.services.theater.domain_imports import Theater
+from app.services.theater.store import StoreConflictError
+
+SNAPSHOT_PATTERN = re.compile(r"^snapshot-(\d+)\.tsnap$")
+COMPACT_EVERY = 1000
+
+
+class CommandJournal:
+    """Append-only log of service commands plus the snapshot it is compacted into.
+
+    The data directory holds ``snapshot-<seq>.tsnap`` (state after record ``seq``)
+    and ``journal.ndjson`` with one ``{"seq", "cmd", "args"}`` line per command.
+    Records at or below the snapshot's seq are skipped on replay, so a crash in the
+    middle of compaction never applies a command twice. Commands run inside
+    ``command()``; compaction waits until none is between applying and recording.
+    """
+
+    def __init__(self, directory: str | Path, compact_every: int = COMPACT_EVERY, fsync: bool = True) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.journal_path = self.directory / "journal.ndjson"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.seq = 0
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._gate = threading.Condition()
+        self._active = 0
+        self._compacting = False
+
+    def latest_snapshot(self) -> tuple[int, Path | None]:
+        best: tuple[int, Path | None] = (0, None)
+        for path in self.directory.iterdir():
+            match = SNAPSHOT_PATTERN.match(path.name)
+            if match and int(match.group(1)) >= best[0]:
+                best = (int(match.group(1)), path)
+        return best
+
+    def is_empty(self) -> bool:
+        """True for a new data directory: no snapshot and no journal records yet."""
+        if self.latest_snapshot()[1] is not None:
+            return False
+        return not self.journal_path.exists() or self.journal_path.stat().st_size == 0
+
+    def restore(self, theater: Theater) -> list[tuple[str, dict[str, Any]]]:
+        """Loads the latest snapshot into ``theater`` and returns the journal tail to replay."""
+        snapshot_seq, snapshot_path = self.latest_snapshot()
+        if snapshot_path is not None:
+            theater.load_from_file(str(snapshot_path))
+        self.seq = snapshot_seq
+        tail = []
+        for seq, command, args in self._read_records():
+            if seq > snapshot_seq:
+                self.seq = seq
+                tail.append((command, args))
+        self.pending = len(tail)
+        return tail
+
+    def _read_records(self) -> Iterator[tuple[int, str, dict[str, Any]]]:
+        if not self.journal_path.exists():
+            return
+        good_offset = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                good_offset += len(line)
+                yield record["seq"], record["cmd"], record["args"]
+        # A torn last record (crash mid-append) is cut off so new records follow valid ones
+        if good_offset < self.journal_path.stat().st_size:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good_offset)
+
+    @property
+    def due(self) -> bool:
+        return self.pending >= self.compact_every
+
+    @contextmanager
+    def command(self):
+        """Brackets applying a command and appending its record."""
+        with self._gate:
+            while self._compacting:
+                self._gate.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._gate:
+                self._active -= 1
+                self._gate.notify_all()
+
+    def append(self, command: str, args: dict[str, Any]) -> int:
+        """Durably appends one record; returns the number of records since the last snapshot."""
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.journal_path, "ab")
+            self.seq += 1
+            record = {"seq": self.seq, "cmd": command, "args": args}
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.pending += 1
+            return self.pending
+
+    def compact(self, theater: Theater) -> Path:
+        """Writes the current state as a snapshot and empties the journal."""
+        with self._gate:
+            while self._compacting or self._active:
+                self._gate.wait()
+            self._compacting = True
+        try:
+            with theater.ticket_manager.locks.locked_all():
+                return self._write_snapshot(theater)
+        finally:
+            with self._gate:
+                self._compacting = False
+                self._gate.notify_all()
+
+    def _write_snapshot(self, theater: Theater) -> Path:
+        with self._lock:
+            path = self.directory / f"snapshot-{self.seq:012d}.tsnap"
+            theater.save_to_file(str(path), "binary")
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(self.journal_path, "wb"):
+                pass
+            for old in self.directory.iterdir():
+                match = SNAPSHOT_PATTERN.match(old.name)
+                if match and old != path:
+                    old.unlink()
+            self.pending = 0
+            return path
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def journaled(method: Callable[..., Any] | None = None, *,
+              record: Callable[[Any, dict[str, Any]], tuple[str, dict[str, Any]]] | None = None) -> Any:
+    """Records a successful service command in the journal and the SQLite store.
+
+    By default the record is the method name with its call arguments; ``record``
+    maps (result, arguments) to the command to replay when the call alone would
+    not reproduce the same state.
+    """
+
+    def decorate(method: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            journal, store = self._journal, self._store
+            if journal is None and store is None:
+                return method(self, *args, **kwargs)
+            try:
+                with journal.command() if journal is not None else nullcontext(), \
+                        store.command(self) if store is not None else nullcontext():
+                    result = method(self, *args, **kwargs)
+                    if result.ok:
+                        bound = signature.bind(self, *args, **kwargs)
+                        bound.apply_defaults()
+                        arguments = dict(bound.arguments)
+                        arguments.pop("self")
+                        command = method.__name__
+                        if record is not None:
+                            command, arguments = record(result, arguments)
+                        # The store is recorded first: a command it rejects never reaches the journal
+                        if store is not None:
+                            store.record(command, arguments, self._theater)
+                        if journal is not None:
+                            journal.append(command, arguments)
+            except StoreConflictError as exc:
+                # The store rolled the command back and the next sync reloads the local state
+                return OperationResult(False, f"Операция отменена: {exc}")
+            if journal is not None and journal.due:
+                journal.compact(self._theater)
+            return result
+
+        return wrapper
+
+    return decorate(method) if method is not None else decorate
@@ -1,14 +1,22 @@
 from __future__ import annotations
 
-from typing import Any
+from datetime import datetime
+from itertools import islice
+from typing import Any, Iterator
 
-from app.services.theater.helpers import build_hall_sectors_view, tickets_for_setting
+from app.services.theater.domain_imports import ANALYTICS_DIMENSIONS, DEFAULT_PRICE_BAND_WIDTH, plan_rehearsals
+from app.services.theater.helpers import build_hall_sectors_view, ticket_view
+
+DASHBOARD_TICKETS_LIMIT = 200
+TICKETS_PAGE_LIMIT = 100
+REHEARSAL_DAY_START = 10
+REHEARSAL_DAY_END = 22
 
 
 class TheaterQueriesMixin:
     def dashboard(self) -> dict[str, Any]:
-        tickets = self._theater.ticket_manager.tickets
-        sold = [ticket for ticket in tickets if ticket.is_sold]
+        ticket_manager = self._theater.ticket_manager
+        available = (ticket for ticket in ticket_manager.iter_tickets() if not ticket.is_sold)
         return {
             "theater": self._theater,
             "name": self._theater.name,
@@ -18,21 +26,21 @@ class TheaterQueriesMixin:
             "repetitions": self.repetitions,
             "halls": self.halls,
             "costumes": self._theater.resource_manager.costumes,
-            "tickets": tickets,
-            "sold_tickets": sold,
-            "available_tickets": [ticket for ticket in tickets if not ticket.is_sold],
+            "stats": self._stats,
+            "tickets_preview": list(islice(ticket_manager.iter_tickets(), DASHBOARD_TICKETS_LIMIT)),
+            "available_preview": list(islice(available, DASHBOARD_TICKETS_LIMIT)),
         }
 
     def user_settings_catalog(self) -> list[dict[str, Any]]:
         catalog: list[dict[str, Any]] = []
-        all_tickets = self._theater.ticket_manager.tickets
+        ticket_manager = self._theater.ticket_manager
         for idx, setting in enumerate(self.settings):
-            setting_tickets = tickets_for_setting(all_tickets, setting.name)
-            if not setting_tickets:
+            partitions = ticket_manager.partitions_for_setting(setting.name)
+            if not partitions:
                 continue
-            available = [ticket for ticket in setting_tickets if not ticket.is_sold]
-            hall_ids = sorted({ticket.hall_id for ticket in setting_tickets})
-            min_price = min(ticket.price for ticket in available) if available else 0.0
+            available_prices = [self._min_available_price(setting, p) for p in partitions if p.available_count]
+            hall_ids = sorted({partition.hall_id for partition in partitions})
+            min_price = min(available_prices) if available_prices else 0.0
             catalog.append(
                 {
                     "setting_idx": idx,
@@ -40,48 +48,138 @@ class TheaterQueriesMixin:
                     "date": setting.date.isoformat() if hasattr(setting.date, "isoformat") else str(setting.date),
                     "director": setting.director.name if setting.director else "Н/Д",
                     "duration_hours": setting.durability,
-                    "total_tickets": len(setting_tickets),
-                    "available_tickets": len(available),
+                    "total_tickets": sum(partition.total_count for partition in partitions),
+                    "available_tickets": sum(partition.available_count for partition in partitions),
                     "halls": hall_ids,
                     "min_price": min_price,
                 }
             )
         return catalog
 
-    def user_setting_hall_view(self, setting_idx: int, hall_id: str | None = None) -> dict[str, Any] | None:
+    def _min_available_price(self, setting: Any, partition: Any) -> float:
+        if self._pricer is None:
+            return partition.min_available_price
+        hall = self._theater.resource_manager.hall_manager.get_hall_by_id(partition.hall_id)
+        return self._pricer.min_free_price(setting, hall, partition)
+
+    def _price_step(self, setting: Any) -> int | None:
+        """Time step of dynamic prices; cached views and ETags are only valid within one step."""
+        return self._pricer.time_bucket(setting) if self._pricer is not None else None
+
+    def _setting_partition(self, setting_idx: int, hall_id: str | None) -> tuple[Any, Any, Any, list[str]] | None:
+        """Resolves (setting, hall, partition, hall ids); an unknown hall falls back to the first one."""
         if setting_idx < 0 or setting_idx >= len(self.settings):
             return None
 
         setting = self.settings[setting_idx]
-        setting_tickets = tickets_for_setting(self._theater.ticket_manager.tickets, setting.name)
-        if not setting_tickets:
+        ticket_manager = self._theater.ticket_manager
+        ticket_manager.holds.expire_due()
+        partitions = ticket_manager.partitions_for_setting(setting.name)
+        if not partitions:
             return None
 
-        hall_ids = sorted({ticket.hall_id for ticket in setting_tickets})
+        hall_ids = sorted({partition.hall_id for partition in partitions})
         selected_hall_id = hall_id if hall_id in hall_ids else hall_ids[0]
         hall = next((item for item in self.halls if item.hall_id == selected_hall_id), None)
         if hall is None:
             return None
+        return setting, hall, ticket_manager.get_partition(setting.name, selected_hall_id), hall_ids
 
-        hall_tickets = [ticket for ticket in setting_tickets if ticket.hall_id == selected_hall_id]
-        sold_count = sum(1 for ticket in hall_tickets if ticket.is_sold)
+    def user_setting_hall_view(self, setting_idx: int, hall_id: str | None = None) -> dict[str, Any] | None:
+        resolved = self._setting_partition(setting_idx, hall_id)
+        if resolved is None:
+            return None
+
+        setting, hall, partition, hall_ids = resolved
         return {
             "setting_idx": setting_idx,
             "setting_name": setting.name,
             "date": setting.date.isoformat() if hasattr(setting.date, "isoformat") else str(setting.date),
             "director": setting.director.name if setting.director else "Н/Д",
-            "hall_id": selected_hall_id,
+            "hall_id": hall.hall_id,
             "halls": hall_ids,
-            "capacity": len(hall_tickets),
-            "sold_count": sold_count,
-            "available_count": len(hall_tickets) - sold_count,
-            "sectors": build_hall_sectors_view(hall, hall_tickets),
+            "capacity": partition.total_count,
+            "sold_count": partition.sold_count,
+            "available_count": partition.available_count,
+            "version": partition.version,
+            "sectors": self._hall_sectors(setting, hall, partition),
         }
 
+    def _hall_sectors(self, setting: Any, hall: Any, partition: Any) -> list[dict[str, Any]]:
+        """Seat grid of a partition, cached by the partition version (and price step) it was built at."""
+        step = self._price_step(setting)
+        key = (self._view_generation, setting.name, hall.hall_id, partition.version, step)
+        sectors = self._hall_views.get(key)
+        if sectors is None:
+            # Built under the hall lock so the grid matches the version it is cached under
+            with self._theater.ticket_manager.locks.locked([hall.hall_id]):
+                key = (self._view_generation, setting.name, hall.hall_id, partition.version, step)
+                prices = self._pricer.hall_prices(setting, hall, partition) if self._pricer is not None else None
+                sectors = build_hall_sectors_view(hall, partition.tickets, prices)
+            self._hall_views.put(key, sectors)
+        return sectors
+
+    def user_setting_hall_etag(self, setting_idx: int, hall_id: str | None = None) -> str | None:
+        """Weak ETag of the hall page: changes whenever a seat, the hall list or the loaded state does."""
+        resolved = self._setting_partition(setting_idx, hall_id)
+        if resolved is None:
+            return None
+
+        setting, hall, partition, hall_ids = resolved
+        etag = f"{self._view_generation}-{setting_idx}-{len(hall_ids)}-{hall.hall_id}-{partition.version}"
+        step = self._price_step(setting)
+        return f'W/"{etag}"' if step is None else f'W/"{etag}-{step}"'
+
+    def seat_status_view(
+        self, setting_idx: int, hall_id: str | None = None, since: int | None = None
+    ) -> dict[str, Any] | None:
+        """Seat states as a delta since ``since`` when possible, otherwise as full bitmaps.
+
+        Bitmaps are base64 with one bit per seat, index ``(sector * rows + row) * seats + seat``,
+        least significant bit first.
+        """
+        resolved = self._setting_partition(setting_idx, hall_id)
+        if resolved is None:
+            return None
+
+        _, hall, partition, _ = resolved
+        with self._theater.ticket_manager.locks.locked([hall.hall_id]):
+            status = partition.seat_status(hall)
+            changes = status.changes_since(since) if since is not None else None
+            view: dict[str, Any] = {
+                "hall_id": hall.hall_id,
+                "version": status.version,
+                "available_count": partition.available_count,
+            }
+            if changes is not None:
+                view.update(full=False, changes=[[index, state] for index, state in changes])
+            else:
+                view.update(
+                    full=True,
+                    sectors=hall.sectors,
+                    rows_per_sector=hall.rows_per_sector,
+                    seats_per_row=hall.seats_per_row,
+                    sold=status.sold.to_base64(),
+                    held=status.held.to_base64(),
+                )
+        return view
+
+    def find_best_seats(
+        self, setting_idx: int, hall_id: str, count: int, max_price: float | None = None
+    ) -> list[dict[str, Any]]:
+        if setting_idx < 0 or setting_idx >= len(self.settings):
+            return []
+        setting = self.settings[setting_idx]
+        self._theater.ticket_manager.holds.expire_due()
+        tickets = self._theater.find_best_seats(setting.name, hall_id, count, max_price)
+        return [ticket_view(ticket) for ticket in tickets]
+
+    def save_status(self) -> dict[str, Any]:
+        return self._saver.status()
+
     def info_summary(self) -> dict[str, Any]:
         halls = self.halls
-        tickets = self._theater.ticket_manager.tickets
-        sold = [ticket for ticket in tickets if ticket.is_sold]
+        stats = self._stats
         return {
             "theater_name": self._theater.name,
             "staff_count": len(self._theater.staff_manager.staff),
@@ -89,9 +187,9 @@ class TheaterQueriesMixin:
             "total_capacity": sum(hall.capacity for hall in halls),
             "settings_count": len(self.settings),
             "repetitions_count": len(self.repetitions),
-            "tickets_count": len(tickets),
-            "sold_tickets_count": len(sold),
-            "available_tickets_count": len(tickets) - len(sold),
+            "tickets_count": stats.total_count,
+            "sold_tickets_count": stats.sold_count,
+            "available_tickets_count": stats.available_count,
             "stages_count": len(self._theater.resource_manager.stages),
             "costume_rooms_count": len(self._theater.resource_manager.costume_rooms),
             "costumes_count": len(self._theater.resource_manager.costumes),
@@ -124,7 +222,8 @@ class TheaterQueriesMixin:
     def info_halls(self) -> dict[str, Any]:
         halls_data: list[dict[str, Any]] = []
         for hall in self.halls:
-            occupied = sum(1 for sector in hall.seats for row in sector for seat in row if seat.is_occupied)
+            # The hall's seat map keeps its own occupied counter, so there is nothing to rescan
+            occupied = hall.audience_count
             halls_data.append(
                 {
                     "name": hall.name,
@@ -163,29 +262,110 @@ class TheaterQueriesMixin:
         ]
         return {"settings": settings_data, "repetitions": repetitions_data}
 
-    def info_tickets(self) -> dict[str, Any]:
-        tickets = self._theater.ticket_manager.tickets
-        sold = [ticket for ticket in tickets if ticket.is_sold]
+    def info_tickets(
+        self,
+        cursor: int = 0,
+        limit: int = TICKETS_PAGE_LIMIT,
+        setting: str | None = None,
+        hall_id: str | None = None,
+        sold: bool | None = None,
+    ) -> dict[str, Any]:
+        """Totals of the matching tickets plus one page of them; pass ``next_cursor`` back to get the next page."""
+        page: list[dict[str, Any]] = []
+        next_cursor: int | None = None
+        for position, ticket in self.iter_tickets_filtered(cursor, setting, hall_id, sold):
+            if len(page) == limit:
+                next_cursor = position
+                break
+            page.append(ticket_view(ticket))
+        return {**self._ticket_totals(setting, hall_id, sold), "tickets": page, "next_cursor": next_cursor}
+
+    def _ticket_totals(self, setting: str | None, hall_id: str | None, sold: bool | None) -> dict[str, Any]:
+        if setting is None and hall_id is None:
+            # The whole theater: the incremental counters answer without touching tickets
+            stats = self._stats
+            sold_count, available, revenue = stats.sold_count, stats.available_count, stats.revenue
+        else:
+            partitions = self._selected_partitions(setting, hall_id)
+            sold_count = sum(partition.sold_count for partition in partitions)
+            available = sum(partition.available_count for partition in partitions)
+            revenue = sum(ticket.price for partition in partitions for _, ticket in partition.iter_matching(0, True))
+        if sold is True:
+            available = 0
+        elif sold is False:
+            sold_count, revenue = 0, 0.0
+        return {"total": sold_count + available, "sold": sold_count, "available": available, "revenue": revenue}
+
+    def _selected_partitions(self, setting: str | None, hall_id: str | None) -> list[Any]:
+        ticket_manager = self._theater.ticket_manager
+        partitions = ticket_manager.partitions_for_setting(setting) if setting else ticket_manager.partitions
+        return [partition for partition in partitions if hall_id is None or partition.hall_id == hall_id]
+
+    def iter_tickets_filtered(
+        self,
+        cursor: int = 0,
+        setting: str | None = None,
+        hall_id: str | None = None,
+        sold: bool | None = None,
+    ) -> Iterator[tuple[int, Any]]:
+        """Yield ``(position, ticket)`` for matching tickets, starting at ``cursor``.
+
+        Positions count every ticket of the selected partitions, so a cursor stays valid
+        regardless of the sold filter and partitions before it are skipped without a scan.
+        """
+        position = 0
+        for partition in self._selected_partitions(setting, hall_id):
+            if cursor >= position + partition.total_count:
+                position += partition.total_count
+                continue
+            # Lazy blocks test the sold filter on their stored tickets and build only the ones yielded
+            for idx, ticket in partition.iter_matching(max(0, cursor - position), sold):
+                yield position + idx, ticket
+            position += partition.total_count
+
+    def info_analytics(
+        self,
+        setting: str | None = None,
+        hall_id: str | None = None,
+        band_width: float = DEFAULT_PRICE_BAND_WIDTH,
+    ) -> dict[str, Any]:
+        """Revenue and occupancy totals plus a breakdown by every analytics dimension."""
+        columns = self._analytics.columns(self._theater, setting, hall_id)
         return {
-            "total": len(tickets),
-            "sold": len(sold),
-            "available": len(tickets) - len(sold),
-            "revenue": sum(ticket.price for ticket in sold),
-            "tickets": [
-                {
-                    "ticket_id": ticket.ticket_id,
-                    "setting": ticket.setting.name if ticket.setting else None,
-                    "hall_id": ticket.hall_id,
-                    "sector": ticket.sector,
-                    "row": ticket.row,
-                    "seat": ticket.seat,
-                    "price": ticket.price,
-                    "is_sold": ticket.is_sold,
-                }
-                for ticket in tickets
-            ],
+            "totals": columns.summary(),
+            **{f"by_{name}": columns.group((name,), band_width) for name in ANALYTICS_DIMENSIONS},
         }
 
+    def info_analytics_groups(
+        self,
+        by: list[str],
+        setting: str | None = None,
+        hall_id: str | None = None,
+        band_width: float = DEFAULT_PRICE_BAND_WIDTH,
+    ) -> dict[str, Any]:
+        """Aggregates grouped by a combination of dimensions; raises ValueError on an unknown one."""
+        columns = self._analytics.columns(self._theater, setting, hall_id)
+        return {"by": by, "band_width": band_width, "groups": columns.group(by, band_width)}
+
+    def schedule_conflicts(self) -> dict[str, Any]:
+        """Every pair of shows or rehearsals that share a hall or a staff member at the same time."""
+        conflicts = self._theater.scheduler.conflicts()
+        return {"count": len(conflicts), "conflicts": [conflict.to_dict() for conflict in conflicts]}
+
+    def propose_rehearsals(
+        self,
+        count: int,
+        hours: float,
+        not_before: datetime | None = None,
+        day_start: int = REHEARSAL_DAY_START,
+        day_end: int = REHEARSAL_DAY_END,
+    ) -> dict[str, Any]:
+        """A conflict-free timetable of ``count`` rehearsals per setting before its show; nothing is booked."""
+        plan = plan_rehearsals(
+            self._theater.scheduler, self.settings, count, hours, not_before or datetime.now(), day_start, day_end
+        )
+        return plan.to_dict()
+
     def info_resources(self) -> dict[str, Any]:
         rm = self._theater.resource_manager
         return {
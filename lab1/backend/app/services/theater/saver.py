@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any
+
+from app.services.theater.domain_imports import Theater, backend_for_path, dump_snapshot, write_snapshot
+
+
+@dataclass
+class SaveStatus:
+    path: str
+    started_at: datetime
+    capture_ms: float
+    state: str = "running"
+    finished_at: datetime | None = None
+    write_ms: float | None = None
+    bytes: int | None = None
+    error: str | None = None
+
+    @property
+    def duration_ms(self) -> float | None:
+        return None if self.write_ms is None else self.capture_ms + self.write_ms
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["started_at"] = self.started_at.isoformat()
+        data["finished_at"] = self.finished_at.isoformat() if self.finished_at else None
+        data["duration_ms"] = self.duration_ms
+        return data
+
+
+class BackgroundSaver:
+    """Saves theater snapshots without blocking request handling.
+
+    The snapshot dict is captured on the calling thread while hall locks are held,
+    so it is a consistent copy of plain data; encoding and writing it happen on a
+    single worker thread, which also keeps saves to the same file in order.
+    """
+
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="theater-save")
+        self._lock = threading.Lock()
+        self._pending: list[Future] = []
+        self._current: SaveStatus | None = None
+        self._last: SaveStatus | None = None
+
+    def submit(self, theater: Theater, path: str) -> Future:
+        started_at = datetime.now()
+        start = time.perf_counter()
+        columnar = backend_for_path(path).columnar
+        with theater.ticket_manager.locks.locked_all():
+            data = dump_snapshot(theater, columnar=columnar)
+        status = SaveStatus(path, started_at, (time.perf_counter() - start) * 1e3)
+        with self._lock:
+            self._current = status
+            future = self._executor.submit(self._write, data, status)
+            self._pending = [f for f in self._pending if not f.done()] + [future]
+        return future
+
+    def _write(self, data: dict[str, Any], status: SaveStatus) -> None:
+        start = time.perf_counter()
+        try:
+            status.bytes = write_snapshot(data, status.path)
+            status.state = "done"
+        except Exception as exc:  # noqa: BLE001
+            status.error = str(exc)
+            status.state = "failed"
+        status.write_ms = (time.perf_counter() - start) * 1e3
+        status.finished_at = datetime.now()
+        with self._lock:
+            self._last = status
+            if self._current is status:
+                self._current = None
+
+    def wait(self) -> None:
+        """Blocks until every submitted save has been written."""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.result()
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "in_progress": self._current.to_dict() if self._current else None,
+                "last_completed": self._last.to_dict() if self._last else None,
+            }
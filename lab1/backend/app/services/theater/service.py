@@ -1,17 +1,118 @@
 from __future__ import annotations
 
+from typing import Any
+
 from app.services.theater.base import TheaterBaseMixin
+from app.services.theater.cache import LRUCache
 from app.services.theater.commands import TheaterCommandsMixin
-from app.services.theater.domain_imports import Theater
+from app.services.theater.domain_imports import DynamicPricer, PricingPolicy, Theater, TicketAnalytics, seat_state
+from app.services.theater.events import RESYNC_EVENT, EventBus
+from app.services.theater.journal import CommandJournal
 from app.services.theater.queries import TheaterQueriesMixin
+from app.services.theater.saver import BackgroundSaver
+from app.services.theater.stats import TheaterStats
+from app.services.theater.store import SQLiteStore
 
 
 class TheaterService(TheaterBaseMixin, TheaterCommandsMixin, TheaterQueriesMixin):
     """Facade service that combines theater commands and query views."""
 
-    def __init__(self, theater: Theater | None = None) -> None:
+    def __init__(
+        self,
+        theater: Theater | None = None,
+        journal: CommandJournal | None = None,
+        store: SQLiteStore | None = None,
+        pricing: PricingPolicy | None = None,
+    ) -> None:
         self._theater = theater or Theater("Default Theater")
+        # Without a policy tickets keep the prices set when a setting is bound to a hall
+        self._pricer = DynamicPricer(pricing) if pricing is not None else None
+        # Both are attached after the restore below, so replayed commands are not recorded again
+        self._journal: CommandJournal | None = None
+        self._store: SQLiteStore | None = None
+        self._saver = BackgroundSaver()
+        self._events = EventBus()
+        self._hall_views = LRUCache()
+        # Bumped when the whole state is replaced: partition versions restart from zero then
+        self._view_generation = 0
+        self._analytics = TicketAnalytics()
+        self._theater.ticket_manager.seat_listeners.append(self._publish_seat_change)
+        # Once the journal has history it is the source of truth and the store only mirrors it;
+        # the store recorded the replayed tail when the commands first ran
+        from_journal = journal is not None and not journal.is_empty()
+        if store is not None and not from_journal:
+            store.restore(self._theater)
+        tail = journal.restore(self._theater) if journal is not None else []
+        self._stats = TheaterStats.from_theater(self._theater)
+        for command, args in tail:
+            getattr(self, command)(**args)
+        self._journal = journal
+        self._store = store
+        if store is not None and from_journal:
+            store.seed(self._theater)
+        # A new journal starts from a snapshot of the state loaded from the store
+        if journal is not None and (journal.due or store is not None and not from_journal):
+            journal.compact(self._theater)
 
     @property
     def theater(self) -> Theater:
         return self._theater
+
+    @property
+    def stats(self) -> TheaterStats:
+        return self._stats
+
+    @property
+    def journal(self) -> CommandJournal | None:
+        return self._journal
+
+    @property
+    def pricer(self) -> DynamicPricer | None:
+        return self._pricer
+
+    @property
+    def events(self) -> EventBus:
+        return self._events
+
+    @property
+    def saver(self) -> BackgroundSaver:
+        return self._saver
+
+    @property
+    def store(self) -> SQLiteStore | None:
+        return self._store
+
+    def sync(self) -> None:
+        """Catches up with changes other workers committed to a shared store."""
+        if self._store is not None:
+            self._store.sync(self)
+
+    def apply_command(self, command: str, args: dict[str, Any]) -> None:
+        """Applies a command recorded elsewhere without journaling or storing it again."""
+        method = getattr(type(self), command)
+        getattr(method, "__wrapped__", method)(self, **args)
+
+    def state_replaced(self) -> None:
+        """Rebuilds derived state after the theater was loaded as a whole."""
+        self._stats = TheaterStats.from_theater(self._theater)
+        self._view_generation += 1
+        self._hall_views.clear()
+        self._analytics.clear()
+        if self._pricer is not None:
+            self._pricer.clear()
+        # Seat versions restarted too, so open hall pages refetch the map instead of dropping "old" events
+        self._events.publish_all(RESYNC_EVENT)
+
+    def _publish_seat_change(self, partition: Any, ticket: Any) -> None:
+        """Seat listener: runs under the hall lock, so it only builds and enqueues the event."""
+        key = (partition.setting_name, partition.hall_id)
+        if not self._events.has_subscribers(key):
+            return
+        hall = self._theater.resource_manager.hall_manager.get_hall_by_id(partition.hall_id)
+        self._events.publish(key, {
+            "type": "seat",
+            "version": partition.version,
+            "index": hall.seat_map.index(ticket.sector, ticket.row, ticket.seat),
+            "state": seat_state(ticket),
+            "available_count": partition.available_count,
+        })
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.services.theater.domain_imports import Theater
+
+
+@dataclass
+class TheaterStats:
+    """Incrementally maintained ticket aggregates, so dashboards do not rescan tickets."""
+
+    sold_count: int = 0
+    available_count: int = 0
+    revenue: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def total_count(self) -> int:
+        return self.sold_count + self.available_count
+
+    @classmethod
+    def from_theater(cls, theater: Theater) -> "TheaterStats":
+        """Full rebuild; only needed on startup and after loading a saved state."""
+        stats = cls()
+        ticket_manager = theater.ticket_manager
+        for ticket in ticket_manager.iter_sold_tickets():
+            stats.revenue += ticket.price
+        for partition in ticket_manager.partitions:
+            stats.sold_count += partition.sold_count
+            stats.available_count += partition.available_count
+        return stats
+
+    def record_bind(self, tickets: Any) -> None:
+        self.available_count += len(tickets)
+
+    def record_sale(self, ticket: Any) -> None:
+        with self._lock:
+            self.sold_count += 1
+            self.available_count -= 1
+            self.revenue += ticket.price
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Iterator
+
+from app.services.theater.domain_imports import SQLiteTheaterRepository, Theater, TheaterException
+
+# Change-log marker: the whole state was replaced, followers reload instead of replaying
+RELOAD_COMMAND = "reload"
+# Change-log records kept for followers; a worker further behind reloads the state
+CHANGE_LOG_KEEP = 10000
+TRIM_EVERY = 1000
+
+
+SALE_COMMANDS = ("sell_ticket", "sell_tickets")
+# Change-log records of seat holds: they only exist in the shared store, never in the journal
+HOLD_COMMAND = "hold"
+RELEASE_HOLD_COMMAND = "release_hold"
+
+
+class StoreConflictError(RuntimeError):
+    """The shared store disagrees with the worker's in-memory state."""
+
+
+def _sale(args: dict[str, Any]) -> tuple[list[str], dict[str, float] | None, str | None]:
+    """Ticket ids, charged prices and the confirmed hold of a recorded sale command."""
+    if "ticket_id" in args:
+        price = args.get("price")
+        return [args["ticket_id"]], None if price is None else {args["ticket_id"]: price}, None
+    return args["ticket_ids"], args.get("prices"), args.get("hold_id")
+
+
+class SQLiteStore:
+    """Keeps a SQLite repository in step with service commands.
+
+    Sales become single-row ticket updates; other commands rewrite only the small
+    entity document, and a bind inserts the rows of the tickets it created.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.repository = SQLiteTheaterRepository(path)
+
+    def restore(self, theater: Theater) -> None:
+        """Loads the stored theater, or seeds an empty database with the current one."""
+        if not self.seed(theater):
+            theater.load_from_repository(self.repository)
+
+    def seed(self, theater: Theater) -> bool:
+        """Saves the theater into an empty database; returns False if it already holds a state."""
+        if not self.repository.is_empty():
+            return False
+        self.repository.save(theater)
+        return True
+
+    def record(self, command: str, args: dict[str, Any], theater: Theater) -> None:
+        if command in SALE_COMMANDS:
+            self.repository.mark_sold(*_sale(args))
+            return
+        if command == "bind_setting_to_hall":
+            partition = theater.ticket_manager.get_partition(args["setting_name"], args["hall_id"])
+            self.repository.add_tickets(partition.iter_from(0))
+        self.repository.save_entities(theater)
+
+    def replace(self, theater: Theater) -> None:
+        self.repository.save(theater)
+
+    def next_hold_id(self) -> str | None:
+        """Id for a new hold; None lets the in-memory hold manager number it."""
+        return None
+
+    def record_hold(self, hold: Any, ttl: float) -> None:
+        """Holds live in memory only; a single process has nobody to share them with."""
+
+    def record_release(self, hold_id: str) -> None:
+        pass
+
+    def command(self, service: Any) -> Any:
+        """Brackets one service command; the in-process store needs no coordination."""
+        return nullcontext()
+
+    def sync(self, service: Any) -> None:
+        """Brings the service up to date with the store; nothing to do for a single process."""
+
+    def close(self) -> None:
+        self.repository.close()
+
+
+class SharedSQLiteStore(SQLiteStore):
+    """Authoritative theater state shared by several worker processes through SQLite in WAL mode.
+
+    Each worker keeps its in-memory theater as a read cache tagged with the version
+    of the last change it applied. A command runs inside one ``BEGIN IMMEDIATE``
+    transaction: the worker first replays the changes other workers committed, then
+    validates and applies the command locally, and commits its store rows together
+    with a change-log record. Sales are thus serialized across processes, and a
+    seat can never be sold twice. Reads call ``sync``, which compares
+    ``PRAGMA data_version`` and replays only when another worker has committed.
+
+    Holds are shared as well: the ``holds`` table keeps their tickets and wall-clock
+    expiry, and hold/release records in the change log put them into every worker's
+    memory. A sale through another worker then fails the local check after catching
+    up, and ``mark_sold`` refuses tickets under someone else's active hold inside
+    the same transaction.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self.version = 0
+        self._seen_data_version: int | None = None
+        self._stale = False
+
+    def restore(self, theater: Theater) -> None:
+        with self.repository.transaction():
+            super().restore(theater)
+            self.version = self.repository.current_version()
+            self._restore_holds(theater)
+
+    @contextmanager
+    def command(self, service: Any) -> Iterator[None]:
+        with self.repository.transaction():
+            self._catch_up(service)
+            try:
+                yield
+            except BaseException:
+                # The local state may hold changes the rollback discards
+                self._stale = True
+                raise
+
+    def record(self, command: str, args: dict[str, Any], theater: Theater) -> None:
+        if command in SALE_COMMANDS:
+            ticket_ids, prices, hold_id = _sale(args)
+            if self.repository.mark_sold(ticket_ids, prices, hold_id) != len(ticket_ids):
+                raise StoreConflictError(f"Tickets already sold or held in the shared store: {ticket_ids}")
+        else:
+            super().record(command, args, theater)
+        self._append_change(command, args)
+
+    def next_hold_id(self) -> str:
+        return self.repository.next_hold_id()
+
+    def record_hold(self, hold: Any, ttl: float) -> None:
+        # Monotonic clocks differ between processes, so the shared expiry is wall-clock time
+        expires_at = time.time() + ttl
+        self.repository.add_hold(hold.hold_id, hold.ticket_ids, expires_at)
+        self._append_change(HOLD_COMMAND, {"hold_id": hold.hold_id, "ticket_ids": hold.ticket_ids,
+                                           "expires_at": expires_at})
+
+    def record_release(self, hold_id: str) -> None:
+        self.repository.release_hold(hold_id)
+        self._append_change(RELEASE_HOLD_COMMAND, {"hold_id": hold_id})
+
+    def _append_change(self, command: str, args: dict[str, Any]) -> None:
+        self.version = self.repository.append_change(command, args)
+        if self.version % TRIM_EVERY == 0:
+            self.repository.trim_changes(CHANGE_LOG_KEEP)
+
+    def replace(self, theater: Theater) -> None:
+        with self.repository.transaction():
+            self.repository.save(theater)
+            self.version = self.repository.append_change(RELOAD_COMMAND, {})
+
+    def sync(self, service: Any) -> None:
+        data_version = self.repository.data_version()
+        if data_version == self._seen_data_version and not self._stale:
+            return
+        with self.repository.transaction("DEFERRED"):
+            self._catch_up(service)
+        self._seen_data_version = data_version
+
+    def _catch_up(self, service: Any) -> None:
+        """Applies the changes committed after ``version``; must run inside a transaction."""
+        changes = None if self._stale else self.repository.changes_since(self.version)
+        if changes is None or any(command == RELOAD_COMMAND for _, command, _ in changes):
+            service.theater.load_from_repository(self.repository)
+            self.version = self.repository.current_version()
+            self._stale = False
+            self._restore_holds(service.theater)
+            service.state_replaced()
+            return
+        for version, command, args in changes:
+            if command == HOLD_COMMAND:
+                self._place_hold(service.theater, args["hold_id"], args["ticket_ids"], args["expires_at"])
+            elif command == RELEASE_HOLD_COMMAND:
+                service.theater.release_hold(args["hold_id"])
+            else:
+                if command in SALE_COMMANDS:
+                    self._release_local_holds(service.theater, _sale(args)[0])
+                service.apply_command(command, args)
+            self.version = version
+
+    def _restore_holds(self, theater: Theater) -> None:
+        """Puts the active holds of the database into a freshly loaded theater."""
+        for hold_id, ticket_ids, expires_at in self.repository.active_holds():
+            self._place_hold(theater, hold_id, ticket_ids, expires_at)
+
+    @staticmethod
+    def _place_hold(theater: Theater, hold_id: str, ticket_ids: list[str], expires_at: float) -> None:
+        ttl = expires_at - time.time()
+        if ttl <= 0:
+            return
+        try:
+            theater.hold_tickets(ticket_ids, ttl, hold_id)
+        except TheaterException:
+            # Replayed out of its time: the seats were sold or released since
+            pass
+
+    @staticmethod
+    def _release_local_holds(theater: Theater, ticket_ids: list[str]) -> None:
+        for ticket_id in ticket_ids:
+            ticket = theater.ticket_manager.get_ticket(ticket_id)
+            if ticket is not None and ticket.held_by is not None:
+                theater.release_hold(ticket.held_by)
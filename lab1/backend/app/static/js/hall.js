@@ -0,0 +1,115 @@
+// Incremental refresh of the hall map: seat states come from the JSON delta API,
+// so a purchase or another user's sale updates a few seats instead of re-rendering the page.
+// Changes are pushed over Server-Sent Events; polling is only the fallback without them.
+(() => {
+    const hall = document.querySelector(".hall-sectors[data-seats-url]");
+    if (!hall) {
+        return;
+    }
+    const POLL_MS = 5000;
+    let version = Number(hall.dataset.version);
+    const cells = new Map();
+    hall.querySelectorAll(".seat-cell").forEach((cell) => cells.set(Number(cell.dataset.index), cell));
+
+    function applyState(index, state) {
+        const cell = cells.get(index);
+        if (!cell) {
+            return;
+        }
+        const button = cell.querySelector("button.seat");
+        const pick = cell.querySelector(".seat-pick");
+        const available = state === "available";
+        button.className = `seat seat-${state}`;
+        button.disabled = !available;
+        pick.hidden = !available;
+        pick.disabled = !available;
+        if (!available) {
+            pick.checked = false;
+        }
+    }
+
+    function bitIsSet(bytes, index) {
+        return (bytes.charCodeAt(index >> 3) & (1 << (index & 7))) !== 0;
+    }
+
+    function applyView(view) {
+        if (!view.full && view.version < version) {
+            // Pushed events already moved the map past this delta
+            return;
+        }
+        if (view.full) {
+            const sold = atob(view.sold);
+            const held = atob(view.held);
+            cells.forEach((_, index) => {
+                const state = bitIsSet(sold, index) ? "sold" : bitIsSet(held, index) ? "held" : "available";
+                applyState(index, state);
+            });
+        } else {
+            view.changes.forEach(([index, state]) => applyState(index, state));
+        }
+        version = view.version;
+        document.getElementById("available-count").textContent = view.available_count;
+    }
+
+    async function refresh(full = false) {
+        // A delta is only meaningful against the same state; after a resync the map is fetched whole
+        const url = full ? hall.dataset.seatsUrl : `${hall.dataset.seatsUrl}&since=${version}`;
+        const response = await fetch(url);
+        if (response.ok) {
+            applyView(await response.json());
+        }
+    }
+
+    function showMessage(text, isError) {
+        const message = document.getElementById("hall-message");
+        message.textContent = text;
+        message.className = `message ${isError ? "error" : "success"}`;
+        message.hidden = false;
+    }
+
+    hall.addEventListener("submit", async (event) => {
+        const form = event.target.closest(".seat-form");
+        if (!form) {
+            return;
+        }
+        event.preventDefault();
+        const response = await fetch("/api/tickets/purchase", {
+            method: "POST",
+            headers: {"Content-Type": "application/json"},
+            body: JSON.stringify({ticket_ids: [form.elements.ticket_id.value]}),
+        });
+        const result = await response.json();
+        showMessage(result.message, !result.ok);
+        await refresh();
+    });
+
+    function listen() {
+        const source = new EventSource(hall.dataset.eventsUrl);
+        source.addEventListener("hello", (event) => {
+            if (JSON.parse(event.data).version !== version) {
+                refresh();
+            }
+        });
+        source.addEventListener("seat", (event) => {
+            const change = JSON.parse(event.data);
+            if (change.version <= version) {
+                return;
+            }
+            if (change.version !== version + 1) {
+                // A change was missed: fetch the delta instead of guessing
+                refresh();
+                return;
+            }
+            applyState(change.index, change.state);
+            version = change.version;
+            document.getElementById("available-count").textContent = change.available_count;
+        });
+        source.addEventListener("resync", () => refresh(true));
+    }
+
+    if (window.EventSource && hall.dataset.eventsUrl) {
+        listen();
+    } else {
+        setInterval(() => refresh(), POLL_MS);
+    }
+})();
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+from typing import Any
+
 from fastapi import Request
 from fastapi.responses import RedirectResponse
 
 from app.container import container
 from app.services.theater import TheaterService
+from app.services.theater.commands import HOLD_TTL_SECONDS
 
 
 def render_staff_dashboard(request: Request, service: TheaterService, message: str = "", is_error: bool = False):
@@ -31,6 +34,7 @@ def render_user_hall(
     hall_id: str | None = None,
     message: str = "",
     is_error: bool = False,
+    hold: Any = None,
 ):
     hall_view = service.user_setting_hall_view(setting_idx, hall_id)
     if hall_view is None:
@@ -41,5 +45,7 @@ def render_user_hall(
         "message": message,
         "is_error": is_error,
         "hall_view": hall_view,
+        "hold": hold,
+        "hold_ttl_minutes": HOLD_TTL_SECONDS // 60,
     }
     return container.templates.TemplateResponse(request=request, name="user_hall.html", context=payload)
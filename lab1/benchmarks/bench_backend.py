@@ -0,0 +1,260 @@
+"""Набор бенчмарков веб-бэкенда: микробенчмарки сервиса и нагрузка на HTTP-маршруты.
+
+Микробенчмарки: bind_to_hall (обычные и виртуальные билеты), sell_ticket,
+build_hall_sectors_view, info_all, info_analytics, сохранение и загрузка снимка. Нагрузка идёт
+через ASGI-транспорт httpx прямо в приложение, без сети, с несколькими
+одновременными клиентами: GET /tickets, GET /tickets/setting/{idx} и
+POST /tickets/purchase. Для каждого замера выводятся p50/p95/p99 и пропускная
+способность; с --baseline результаты сравниваются с сохранённым эталоном.
+
+Запуск:
+    cd lab1
+    python3 benchmarks/bench_backend.py --scale small medium
+    python3 benchmarks/bench_backend.py --scale medium --update-baseline
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from synthetic import BACKEND_DIR, SCALES, build_service, free_ticket_ids
+
+import httpx
+from fastapi import FastAPI
+
+from actions import Setting
+from halls import AuditoryHall
+from staff import Director
+from theater import Theater
+
+from app.services.theater.helpers import build_hall_sectors_view
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# Допустимый рост p50 относительно эталона: замеры в доли миллисекунды шумят на 20–60 %
+DEFAULT_TOLERANCE = 0.5
+
+
+def summarize(samples: List[float], elapsed: float) -> Dict[str, float]:
+    """p50/p95/p99 в миллисекундах и операций в секунду по задержкам samples (секунды)."""
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        "p50_ms": cuts[49] * 1e3,
+        "p95_ms": cuts[94] * 1e3,
+        "p99_ms": cuts[98] * 1e3,
+        "ops_per_s": len(samples) / elapsed,
+        "samples": len(samples),
+    }
+
+
+def time_calls(calls: List[Callable[[], object]]) -> Dict[str, float]:
+    """Выполняет вызовы по одному, замеряя каждый."""
+    gc.collect()
+    samples = []
+    started = time.perf_counter()
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, time.perf_counter() - started)
+
+
+# --- Микробенчмарки -------------------------------------------------------
+
+def bench_bind(scale, lazy: bool, binds: int = 20) -> Dict[str, float]:
+    theater = Theater("Bench")
+    director = Director("Director", 50, 100000.0)
+    theater.add_staff(director)
+    names = []
+    for i in range(binds):
+        theater.add_hall(AuditoryHall(f"Hall {i}", scale.sectors, scale.rows, scale.seats, f"h{i}"))
+        theater.add_setting(Setting(2.0, f"Play {i}", datetime(2025, 1, 1), director))
+        names.append((f"Play {i}", f"h{i}"))
+    return time_calls([
+        lambda name=name, hall_id=hall_id: theater.bind_setting_to_hall(name, hall_id, 100.0, lazy=lazy)
+        for name, hall_id in names
+    ])
+
+
+def bench_sell_ticket(service, sales: int = 2000) -> Dict[str, float]:
+    ids = free_ticket_ids(service, sales)
+    return time_calls([lambda ticket_id=ticket_id: service.sell_ticket(ticket_id) for ticket_id in ids])
+
+
+def bench_hall_sectors(service, repeats: int = 30) -> Dict[str, float]:
+    hall_manager = service.theater.resource_manager.hall_manager
+    partitions = service.theater.ticket_manager.partitions
+    calls = []
+    for i in range(repeats):
+        partition = partitions[i % len(partitions)]
+        hall = hall_manager.get_hall_by_id(partition.hall_id)
+        calls.append(lambda hall=hall, partition=partition: build_hall_sectors_view(hall, partition.tickets))
+    return time_calls(calls)
+
+
+def bench_info_all(service, repeats: int = 30) -> Dict[str, float]:
+    return time_calls([service.info_all] * repeats)
+
+
+def bench_analytics(service, repeats: int = 30) -> Dict[str, float]:
+    """Отчёт по всем разрезам; первый вызов выгружает столбцы, дальше они берутся из кэша."""
+    service.info_analytics()
+    return time_calls([service.info_analytics] * repeats)
+
+
+def bench_snapshot(service, fmt: str, repeats: int = 5) -> Dict[str, Dict[str, float]]:
+    temp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(temp_dir, f"theater.{'tsnap' if fmt == 'binary' else 'json'}")
+        save = time_calls([lambda: service.theater.save_to_file(path, fmt)] * repeats)
+        load = time_calls([lambda: Theater("Restored").load_from_file(path)] * repeats)
+    finally:
+        shutil.rmtree(temp_dir)
+    return {f"save_{fmt}": save, f"load_{fmt}": load}
+
+
+# --- Нагрузка через ASGI ------------------------------------------------------
+
+def build_app(service) -> FastAPI:
+    """Маршруты приложения поверх заданного сервиса; шаблоны ищутся относительно backend."""
+    os.chdir(BACKEND_DIR)
+    from app.dependencies import get_theater_service
+    from app.routers import build_api_router
+
+    app = FastAPI()
+    app.include_router(build_api_router())
+    app.dependency_overrides[get_theater_service] = lambda: service
+    return app
+
+
+async def drive(app: FastAPI, requests: List[Callable], concurrency: int) -> Dict[str, float]:
+    """Выполняет запросы concurrency клиентами; каждый запрос — функция (client) -> coroutine."""
+    transport = httpx.ASGITransport(app=app)
+    samples: List[float] = []
+    queue = iter(requests)
+
+    async def worker(client: httpx.AsyncClient):
+        for make_request in queue:
+            start = time.perf_counter()
+            response = await make_request(client)
+            samples.append(time.perf_counter() - start)
+            assert response.status_code < 400, response.status_code
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        gc.collect()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(samples, elapsed)
+
+
+def bench_http(service, count: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    app = build_app(service)
+    settings = len(service.settings)
+    ticket_ids = free_ticket_ids(service, count)
+    hall_of = {t: service.theater.ticket_manager.get_ticket(t).hall_id for t in ticket_ids}
+    index_of = {setting.name: idx for idx, setting in enumerate(service.settings)}
+
+    def purchase(ticket_id):
+        ticket = service.theater.ticket_manager.get_ticket(ticket_id)
+        data = {"setting_idx": index_of[ticket.setting.name], "hall_id": hall_of[ticket_id], "ticket_id": ticket_id}
+        return lambda client: client.post("/tickets/purchase", data=data)
+
+    scenarios = {
+        "GET /tickets": [lambda client: client.get("/tickets")] * count,
+        "GET /tickets/setting/{idx}": [
+            lambda client, idx=i % settings: client.get(f"/tickets/setting/{idx}") for i in range(count)
+        ],
+        "POST /tickets/purchase": [purchase(ticket_id) for ticket_id in ticket_ids],
+    }
+    return {name: asyncio.run(drive(app, requests, concurrency)) for name, requests in scenarios.items()}
+
+
+# --- Отчёт и эталон -------------------------------------------------------
+
+def run_scale(name: str, requests: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    scale = SCALES[name]
+    results = {
+        "bind_to_hall": bench_bind(scale, lazy=False),
+        "bind_to_hall[lazy]": bench_bind(scale, lazy=True),
+    }
+    service = build_service(scale)
+    results["build_hall_sectors_view"] = bench_hall_sectors(service)
+    results["info_all"] = bench_info_all(service)
+    results["info_analytics"] = bench_analytics(service)
+    results.update(bench_snapshot(service, "json"))
+    results.update(bench_snapshot(service, "binary"))
+    # Четверть мест — на продажи, чтобы свободных хватило и HTTP-покупкам
+    results["sell_ticket"] = bench_sell_ticket(service, min(2000, scale.tickets // 4))
+    results.update(bench_http(service, requests, concurrency))
+    return results
+
+
+def print_report(scale: str, results, baseline, tolerance: float) -> List[str]:
+    """Печатает таблицу и возвращает имена замеров, где p50 вырос сильнее tolerance."""
+    regressions = []
+    print(f"\nмасштаб: {scale} ({SCALES[scale].tickets} мест)")
+    print(f"{'замер':<30} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'оп/с':>10} {'к эталону':>10}")
+    for name, row in results.items():
+        line = f"{name:<30} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} {row['p99_ms']:>9.3f} {row['ops_per_s']:>10.1f}"
+        reference = baseline.get(scale, {}).get(name)
+        if reference:
+            ratio = row['p50_ms'] / reference['p50_ms']
+            line += f" {ratio:>9.2f}x"
+            if ratio > 1 + tolerance:
+                line += "  регрессия"
+                regressions.append(f"{scale}/{name}")
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", nargs="+", choices=sorted(SCALES), default=["small", "medium"])
+    parser.add_argument("--requests", type=int, default=100, help="запросов на HTTP-сценарий")
+    parser.add_argument("--concurrency", type=int, default=8, help="одновременных клиентов")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="файл эталона для сравнения")
+    parser.add_argument("--update-baseline", action="store_true", help="записать результаты в эталон")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--json", dest="json_path", help="записать результаты в JSON-файл")
+    parser.add_argument("--fail-on-regression", action="store_true", help="код возврата 1 при регрессии")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results, regressions = {}, []
+    for scale in args.scale:
+        results[scale] = run_scale(scale, args.requests, args.concurrency)
+        regressions += print_report(scale, results[scale], baseline, args.tolerance)
+
+    document = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "requests": args.requests, "concurrency": args.concurrency},
+        "results": results,
+    }
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+    if args.update_baseline:
+        document["results"] = {**baseline, **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+    if regressions:
+        print(f"\nрегрессии (p50 > эталон × {1 + args.tolerance:.2f}): {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
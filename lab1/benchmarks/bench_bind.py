@@ -0,0 +1,50 @@
+"""Бенчмарк привязки постановки к залу: обычные билеты против виртуальных (lazy=True).
+
+Запуск:
+    cd lab1
+    python3 benchmarks/bench_bind.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from theater import Theater
+from halls import AuditoryHall
+from actions import Setting
+from staff import Director
+from seats import Ticket
+
+
+def measure_bind(sectors: int, rows: int, seats: int, lazy: bool):
+    """Возвращает (секунды, байт памяти) на привязку одной постановки к залу."""
+    Ticket.reset_counter()
+    theater = Theater("Bench")
+    director = Director("Director", 50, 100000.0)
+    theater.add_staff(director)
+    theater.add_hall(AuditoryHall("Hall", sectors, rows, seats, "h1"))
+    theater.add_setting(Setting(2.0, "Play", datetime(2025, 1, 1), director))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    theater.bind_setting_to_hall("Play", "h1", base_price=100.0, lazy=lazy)
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, memory
+
+
+def main():
+    print(f"{'мест':>8} {'режим':>6} {'мс':>9} {'КиБ':>10}")
+    for sectors, rows, seats in ((2, 10, 20), (4, 25, 50), (5, 100, 100)):
+        for lazy in (False, True):
+            elapsed, memory = measure_bind(sectors, rows, seats, lazy)
+            mode = "lazy" if lazy else "eager"
+            print(f"{sectors * rows * seats:>8} {mode:>6} {elapsed * 1e3:>9.2f} {memory / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Бенчмарк расписания: поиск пересечений деревьями интервалов и подбор репетиций.
+
+Сезон из сотен постановок и тысяч репетиций: у каждой постановки зал, режиссёр и
+состав из нескольких актёров общего пула, показы раскиданы по году, репетиции — по
+месяцу перед показом. Замеряются добавление события с поиском пересечений (рядом —
+линейный просмотр всех событий ресурса для сравнения), полный отчёт о пересечениях,
+перестроение индекса после загрузки и жадный подбор репетиций на сезон. Отдельно —
+вставка с поиском пересечений в один сильно загруженный ресурс (дерево против списка).
+
+Запуск:
+    cd lab1
+    python3 benchmarks/bench_scheduling.py
+    python3 benchmarks/bench_scheduling.py --settings 1000 --rehearsals 10
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from actions import Repetition, Setting
+from halls import AuditoryHall
+from scheduling import IntervalTree, Scheduler, plan_rehearsals
+from staff import Actor, Director
+from theater import Theater
+
+SEASON_START = datetime(2025, 9, 1)
+
+
+def build_season(settings: int, rehearsals: int, cast: int = 6, seed: int = 1) -> Tuple[Theater, List[Any]]:
+    """Театр с постановками (без репетиций) и список репетиций к добавлению."""
+    rnd = random.Random(seed)
+    theater = Theater("Bench")
+    halls = [AuditoryHall(f"Hall {i}", 1, 1, 1, f"h{i}") for i in range(max(1, settings // 10))]
+    directors = [Director(f"Director {i}", 50, 1.0) for i in range(max(1, settings // 5))]
+    actors = [Actor(f"Actor {i}", 30, 1.0) for i in range(settings * 2)]
+    for person in directors + actors:
+        theater.add_staff(person)
+    for hall in halls:
+        theater.add_hall(hall)
+
+    events = []
+    for i in range(settings):
+        show = SEASON_START + timedelta(days=rnd.randrange(30, 365), hours=rnd.choice((12, 15, 19)))
+        setting = Setting(rnd.choice((2.0, 2.5, 3.0)), f"Play {i}", show, rnd.choice(directors))
+        theater.add_setting(setting)
+        for actor in rnd.sample(actors, cast):
+            theater.add_actor_to_setting(actor, setting)
+        setting.hall = rnd.choice(halls)
+        theater.scheduler.update(setting)
+        for _ in range(rehearsals):
+            start = show - timedelta(days=rnd.randrange(1, 30), hours=rnd.randrange(0, 8))
+            events.append(Repetition(3.0, f"Репетиция: Play {i}", start.replace(hour=start.hour % 12 + 10), setting))
+    rnd.shuffle(events)
+    return theater, events
+
+
+class LinearIndex:
+    """Для сравнения: события каждого ресурса в списке, пересечения — полным просмотром."""
+
+    def __init__(self, scheduler: Scheduler):
+        self._scheduler = scheduler
+        self._events: Dict[Any, List[Tuple[float, float, Any]]] = {}
+
+    def add(self, event: Any) -> int:
+        start = event.date.timestamp()
+        end = start + event.durability * 3600
+        found = 0
+        for resource in self._scheduler.resources_of(event):
+            booked = self._events.setdefault(resource, [])
+            found += sum(1 for s, e, _ in booked if s < end and e > start)
+            booked.append((start, end, event))
+        return found
+
+
+def bench_hot_resource(events: int, seed: int = 1) -> Tuple[float, float]:
+    """мкс на вставку с поиском пересечений в один ресурс: дерево интервалов и список."""
+    rnd = random.Random(seed)
+    intervals = [(start, start + rnd.uniform(1, 4)) for start in
+                 (rnd.uniform(0, events * 4) for _ in range(events))]
+    tree, booked = IntervalTree(), []
+    tree_time, _ = timed(lambda: [(tree.overlapping(s, e), tree.insert(s, e, None)) for s, e in intervals])
+    linear_time, _ = timed(lambda: [([b for b in booked if b[0] < e and b[1] > s], booked.append((s, e)))
+                                    for s, e in intervals])
+    return tree_time / events * 1e6, linear_time / events * 1e6
+
+
+def timed(call) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = call()
+    return time.perf_counter() - start, result
+
+
+def run(settings: int, rehearsals: int) -> Dict[str, Any]:
+    theater, events = build_season(settings, rehearsals)
+    linear = LinearIndex(theater.scheduler)
+    for setting in theater.performance_manager.settings:
+        linear.add(setting)
+
+    tree_time, conflicts = timed(lambda: sum(len(theater.add_repetition(event)) for event in events))
+    linear_time, linear_conflicts = timed(lambda: sum(linear.add(event) for event in events))
+    assert conflicts == linear_conflicts, (conflicts, linear_conflicts)
+    report_time, report = timed(theater.scheduler.conflicts)
+    rebuild_time, _ = timed(lambda: Scheduler.from_theater(theater))
+
+    # Подбор с чистого листа: только показы, без случайных репетиций
+    clean, _ = build_season(settings, 0)
+    plan_time, plan = timed(lambda: plan_rehearsals(clean.scheduler, clean.performance_manager.settings,
+                                                    count=rehearsals, hours=3.0, not_before=SEASON_START))
+    return {
+        "events": len(events) + settings,
+        "add_us": tree_time / len(events) * 1e6,
+        "linear_add_us": linear_time / len(events) * 1e6,
+        "conflicts": len(report),
+        "report_ms": report_time * 1e3,
+        "rebuild_ms": rebuild_time * 1e3,
+        "plan_ms": plan_time * 1e3,
+        "planned": len(plan.slots),
+        "unscheduled": sum(plan.unscheduled.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--settings", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--rehearsals", type=int, default=10, help="репетиций на постановку")
+    args = parser.parse_args()
+
+    print(f"{'постановок':>10} {'событий':>8} {'мкс/добавл.':>12} {'линейно, мкс':>13} {'пересеч.':>9} "
+          f"{'отчёт, мс':>10} {'индекс, мс':>11} {'подбор, мс':>11} {'слотов':>7} {'не влезло':>10}")
+    for settings in args.settings:
+        row = run(settings, args.rehearsals)
+        print(f"{settings:>10} {row['events']:>8} {row['add_us']:>12.1f} {row['linear_add_us']:>13.1f} "
+              f"{row['conflicts']:>9} {row['report_ms']:>10.1f} {row['rebuild_ms']:>11.1f} "
+              f"{row['plan_ms']:>11.1f} {row['planned']:>7} {row['unscheduled']:>10}")
+
+    print(f"\n{'событий ресурса':>16} {'дерево, мкс':>12} {'список, мкс':>12}")
+    for events in (1000, 10000, 50000):
+        tree_us, linear_us = bench_hot_resource(events)
+        print(f"{events:>16} {tree_us:>12.1f} {linear_us:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Бенчмарк продажи билетов: задержка Theater.sell_ticket в зависимости от числа билетов.
+
+Запуск:
+    cd lab1
+    python3 benchmarks/bench_sell_ticket.py
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from theater import Theater
+from halls import AuditoryHall
+from actions import Setting
+from staff import Director
+from seats import Ticket
+
+
+def build_theater(halls_count: int, sectors: int = 4, rows: int = 25, seats: int = 25) -> Theater:
+    """Создаёт театр с halls_count залами, к каждому привязана своя постановка."""
+    Ticket.reset_counter()
+    theater = Theater("Bench")
+    director = Director("Director", 50, 100000.0)
+    theater.add_staff(director)
+    for i in range(halls_count):
+        hall_id = f"h{i}"
+        theater.add_hall(AuditoryHall(f"Hall {i}", sectors, rows, seats, hall_id))
+        theater.add_setting(Setting(2.0, f"Play {i}", datetime(2025, 1, 1), director))
+        theater.bind_setting_to_hall(f"Play {i}", hall_id, base_price=100.0)
+    return theater
+
+
+def measure_sales(theater: Theater, sales: int = 1000) -> float:
+    """Продаёт sales билетов равномерно по всему списку и возвращает среднюю задержку (мкс)."""
+    tickets = theater.ticket_manager.tickets
+    step = max(1, len(tickets) // sales)
+    ids = [tickets[i].ticket_id for i in range(0, len(tickets), step)][:sales]
+    start = time.perf_counter()
+    for ticket_id in ids:
+        theater.sell_ticket(ticket_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    print(f"{'залов':>6} {'билетов':>9} {'мкс/продажа':>12}")
+    for halls_count in (1, 4, 16, 64):
+        theater = build_theater(halls_count)
+        latency = measure_sales(theater)
+        print(f"{halls_count:>6} {len(theater.ticket_manager.tickets):>9} {latency:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Бенчмарк сохранения и загрузки снимка: JSON против бинарного формата.
+
+Синтетический театр: 10 залов по 10 000 мест, по постановке на зал
+(100 000 обычных билетов), продана примерно треть билетов. С --lazy билеты
+виртуальные (TicketBlock): объектами хранятся только проданные.
+
+Запуск:
+    cd lab1
+    python3 benchmarks/bench_snapshot.py
+    python3 benchmarks/bench_snapshot.py --lazy
+"""
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from theater import Theater
+from halls import AuditoryHall
+from actions import Setting
+from staff import Director, Actor
+from seats import Ticket
+
+HALLS = 10
+SECTORS, ROWS, SEATS = 4, 25, 100
+REPEATS = 3
+
+
+def build_theater(lazy: bool = False) -> Theater:
+    Ticket.reset_counter()
+    theater = Theater("Bench")
+    director = Director("Director", 50, 100000.0)
+    theater.add_staff(director)
+    actors = [Actor(f"Actor {i}", 30, 50000.0, f"Role {i}") for i in range(20)]
+    for actor in actors:
+        theater.add_staff(actor)
+    for h in range(HALLS):
+        theater.add_hall(AuditoryHall(f"Hall {h}", SECTORS, ROWS, SEATS, f"h{h}"))
+        setting = Setting(2.0, f"Play {h}", datetime(2025, 1, 1), director)
+        for actor in actors:
+            setting.add_cast(actor)
+        theater.add_setting(setting)
+        tickets = theater.bind_setting_to_hall(setting.name, f"h{h}", lazy=lazy)
+        theater.sell_tickets([tickets[i].ticket_id for i in range(0, len(tickets), 3)])
+    return theater
+
+
+def measure(theater: Theater, filepath: str, fmt: str):
+    """Возвращает (мс на сохранение, мс на загрузку, КиБ файла) — лучшее из REPEATS запусков."""
+    save_times, load_times = [], []
+    for _ in range(REPEATS):
+        gc.collect()
+        start = time.perf_counter()
+        theater.save_to_file(filepath, fmt)
+        save_times.append(time.perf_counter() - start)
+
+        gc.collect()
+        restored = Theater("Restored")
+        start = time.perf_counter()
+        restored.load_from_file(filepath)
+        load_times.append(time.perf_counter() - start)
+        assert restored.ticket_manager.ticket_count == theater.ticket_manager.ticket_count
+        del restored
+    return min(save_times) * 1e3, min(load_times) * 1e3, os.path.getsize(filepath) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lazy", action="store_true", help="виртуальные билеты (TicketBlock)")
+    args = parser.parse_args()
+
+    theater = build_theater(args.lazy)
+    print(f"билетов: {theater.ticket_manager.ticket_count}, залов: {HALLS}")
+    print(f"{'формат':>8} {'запись, мс':>11} {'чтение, мс':>11} {'КиБ':>10}")
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for fmt, name in (("json", "theater.json"), ("binary", "theater.tsnap")):
+            save_ms, load_ms, size = measure(theater, os.path.join(temp_dir, name), fmt)
+            print(f"{fmt:>8} {save_ms:>11.1f} {load_ms:>11.1f} {size:>10.1f}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Генератор синтетического театра для бенчмарков в нескольких масштабах.
+
+Театр наполняется через TheaterService — так же, как его наполняет веб-интерфейс:
+залы, режиссёры и актёры, постановки с составом, репетиции, костюмы, привязка
+постановок к залам (виртуальные билеты) и продажа доли билетов.
+"""
+import os
+import sys
+from dataclasses import dataclass
+
+LAB1_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(LAB1_DIR, 'backend')
+sys.path.insert(0, os.path.join(LAB1_DIR, 'src'))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.services.theater import TheaterService
+from seats import Ticket
+
+
+@dataclass(frozen=True)
+class Scale:
+    halls: int
+    sectors: int
+    rows: int
+    seats: int
+    actors: int
+    sold_every: int  # продаётся каждый sold_every-й билет
+
+    @property
+    def tickets(self) -> int:
+        return self.halls * self.sectors * self.rows * self.seats
+
+
+SCALES = {
+    "small": Scale(halls=2, sectors=4, rows=10, seats=20, actors=10, sold_every=4),
+    "medium": Scale(halls=10, sectors=4, rows=25, seats=40, actors=50, sold_every=3),
+    "large": Scale(halls=40, sectors=4, rows=25, seats=100, actors=200, sold_every=3),
+}
+
+
+def build_service(scale: Scale) -> TheaterService:
+    """Сервис с театром заданного масштаба; по постановке на зал, у каждой — репетиция."""
+    Ticket.reset_counter()
+    service = TheaterService()
+    service.add_director("Director", 50, 100000.0)
+    actor_names = [f"Actor {i}" for i in range(scale.actors)]
+    for i, name in enumerate(actor_names):
+        service.add_actor(name, 20 + i % 40, 50000.0, f"Role {i}")
+        service.create_costume(f"Costume {i}", "M", "Red")
+        service.assign_costume_to_actor(f"Costume {i}", name)
+    for h in range(scale.halls):
+        hall_id, setting_name = f"h{h}", f"Play {h}"
+        service.add_hall(f"Hall {h}", scale.sectors, scale.rows, scale.seats, hall_id)
+        service.add_setting(setting_name, 2.0, f"2025-01-{h % 28 + 1:02d}T19:00", "Director")
+        for name in actor_names[h % scale.actors::max(1, scale.halls)]:
+            service.add_actor_to_setting(name, setting_name)
+        service.add_repetition(setting_name, f"2024-12-{h % 28 + 1:02d}T12:00", 3.0)
+        tickets = service.bind_setting_to_hall(setting_name, hall_id, 100.0).payload
+        service.sell_tickets([tickets[i].ticket_id for i in range(0, len(tickets), scale.sold_every)])
+    return service
+
+
+def free_ticket_ids(service: TheaterService, limit: int) -> list:
+    """До limit свободных билетов, поровну из всех залов."""
+    partitions = service.theater.ticket_manager.partitions
+    per_partition = -(-limit // len(partitions))
+    ids = []
+    for partition in partitions:
+        free = (t.ticket_id for t in partition.iter_from() if not t.is_sold and t.held_by is None)
+        ids.extend(ticket_id for ticket_id, _ in zip(free, range(per_partition)))
+    return ids[:limit]
@@ -1,7 +1,6 @@
 from .theater import *
 from .staff import *
 from .managers import *
-from .serialization import Serializer, serializable, register_builtin_types
 from .exception import *
 
 __all__ = [
@@ -13,14 +12,12 @@ __all__ = [
     'Director', 'Actor', 'Staff', 'Person', 'CostumeDesigner',
     
     # Менеджеры
-    'StaffManager', 'HallManager', 'PerformanceManager', 'TicketManager', 'ResourceManager',
+    'StaffManager', 'HallManager', 'PerformanceManager', 'TicketManager', 'TicketPartition', 'ResourceManager',
+    'HallLockRegistry',
     
     # Исключения
     'TheaterException', 'InvalidSeatException', 'TicketNotFoundException', 'InvalidDateException',
     
-    # Сериализация
-    'Serializer', 'serializable', 'register_builtin_types',
-    
     # Типы
     'StaffType', 'ActionType',
 ]
\ No newline at end of file
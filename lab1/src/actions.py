@@ -37,33 +37,51 @@ class Setting(Action):
     def add_cast(self, actor: Any):
         self.cast.append(actor)
 
-    def bind_to_hall(self, hall: "AuditoryHall", base_price: float = 100.0) -> List["Ticket"]:
-        """Привязывает постановку к залу и создаёт билеты."""
-        from seats import Ticket
+    def bind_to_hall(self, hall: "AuditoryHall", base_price: float = 100.0, lazy: bool = False,
+                     first_id: Optional[int] = None) -> List["Ticket"]:
+        """Привязывает постановку к залу и создаёт билеты.
+
+        При lazy=True вместо списка билетов создаётся TicketBlock: билеты выводятся
+        по требованию, а реальными объектами становятся только проданные.
+        Билеты получают ID подряд начиная с first_id (по умолчанию — следующие свободные).
+        """
+        from seats import Ticket, TicketBlock
 
         self.hall = hall
         self.base_price = base_price
-        self.tickets = []
+        price_table = self.sector_prices(hall.sectors)
 
+        if lazy:
+            self.tickets = TicketBlock(self, hall, price_table, first_id)
+            return self.tickets
+
+        next_id = Ticket._claim_ids(first_id, hall.capacity)
+        self.tickets = []
         for sector_idx in range(hall.sectors):
             for row_idx in range(hall.rows_per_sector):
                 for seat_idx in range(hall.seats_per_row):
-                    price_multiplier = 1.0 - (sector_idx * 0.2)
-                    price = max(self.base_price * price_multiplier, self.base_price * 0.5)
-
                     ticket = Ticket(
-                        price=price,
+                        price=price_table[sector_idx],
                         setting=self,
                         sector=sector_idx,
                         row=row_idx,
                         seat=seat_idx,
                         hall_id=hall.hall_id,
-                        hall_obj=hall
+                        hall_obj=hall,
+                        ticket_id=str(next_id)
                     )
+                    next_id += 1
                     self.tickets.append(ticket)
         return self.tickets
 
+    def sector_prices(self, sectors: int) -> List[float]:
+        """Цена билета по секторам: каждый следующий сектор на 20% дешевле, но не ниже 50%."""
+        return [max(self.base_price * (1.0 - sector_idx * 0.2), self.base_price * 0.5)
+                for sector_idx in range(sectors)]
+
     def to_dict(self) -> Dict[str, Any]:
+        from seats import TicketBlock
+
         base = super().to_dict()
         base.update({
             "__type__": "setting",
@@ -71,8 +89,11 @@ class Setting(Action):
             "director": self.director.to_dict(),
             "hall_id": self.hall.hall_id if self.hall else None,
             "base_price": self.base_price,
-            "tickets": [t.to_dict() for t in self.tickets]
         })
+        if isinstance(self.tickets, TicketBlock):
+            base.update({"tickets": [], "ticket_block": self.tickets.to_dict()})
+        else:
+            base["tickets"] = [t.to_dict() for t in self.tickets]
         return base
 
     @classmethod
@@ -94,14 +115,24 @@ class Setting(Action):
         setting.base_price = data.get("base_price", 100.0)
         setting._pending_hall_id = data.get("hall_id")
         setting._pending_tickets_data = data.get("tickets", [])
+        setting._pending_ticket_block = data.get("ticket_block")
         return setting
 
     def link_hall_and_tickets(self, hall: "AuditoryHall", ticket_manager: Any):
         """Восстанавливает связи после загрузки из JSON."""
-        from seats import Ticket
+        from seats import Ticket, TicketBlock
 
         self.hall = hall
 
+        block_data = getattr(self, "_pending_ticket_block", None)
+        if block_data:
+            self.tickets = TicketBlock.from_dict(block_data, self, hall)
+            ticket_manager.add_block(self.tickets)
+            for ticket in self.tickets.stored_tickets:
+                if ticket.is_sold:
+                    hall.seat_map.occupy(ticket.sector, ticket.row, ticket.seat)
+            self._pending_ticket_block = None
+
         # Восстанавливаем билеты и занимаем места для проданных
         for ticket_data in self._pending_tickets_data:
             ticket = Ticket.from_dict(ticket_data)
@@ -112,7 +143,7 @@ class Setting(Action):
 
             # Если билет продан - занимаем место
             if ticket.is_sold:
-                hall.seats[ticket.sector][ticket.row][ticket.seat].is_occupied = True
+                hall.seat_map.occupy(ticket.sector, ticket.row, ticket.seat)
 
         self._pending_tickets_data = []
         self._pending_hall_id = None
@@ -0,0 +1,254 @@
+"""Аналитика продаж: выручка и заполненность в разрезах постановки, зала, сектора,
+ряда, ценового диапазона и даты показа.
+
+Состояние билетов выгружается в столбцы NumPy (по массиву на атрибут), а группировка
+и суммы считаются векторно: np.unique по ключам и np.bincount с весами. Столбцы
+каждого раздела (постановка в зале) кэшируются по его версии, поэтому повторный
+отчёт пересобирает только те залы, где с прошлого раза что-то продали или удержали.
+"""
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DIMENSIONS = ("setting", "hall", "sector", "row", "price_band", "date")
+DEFAULT_BAND_WIDTH = 50.0
+NO_DATE = -1
+# Сколько собранных наборов столбцов (по фильтрам постановки и зала) держать в кэше
+ASSEMBLED_CACHE_SIZE = 32
+
+
+class TicketColumns:
+    """Билеты в виде столбцов одинаковой длины.
+
+    setting, hall и date — коды, расшифровка которых лежит в settings, halls
+    (порядковый номер в списке) и в date (порядковый номер дня, NO_DATE — без даты).
+    """
+
+    FIELDS = ("setting", "hall", "date", "sector", "row", "price", "sold", "held")
+
+    def __init__(self, settings: List[Optional[str]], halls: List[str], **columns: np.ndarray):
+        self.settings = settings
+        self.halls = halls
+        for name in self.FIELDS:
+            setattr(self, name, columns[name])
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def group(self, by: Sequence[str], band_width: float = DEFAULT_BAND_WIDTH) -> List[Dict[str, Any]]:
+        """Агрегаты по сочетаниям значений измерений by (подмножество DIMENSIONS).
+
+        Для каждой группы: всего мест, продано, удержано, свободно, выручка,
+        заполненность (доля проданных) и средняя цена проданного билета. Ряд — номер
+        ряда в секторе: для отдельного ряда группируйте по ("sector", "row").
+        """
+        unknown = [name for name in by if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Неизвестные измерения: {', '.join(unknown)}")
+        if band_width <= 0:
+            raise ValueError("Ширина ценового диапазона должна быть положительной")
+        if not len(self):
+            return []
+
+        # Значения измерений — небольшие целые, поэтому ключ группы — номер ячейки в плотной
+        # решётке их диапазонов, и группировка обходится без сортировки
+        lows, codes, sizes = [], [], []
+        for name in by:
+            column = _dimension(self, name, band_width)
+            low = int(column.min())
+            lows.append(low)
+            codes.append(column - low)
+            sizes.append(int(column.max()) - low + 1)
+        cells = int(np.prod(sizes, dtype=np.float64))
+        if cells > max(len(self), 1 << 16):
+            keys, group_of = np.unique(np.ravel_multi_index(codes, sizes), return_inverse=True)
+        else:
+            flat = np.ravel_multi_index(codes, sizes) if codes else np.zeros(len(self), dtype=np.int64)
+            keys = np.flatnonzero(np.bincount(flat, minlength=cells))
+            rank = np.zeros(cells, dtype=np.int64)
+            rank[keys] = np.arange(len(keys))
+            group_of = rank[flat]
+        key_codes = np.unravel_index(keys, sizes) if codes else ()
+        totals = _totals(self, group_of.reshape(-1), len(keys))
+
+        groups = []
+        for g in range(len(keys)):
+            key = {name: _label(self, name, lows[d] + int(key_codes[d][g]), band_width) for d, name in enumerate(by)}
+            groups.append({"key": key, **{field: column[g].item() for field, column in totals.items()}})
+        return groups
+
+    def summary(self) -> Dict[str, Any]:
+        """Итоги по всем билетам."""
+        groups = self.group(())
+        if groups:
+            return {k: v for k, v in groups[0].items() if k != "key"}
+        return {"total": 0, "sold": 0, "held": 0, "available": 0,
+                "revenue": 0.0, "occupancy": 0.0, "average_price": 0.0}
+
+
+class TicketAnalytics:
+    """Выгрузка билетов театра в столбцы с кэшем столбцов каждого раздела по его версии."""
+
+    def __init__(self):
+        # (постановка, зал) -> (состояние раздела, столбцы раздела)
+        self._cache: Dict[Tuple[Optional[str], str], Tuple[Tuple[Any, int, int, int], Dict[str, np.ndarray]]] = {}
+        # Фильтр (постановка, зал) -> (состояния разделов, собранные столбцы)
+        self._assembled: Dict[Tuple[Optional[str], Optional[str]],
+                              Tuple[List[Tuple[Any, int, int, int]], TicketColumns]] = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._assembled.clear()
+
+    def columns(self, theater: Any, setting: Optional[str] = None,
+                hall_id: Optional[str] = None) -> TicketColumns:
+        """Столбцы билетов театра (или одной постановки и/или зала)."""
+        ticket_manager = theater.ticket_manager
+        partitions = [partition for partition in (ticket_manager.partitions_for_setting(setting)
+                                                  if setting is not None else ticket_manager.partitions)
+                      if hall_id is None or partition.hall_id == hall_id]
+        # Состояния читаются под блокировками залов: продажа и установка цены меняют их там же
+        with ticket_manager.locks.locked(partition.hall_id for partition in partitions):
+            states = [_state(partition) for partition in partitions]
+        with self._lock:
+            assembled = self._assembled.get((setting, hall_id))
+        if assembled is not None and _same_states(assembled[0], states):
+            return assembled[1]
+
+        setting_codes: Dict[Optional[str], int] = {}
+        hall_codes: Dict[str, int] = {}
+        parts = []
+        states = []
+        for partition in partitions:
+            state, columns = self._partition_columns(ticket_manager, partition)
+            states.append(state)
+            size = len(columns["price"])
+            parts.append({
+                "setting": np.full(size, setting_codes.setdefault(partition.setting_name, len(setting_codes)),
+                                   dtype=np.int64),
+                "hall": np.full(size, hall_codes.setdefault(partition.hall_id, len(hall_codes)), dtype=np.int64),
+                "date": np.full(size, _date_ordinal(theater, partition.setting_name), dtype=np.int64),
+                **columns,
+            })
+        columns = TicketColumns(list(setting_codes), list(hall_codes),
+                                **{name: _concat(parts, name) for name in TicketColumns.FIELDS})
+        with self._lock:
+            if len(self._assembled) >= ASSEMBLED_CACHE_SIZE:
+                self._assembled.pop(next(iter(self._assembled)))
+            self._assembled[(setting, hall_id)] = (states, columns)
+        return columns
+
+    def _partition_columns(self, ticket_manager: Any,
+                           partition: Any) -> Tuple[Tuple[Any, int, int, int], Dict[str, np.ndarray]]:
+        """Состояние раздела и его столбцы, снятые вместе под блокировкой зала."""
+        key = (partition.setting_name, partition.hall_id)
+        with ticket_manager.locks.locked([partition.hall_id]):
+            state = _state(partition)
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached is not None and _same_states([cached[0]], [state]):
+                return cached
+            columns = _export_partition(partition)
+        with self._lock:
+            self._cache[key] = (state, columns)
+        return state, columns
+
+
+def _export_partition(partition: Any) -> Dict[str, np.ndarray]:
+    """Столбцы sector, row, price, sold и held одного раздела."""
+    parts = []
+    tickets = partition.own_tickets
+    if tickets:
+        parts.append({
+            "sector": np.fromiter((t.sector for t in tickets), dtype=np.int64, count=len(tickets)),
+            "row": np.fromiter((t.row for t in tickets), dtype=np.int64, count=len(tickets)),
+            "price": np.fromiter((t.price for t in tickets), dtype=np.float64, count=len(tickets)),
+            "sold": np.fromiter((t.is_sold for t in tickets), dtype=bool, count=len(tickets)),
+            "held": np.fromiter((t.held_by is not None for t in tickets), dtype=bool, count=len(tickets)),
+        })
+    for block in partition.blocks:
+        parts.append(_export_block(block))
+    return {name: _concat(parts, name) for name in ("sector", "row", "price", "sold", "held")}
+
+
+def _export_block(block: Any) -> Dict[str, np.ndarray]:
+    """Столбцы виртуальных билетов выводятся из геометрии зала; поштучно — только сохранённые."""
+    hall = block.hall
+    index = np.arange(len(block), dtype=np.int64)
+    sector, rest = np.divmod(index, hall.rows_per_sector * hall.seats_per_row)
+    columns = {
+        "sector": sector,
+        "row": rest // hall.seats_per_row,
+        "price": np.asarray(block.price_table, dtype=np.float64)[sector],
+        "sold": np.zeros(len(block), dtype=bool),
+        "held": np.zeros(len(block), dtype=bool),
+    }
+    for ticket in block.stored_tickets:
+        idx = block.index_of(ticket.ticket_id)
+        columns["price"][idx] = ticket.price
+        columns["sold"][idx] = ticket.is_sold
+        columns["held"][idx] = ticket.held_by is not None
+    return columns
+
+
+def _totals(columns: TicketColumns, group_of: np.ndarray, groups: int) -> Dict[str, np.ndarray]:
+    # Проданные и удержанные места — обычно меньшая часть зала: считаем только по ним
+    sold_of = group_of[columns.sold]
+    total = np.bincount(group_of, minlength=groups)
+    sold = np.bincount(sold_of, minlength=groups)
+    held = np.bincount(group_of[columns.held & ~columns.sold], minlength=groups)
+    revenue = np.bincount(sold_of, weights=columns.price[columns.sold], minlength=groups).astype(np.float64)
+    return {
+        "total": total,
+        "sold": sold,
+        "held": held,
+        "available": total - sold - held,
+        "revenue": np.round(revenue, 2),
+        "occupancy": np.round(sold / np.maximum(total, 1), 4),
+        "average_price": np.round(revenue / np.maximum(sold, 1), 2),
+    }
+
+
+def _dimension(columns: TicketColumns, name: str, band_width: float) -> np.ndarray:
+    if name == "price_band":
+        return np.floor(columns.price / band_width).astype(np.int64)
+    return getattr(columns, name)
+
+
+def _label(columns: TicketColumns, name: str, code: int, band_width: float) -> Any:
+    if name == "setting":
+        return columns.settings[code]
+    if name == "hall":
+        return columns.halls[code]
+    if name in ("sector", "row"):
+        return code + 1
+    if name == "price_band":
+        return f"{code * band_width:g}–{(code + 1) * band_width:g}"
+    return None if code == NO_DATE else date.fromordinal(code).isoformat()
+
+
+def _state(partition: Any) -> Tuple[Any, int, int, int]:
+    # Цена проданного билета назначается после продажи и меняет только price_revision
+    return partition, partition.version, partition.total_count, partition.price_revision
+
+
+def _same_states(cached: List[Tuple[Any, int, int, int]], current: List[Tuple[Any, int, int, int]]) -> bool:
+    return len(cached) == len(current) and all(
+        a[0] is b[0] and a[1:] == b[1:] for a, b in zip(cached, current))
+
+
+def _date_ordinal(theater: Any, setting_name: Optional[str]) -> int:
+    setting = theater.performance_manager.get_setting(setting_name) if setting_name else None
+    show_date = getattr(setting, "date", None)
+    return show_date.toordinal() if hasattr(show_date, "toordinal") else NO_DATE
+
+
+def _concat(parts: List[Dict[str, np.ndarray]], name: str) -> np.ndarray:
+    if not parts:
+        dtype = bool if name in ("sold", "held") else np.float64 if name == "price" else np.int64
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate([part[name] for part in parts])
@@ -1,5 +1,5 @@
-from typing import Dict, Any, List
-from seats import Seat
+from typing import Dict, Any
+from seats import Seat, SeatMap, SeatGridView
 from exception import InvalidSeatException
 
 
@@ -12,27 +12,36 @@ class AuditoryHall:
         self.rows_per_sector = rows_per_sector
         self.seats_per_row = seats_per_row
         self.hall_id = hall_id
-        self.seats = [
-            [[Seat(s) for s in range(seats_per_row)] for r in range(rows_per_sector)]
-            for sec in range(sectors)
-        ]
-        self.audience_count = 0
+        self.seat_map = SeatMap(sectors, rows_per_sector, seats_per_row)
         self.capacity = sectors * rows_per_sector * seats_per_row
 
+    @property
+    def seats(self) -> SeatGridView:
+        """Места в виде [сектор][ряд][место] -> Seat (представление поверх seat_map)."""
+        return SeatGridView(self.seat_map)
+
+    @property
+    def audience_count(self) -> int:
+        return self.seat_map.occupied_count
+
     def is_seat_available(self, sector: int, row: int, seat: int) -> bool:
         if 0 <= sector < self.sectors and 0 <= row < self.rows_per_sector and 0 <= seat < self.seats_per_row:
-            return not self.seats[sector][row][seat].is_occupied
+            return not self.seat_map.is_occupied(sector, row, seat)
         raise InvalidSeatException(f"Неверные координаты места: сектор {sector}, ряд {row}, место {seat}")
 
     def occupy_seat(self, sector: int, row: int, seat: int) -> bool:
         if not self.is_seat_available(sector, row, seat):
             raise InvalidSeatException(f"Место уже занято: сектор {sector}, ряд {row}, место {seat}")
-        self.seats[sector][row][seat].is_occupied = True
-        self.audience_count += 1
+        self.seat_map.occupy(sector, row, seat)
         return True
 
+    def release_seat(self, sector: int, row: int, seat: int) -> bool:
+        """Освобождает место (откат продажи)."""
+        if not (0 <= sector < self.sectors and 0 <= row < self.rows_per_sector and 0 <= seat < self.seats_per_row):
+            raise InvalidSeatException(f"Неверные координаты места: сектор {sector}, ряд {row}, место {seat}")
+        return self.seat_map.release(sector, row, seat)
+
     def to_dict(self) -> Dict[str, Any]:
-        seats_serialized = [[[s.to_dict() for s in row] for row in sector] for sector in self.seats]
         return {
             "__type__": self.__type__,
             "name": self.name,
@@ -40,7 +49,7 @@ class AuditoryHall:
             "rows_per_sector": self.rows_per_sector,
             "seats_per_row": self.seats_per_row,
             "hall_id": self.hall_id,
-            "seats": seats_serialized,
+            "seat_map": self.seat_map.to_base64(),
             "audience_count": self.audience_count,
             "capacity": self.capacity
         }
@@ -48,11 +57,13 @@ class AuditoryHall:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "AuditoryHall":
         hall = cls(data["name"], data["sectors"], data["rows_per_sector"], data["seats_per_row"], data["hall_id"])
-        # Восстанавливаем структуру мест
-        hall.seats = [[[Seat.from_dict(s) for s in row] for row in sector] for sector in data["seats"]]
-        for sector in hall.seats:
-            for row in sector:
-                for seat in row:
-                    seat.is_occupied = False
-        hall.audience_count = 0
+        if "seat_map" in data:
+            hall.seat_map.load_base64(data["seat_map"])
+        else:
+            # Старый формат: каждое место сохранено отдельным словарём
+            for sector_idx, sector in enumerate(data.get("seats", [])):
+                for row_idx, row in enumerate(sector):
+                    for seat_idx, seat_data in enumerate(row):
+                        if Seat.from_dict(seat_data).is_occupied:
+                            hall.seat_map.occupy(sector_idx, row_idx, seat_idx)
         return hall
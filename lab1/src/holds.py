@@ -0,0 +1,118 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from exception import TheaterException, TicketNotFoundException
+
+
+class SeatHold:
+    """Временное удержание набора билетов до момента expires_at."""
+
+    def __init__(self, hold_id: str, tickets: List[Any], expires_at: float):
+        self.hold_id = hold_id
+        self.tickets = tickets
+        self.expires_at = expires_at
+
+    @property
+    def ticket_ids(self) -> List[str]:
+        return [ticket.ticket_id for ticket in self.tickets]
+
+
+class HoldManager:
+    """Удержания билетов с истечением по TTL.
+
+    Сроки хранятся в куче (expires_at, hold_id): истечение просматривает только
+    просроченные удержания, а не все билеты.
+    """
+
+    def __init__(self, ticket_manager: Any, clock: Callable[[], float] = time.monotonic):
+        self._ticket_manager = ticket_manager
+        self._clock = clock
+        self._holds: Dict[str, SeatHold] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._holds)
+
+    def get(self, hold_id: str) -> Optional[SeatHold]:
+        self.expire_due()
+        return self._holds.get(hold_id)
+
+    def hold(self, ticket_ids: List[str], ttl: float, hold_id: Optional[str] = None) -> SeatHold:
+        """Удерживает билеты на ttl секунд: либо все, либо ни одного.
+
+        hold_id задаётся, когда номера броней выдаёт общее хранилище (несколько процессов).
+        """
+        with self._lock:
+            return self._hold(ticket_ids, ttl, hold_id)
+
+    def _hold(self, ticket_ids: List[str], ttl: float, hold_id: Optional[str]) -> SeatHold:
+        self.expire_due()
+        tickets = []
+        for ticket_id in ticket_ids:
+            ticket = self._ticket_manager.get_ticket(ticket_id)
+            if ticket is None:
+                raise TicketNotFoundException(f"Билет с ID '{ticket_id}' не найден")
+            tickets.append(ticket)
+        if not tickets:
+            raise TheaterException("Не выбрано ни одного билета")
+
+        with self._ticket_manager.locks.locked(t.hall_id for t in tickets):
+            # Повторно берём билеты под блокировкой: виртуальный билет мог быть сохранён другим потоком
+            tickets = [self._ticket_manager.get_ticket(t.ticket_id) for t in tickets]
+            for ticket in tickets:
+                if ticket.is_sold:
+                    raise TheaterException(f"Билет {ticket.ticket_id} уже продан")
+                if ticket.held_by is not None:
+                    raise TheaterException(f"Билет {ticket.ticket_id} уже удержан")
+            if hold_id is None:
+                hold_id = str(next(self._ids))
+            elif hold_id in self._holds:
+                raise TheaterException(f"Бронь '{hold_id}' уже существует")
+            hold = SeatHold(hold_id, tickets, self._clock() + ttl)
+            for ticket in tickets:
+                ticket.hold(hold.hold_id)
+                self._ticket_manager.mark_seat_taken(ticket)
+        self._holds[hold.hold_id] = hold
+        heapq.heappush(self._expiry, (hold.expires_at, hold.hold_id))
+        return hold
+
+    def take(self, hold_id: str) -> SeatHold:
+        """Забирает действующее удержание (для подтверждения покупки)."""
+        with self._lock:
+            self.expire_due()
+            hold = self._holds.pop(hold_id, None)
+        if hold is None:
+            raise TheaterException(f"Бронь '{hold_id}' не найдена или истекла")
+        return hold
+
+    def release(self, hold_id: str) -> bool:
+        with self._lock:
+            hold = self._holds.pop(hold_id, None)
+            if hold is None:
+                return False
+            self.release_tickets(hold)
+        return True
+
+    def expire_due(self, now: Optional[float] = None) -> int:
+        """Снимает просроченные удержания; стоимость зависит только от их числа."""
+        now = self._clock() if now is None else now
+        expired = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                _, hold_id = heapq.heappop(self._expiry)
+                if self.release(hold_id):
+                    expired += 1
+        return expired
+
+    def release_tickets(self, hold: SeatHold):
+        """Снимает удержание с ещё не проданных билетов брони."""
+        with self._ticket_manager.locks.locked(t.hall_id for t in hold.tickets):
+            for ticket in hold.tickets:
+                if ticket.held_by == hold.hold_id:
+                    ticket.release_hold(hold.hold_id)
+                    self._ticket_manager.mark_seat_free(ticket)
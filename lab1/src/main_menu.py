@@ -175,13 +175,13 @@ class TheaterCLI:
         durability = self.get_validated_float("Введите продолжительность (в часах): ", min_val=0.1)
         date = self.get_validated_date("Введите дату показа (ГГГГ-ММ-ДД): ")
 
-        directors = [s for s in self.theater.staff_manager.staff if isinstance(s, Director)]
+        directors = self.theater.staff_manager.directors
         if not directors:
             print("Нет доступных режиссеров. Сначала добавьте режиссера.")
             choice = self.get_user_input("Создать нового режиссера? Y/N: ")
             if choice.upper() == "Y":
                 self.add_director()
-                directors = [s for s in self.theater.staff_manager.staff if isinstance(s, Director)]
+                directors = self.theater.staff_manager.directors
                 if not directors:
                     return
             else:
@@ -266,7 +266,7 @@ class TheaterCLI:
         rep_choice = self.get_validated_choice("Выберите репетицию: ", len(repetitions))
         selected_rep = repetitions[rep_choice]
 
-        actors = [s for s in self.theater.staff_manager.staff if isinstance(s, Actor)]
+        actors = list(self.theater.staff_manager.actors)
         if not actors:
             print("Нет доступных актеров.")
             return
@@ -543,7 +543,7 @@ class TheaterCLI:
             return
 
         for i, hall in enumerate(halls, 1):
-            occupied = sum(1 for sector in hall.seats for row in sector for seat in row if seat.is_occupied)
+            occupied = hall.audience_count
             print(f"\n{i}. {hall.name} (ID: {hall.hall_id})")
             print(f"   Вместимость: {hall.capacity} | Занято: {occupied} | Свободно: {hall.capacity - occupied}")
 
@@ -611,8 +611,8 @@ class TheaterCLI:
         search_dirs = [".", "..", "../data", "data"]
         found_files = []
         for d in search_dirs:
-            pattern = os.path.join(d, "*.json")
-            found_files.extend(glob.glob(pattern))
+            for pattern in ("*.json", "*.tsnap"):
+                found_files.extend(glob.glob(os.path.join(d, pattern)))
         return sorted(set(os.path.normpath(f) for f in found_files))
 
     def load_theater(self):
@@ -687,7 +687,7 @@ class TheaterCLI:
 
     def add_actor_to_setting(self):
         print("\n--- Добавление актера к постановке ---")
-        actors = [s for s in self.theater.staff_manager.staff if isinstance(s, Actor)]
+        actors = self.theater.staff_manager.actors
         if not actors:
             print("Нет актеров.")
             return
@@ -734,7 +734,7 @@ class TheaterCLI:
 
     def assign_costume_to_actor(self):
         print("\n--- Назначение костюма актеру ---")
-        actors = [s for s in self.theater.staff_manager.staff if isinstance(s, Actor)]
+        actors = self.theater.staff_manager.actors
         if not actors:
             print("Нет актеров.")
             return
@@ -1,6 +1,13 @@
-from typing import List, Dict, Any
+from bisect import bisect_right
+from collections import Counter
+from itertools import chain, groupby
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from staff import Staff, Actor, Director
 from exception import TheaterException, TicketNotFoundException
+from reservations import HallLockRegistry
+from holds import HoldManager
+from seat_finder import FreeSeatIndex
+from seat_status import SeatStatusMap
 
 
 class StaffManager:
@@ -8,13 +15,31 @@ class StaffManager:
 
     def __init__(self):
         self.staff: List[Staff] = []
+        # Типизированные списки и индексы по имени ведутся вместе со staff, без фильтрации при чтении
+        self.actors: List[Actor] = []
+        self.directors: List[Director] = []
+        self._actors_by_name: Dict[str, Actor] = {}
+        self._directors_by_name: Dict[str, Director] = {}
 
     def add_staff(self, staff_member: Staff):
         self.staff.append(staff_member)
+        # При совпадении имён побеждает первый добавленный, как и при линейном поиске
+        if isinstance(staff_member, Actor):
+            self.actors.append(staff_member)
+            self._actors_by_name.setdefault(staff_member.name, staff_member)
+        elif isinstance(staff_member, Director):
+            self.directors.append(staff_member)
+            self._directors_by_name.setdefault(staff_member.name, staff_member)
 
     def get_staff(self) -> List[Staff]:
         return self.staff
 
+    def get_actor(self, name: str) -> Optional[Actor]:
+        return self._actors_by_name.get(name)
+
+    def get_director(self, name: str) -> Optional[Director]:
+        return self._directors_by_name.get(name)
+
     def to_dict(self) -> Dict[str, Any]:
         return {"__type__": self.__type__, "staff": [s.to_dict() for s in self.staff]}
 
@@ -38,15 +63,18 @@ class HallManager:
 
     def __init__(self):
         self.halls: List[Any] = []
+        self._halls_by_id: Dict[str, Any] = {}
 
     def add_hall(self, hall: Any):
         self.halls.append(hall)
+        # При совпадении ID побеждает первый добавленный зал, как и при линейном поиске
+        self._halls_by_id.setdefault(hall.hall_id, hall)
 
     def get_hall_by_id(self, hall_id: str) -> Any:
-        for hall in self.halls:
-            if hall.hall_id == hall_id:
-                return hall
-        raise TheaterException(f"Зал с ID '{hall_id}' не найден")
+        hall = self._halls_by_id.get(hall_id)
+        if hall is None:
+            raise TheaterException(f"Зал с ID '{hall_id}' не найден")
+        return hall
 
     def to_dict(self) -> Dict[str, Any]:
         return {"__type__": self.__type__, "halls": [h.to_dict() for h in self.halls]}
@@ -66,12 +94,23 @@ class PerformanceManager:
     def __init__(self):
         self.settings: List[Any] = []
         self.repetitions: List[Any] = []
+        self._settings_by_name: Dict[str, Any] = {}
+        self._repetitions_by_name: Dict[str, Any] = {}
 
     def add_setting(self, setting: Any):
         self.settings.append(setting)
+        self._settings_by_name.setdefault(setting.name, setting)
 
     def add_repetition(self, repetition: Any):
         self.repetitions.append(repetition)
+        # Репетиции одной постановки называются одинаково: находится первая, как и раньше
+        self._repetitions_by_name.setdefault(repetition.name, repetition)
+
+    def get_setting(self, name: str) -> Optional[Any]:
+        return self._settings_by_name.get(name)
+
+    def get_repetition(self, name: str) -> Optional[Any]:
+        return self._repetitions_by_name.get(name)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -91,23 +130,354 @@ class PerformanceManager:
         return manager
 
 
+class TicketPartition:
+    """Билеты одной постановки в одном зале с поддерживаемыми на лету агрегатами."""
+
+    def __init__(self, setting_name: Optional[str], hall_id: str, listeners: Optional[List[Callable]] = None):
+        self.setting_name = setting_name
+        self.hall_id = hall_id
+        self._listeners = listeners if listeners is not None else []
+        self.blocks: List[Any] = []
+        self.sold_count = 0
+        self._tickets: List[Any] = []
+        self._total = 0
+        self._by_seat: Optional[Dict[Tuple[int, int, int], Any]] = None
+        self._free_index: Optional[FreeSeatIndex] = None
+        self._status: Optional[SeatStatusMap] = None
+        # Номер версии состояния мест: растёт при каждой продаже, удержании и его снятии
+        self.version = 0
+        # Растёт при смене цены проданного билета: места при этом не меняются, а выручка — да
+        self.price_revision = 0
+        # Количество свободных билетов по каждой цене: цен в зале немного (по цене на сектор)
+        self._available_by_price: Dict[float, int] = {}
+
+    @property
+    def tickets(self) -> List[Any]:
+        """Все билеты раздела; виртуальные билеты блоков выводятся на лету."""
+        if not self.blocks:
+            return self._tickets
+        return list(chain(self._tickets, *self.blocks))
+
+    @property
+    def own_tickets(self) -> List[Any]:
+        """Билеты, хранимые объектами вне блоков виртуальных билетов."""
+        return self._tickets
+
+    @property
+    def total_count(self) -> int:
+        return self._total
+
+    @property
+    def available_count(self) -> int:
+        return self._total - self.sold_count
+
+    @property
+    def min_available_price(self) -> float:
+        return min(self._available_by_price) if self._available_by_price else 0.0
+
+    def iter_from(self, offset: int = 0):
+        """Билеты раздела начиная с позиции offset, без построения общего списка."""
+        for idx in range(offset, len(self._tickets)):
+            yield self._tickets[idx]
+        offset = max(0, offset - len(self._tickets))
+        for block in self.blocks:
+            for idx in range(offset, len(block)):
+                yield block[idx]
+            offset = max(0, offset - len(block))
+
+    def iter_matching(self, offset: int = 0, sold: Optional[bool] = None):
+        """(позиция в разделе, билет) начиная с offset; sold — только проданные или только свободные.
+
+        У блоков виртуальных билетов фильтр смотрит на сохранённые билеты, и
+        остальные билеты блока не строятся ради проверки is_sold.
+        """
+        for idx in range(offset, len(self._tickets)):
+            ticket = self._tickets[idx]
+            if sold is None or ticket.is_sold == sold:
+                yield idx, ticket
+        start = len(self._tickets)
+        for block in self.blocks:
+            for idx, ticket in block.iter_filtered(max(0, offset - start), sold):
+                yield start + idx, ticket
+            start += len(block)
+
+    def _add_available(self, price: float, count: int):
+        if count > 0:
+            self._available_by_price[price] = self._available_by_price.get(price, 0) + count
+
+    def add(self, ticket: Any):
+        self._tickets.append(ticket)
+        self._total += 1
+        if self._by_seat is not None:
+            self._by_seat[(ticket.sector, ticket.row, ticket.seat)] = ticket
+        if self._free_index is not None and (ticket.is_sold or ticket.held_by is not None):
+            self._free_index.take(ticket.sector, ticket.row, ticket.seat)
+        if ticket.is_sold:
+            self.sold_count += 1
+        else:
+            self._add_available(ticket.price, 1)
+
+    def add_many(self, tickets: List[Any]):
+        """Добавляет пачку билетов: агрегаты пересчитываются один раз на пачку."""
+        if self._by_seat is not None or self._free_index is not None:
+            for ticket in tickets:
+                self.add(ticket)
+            return
+        self._tickets.extend(tickets)
+        self._total += len(tickets)
+        available = Counter(ticket.price for ticket in tickets if not ticket.is_sold)
+        self.sold_count += len(tickets) - sum(available.values())
+        for price, count in available.items():
+            self._add_available(price, count)
+
+    def add_block(self, block: Any):
+        self.blocks.append(block)
+        self._total += len(block)
+        sold_by_sector: Dict[int, int] = {}
+        for ticket in block.stored_tickets:
+            if ticket.is_sold:
+                sold_by_sector[ticket.sector] = sold_by_sector.get(ticket.sector, 0) + 1
+        per_sector = len(block) // len(block.price_table) if block.price_table else 0
+        for sector, price in enumerate(block.price_table):
+            self._add_available(price, per_sector - sold_by_sector.get(sector, 0))
+        self.sold_count += sum(sold_by_sector.values())
+
+    def ticket_at(self, sector: int, row: int, seat: int) -> Optional[Any]:
+        """Билет на конкретное место (при повторной привязке — из последней)."""
+        if self.blocks:
+            return self.blocks[-1].ticket_at(sector, row, seat)
+        if self._by_seat is None:
+            self._by_seat = {(t.sector, t.row, t.seat): t for t in self._tickets}
+        return self._by_seat.get((sector, row, seat))
+
+    def free_seats(self, hall: Any) -> FreeSeatIndex:
+        """Индекс свободных мест раздела; строится при первом обращении и далее обновляется."""
+        if self._free_index is None:
+            stored = [t for block in self.blocks for t in block.stored_tickets]
+            taken = [(t.sector, t.row, t.seat) for t in chain(self._tickets, stored)
+                     if t.is_sold or t.held_by is not None]
+            self._free_index = FreeSeatIndex(hall.sectors, hall.rows_per_sector, hall.seats_per_row, taken)
+        return self._free_index
+
+    def seat_status(self, hall: Any) -> SeatStatusMap:
+        """Битовые карты состояния мест раздела; строятся при первом обращении и далее обновляются."""
+        if self._status is None:
+            status = SeatStatusMap(hall.sectors, hall.rows_per_sector, hall.seats_per_row, self.version)
+            stored = [t for block in self.blocks for t in block.stored_tickets]
+            for ticket in chain(self._tickets, stored):
+                if ticket.is_sold:
+                    status.sold.occupy(ticket.sector, ticket.row, ticket.seat)
+                elif ticket.held_by is not None:
+                    status.held.occupy(ticket.sector, ticket.row, ticket.seat)
+            self._status = status
+        return self._status
+
+    def _note_status(self, ticket: Any):
+        self.version += 1
+        if self._status is not None:
+            self._status.set(ticket, self.version)
+        for listener in self._listeners:
+            listener(self, ticket)
+
+    def mark_taken(self, ticket: Any):
+        if self._free_index is not None:
+            self._free_index.take(ticket.sector, ticket.row, ticket.seat)
+        self._note_status(ticket)
+
+    def mark_free(self, ticket: Any):
+        if self._free_index is not None:
+            self._free_index.free(ticket.sector, ticket.row, ticket.seat)
+        self._note_status(ticket)
+
+    def find_best_seats(self, hall: Any, count: int, max_price: Optional[float] = None) -> List[Any]:
+        """Лучший блок из count соседних свободных мест в одном ряду (или пустой список)."""
+        if count <= 0 or self._total == 0:
+            return []
+
+        def sector_allowed(sector: int) -> bool:
+            ticket = self.ticket_at(sector, 0, 0)
+            return ticket is not None and (max_price is None or ticket.price <= max_price)
+
+        found = self.free_seats(hall).find_best(count, sector_allowed)
+        if found is None:
+            return []
+        sector, row, first = found
+        return [self.ticket_at(sector, row, seat) for seat in range(first, first + count)]
+
+    def reprice(self, ticket: Any, price: float):
+        """Назначает цену проданному билету (например, динамическую цену момента продажи)."""
+        ticket.price = price
+        self.price_revision += 1
+
+    def record_sale(self, ticket: Any):
+        self.sold_count += 1
+        left = self._available_by_price.get(ticket.price, 0) - 1
+        if left > 0:
+            self._available_by_price[ticket.price] = left
+        else:
+            self._available_by_price.pop(ticket.price, None)
+        # Подписчики уведомляются последними и видят уже обновлённые агрегаты
+        self.mark_taken(ticket)
+
+
 class TicketManager:
     __type__ = "ticket_manager"
 
     def __init__(self):
-        self.tickets: List[Any] = []
+        self._tickets: List[Any] = []
+        self._tickets_by_id: Dict[str, Any] = {}
+        # Блоки виртуальных билетов, упорядоченные по первому ID для бинарного поиска
+        self._blocks: List[Any] = []
+        self._block_starts: List[int] = []
+        self._partitions: Dict[Tuple[Optional[str], str], TicketPartition] = {}
+        self._partitions_by_setting: Dict[Optional[str], List[TicketPartition]] = {}
+        self.locks = HallLockRegistry()
+        self.holds = HoldManager(self)
+        # Подписчики на изменения состояния мест: вызываются как listener(раздел, билет)
+        # под блокировкой зала, поэтому должны быть быстрыми и не блокирующими
+        self.seat_listeners: List[Callable[[TicketPartition, Any], None]] = []
+
+    @property
+    def tickets(self) -> List[Any]:
+        """Все билеты; виртуальные билеты блоков выводятся на лету."""
+        if not self._blocks:
+            return self._tickets
+        return list(chain(self._tickets, *self._blocks))
+
+    @property
+    def ticket_count(self) -> int:
+        return len(self._tickets) + sum(len(block) for block in self._blocks)
+
+    @property
+    def partitions(self) -> List[TicketPartition]:
+        return list(self._partitions.values())
+
+    def iter_tickets(self):
+        """Итератор по всем билетам без построения общего списка."""
+        return chain(self._tickets, *self._blocks)
+
+    def iter_sold_tickets(self):
+        """Проданные билеты; у блоков просматриваются только сохранённые билеты."""
+        for ticket in self._tickets:
+            if ticket.is_sold:
+                yield ticket
+        for block in self._blocks:
+            for ticket in block.stored_tickets:
+                if ticket.is_sold:
+                    yield ticket
 
     def add_ticket(self, ticket: Any):
-        self.tickets.append(ticket)
+        self._tickets.append(ticket)
+        self._tickets_by_id.setdefault(ticket.ticket_id, ticket)
+        self._partition_for(ticket.setting, ticket.hall_id).add(ticket)
+
+    def add_block(self, block: Any):
+        """Регистрирует блок виртуальных билетов (ленивая привязка постановки к залу)."""
+        pos = bisect_right(self._block_starts, block.first_id)
+        self._block_starts.insert(pos, block.first_id)
+        self._blocks.insert(pos, block)
+        self._partition_for(block.setting, block.hall_id).add_block(block)
+
+    def _partition_for(self, setting: Any, hall_id: str) -> TicketPartition:
+        setting_name = setting.name if setting else None
+        key = (setting_name, hall_id)
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = TicketPartition(setting_name, hall_id, self.seat_listeners)
+            self._partitions[key] = partition
+            self._partitions_by_setting.setdefault(setting_name, []).append(partition)
+        return partition
+
+    def add_tickets(self, tickets: List[Any]):
+        """Добавляет пачку билетов (например, после привязки постановки к залу).
+
+        Подряд идущие билеты одного раздела добавляются в него одним вызовом.
+        """
+        tickets = list(tickets)
+        self._tickets.extend(tickets)
+        by_id = self._tickets_by_id
+        for ticket in tickets:
+            by_id.setdefault(ticket.ticket_id, ticket)
+        for _, group in groupby(tickets, key=lambda t: (t.setting, t.hall_id)):
+            group = list(group)
+            self._partition_for(group[0].setting, group[0].hall_id).add_many(group)
 
     def get_all_tickets(self) -> List[Any]:
         return self.tickets
 
-    def sell_ticket(self, ticket_id: str, hall_manager: HallManager) -> bool:
-        ticket = next((t for t in self.tickets if t.ticket_id == ticket_id), None)
+    def get_ticket(self, ticket_id: str) -> Optional[Any]:
+        """Возвращает билет по ID (O(1) для обычных, O(log блоков) для виртуальных) или None."""
+        ticket = self._tickets_by_id.get(ticket_id)
+        if ticket is not None or not self._blocks:
+            return ticket
+        try:
+            pos = bisect_right(self._block_starts, int(ticket_id)) - 1
+        except ValueError:
+            return None
+        return self._blocks[pos].get(ticket_id) if pos >= 0 else None
+
+    def get_partition(self, setting_name: str, hall_id: str) -> Optional[TicketPartition]:
+        """Билеты постановки в конкретном зале или None."""
+        return self._partitions.get((setting_name, hall_id))
+
+    def partitions_for_setting(self, setting_name: str) -> List[TicketPartition]:
+        """Все разделы постановки (по одному на зал) в порядке привязки."""
+        return self._partitions_by_setting.get(setting_name, [])
+
+    def mark_seat_taken(self, ticket: Any):
+        """Сообщает индексу свободных мест, что место удержано."""
+        self._partition_for(ticket.setting, ticket.hall_id).mark_taken(ticket)
+
+    def mark_seat_free(self, ticket: Any):
+        self._partition_for(ticket.setting, ticket.hall_id).mark_free(ticket)
+
+    def set_sold_price(self, ticket: Any, price: float):
+        """Меняет цену проданного билета под блокировкой зала, как и саму продажу."""
+        with self.locks.locked([ticket.hall_id]):
+            self._partition_for(ticket.setting, ticket.hall_id).reprice(ticket, price)
+
+    def sell_ticket(self, ticket_id: str, hall_manager: HallManager, hold_id: Optional[str] = None) -> bool:
+        self.holds.expire_due()
+        ticket = self.get_ticket(ticket_id)
         if not ticket:
             raise TicketNotFoundException(f"Билет с ID '{ticket_id}' не найден")
-        return ticket.sell_ticket()
+        # Проверка «не продан» и продажа выполняются атомарно под блокировкой зала
+        with self.locks.locked([ticket.hall_id]):
+            # Повторно берём билет под блокировкой: виртуальный билет мог быть сохранён другим потоком,
+            # а индексы и подписчики должны получить сохранённый экземпляр
+            ticket = self.get_ticket(ticket_id)
+            result = ticket.sell_ticket(hold_id)
+            self._partition_for(ticket.setting, ticket.hall_id).record_sale(ticket)
+        return result
+
+    def sell_tickets(self, ticket_ids: List[str], hall_manager: HallManager,
+                     hold_id: Optional[str] = None) -> List[Any]:
+        """Продаёт все билеты или ни одного: при ошибке уже проданные билеты откатываются."""
+        self.holds.expire_due()
+        if len(set(ticket_ids)) != len(ticket_ids):
+            raise TheaterException("Билеты в покупке повторяются")
+        tickets = []
+        for ticket_id in ticket_ids:
+            ticket = self.get_ticket(ticket_id)
+            if not ticket:
+                raise TicketNotFoundException(f"Билет с ID '{ticket_id}' не найден")
+            tickets.append(ticket)
+
+        with self.locks.locked(ticket.hall_id for ticket in tickets):
+            tickets = [self.get_ticket(ticket.ticket_id) for ticket in tickets]
+            previous_holds = [ticket.held_by for ticket in tickets]
+            sold: List[Any] = []
+            try:
+                for ticket in tickets:
+                    ticket.sell_ticket(hold_id)
+                    sold.append(ticket)
+            except TheaterException:
+                for ticket, held_by in reversed(list(zip(sold, previous_holds))):
+                    ticket.cancel_sale(held_by)
+                raise
+            for ticket in sold:
+                self._partition_for(ticket.setting, ticket.hall_id).record_sale(ticket)
+        return sold
 
     def to_dict(self) -> Dict[str, Any]:
         # Билеты не сохраняются здесь — они сохраняются в Setting.tickets
@@ -126,6 +496,7 @@ class ResourceManager:
         self.stages: List[Any] = []
         self.costume_rooms: List[Any] = []
         self.costumes: List[Any] = []
+        self._costumes_by_name: Dict[str, Any] = {}
         self.hall_manager = HallManager()
 
     def add_stage(self, stage: Any):
@@ -136,6 +507,10 @@ class ResourceManager:
 
     def add_costume(self, costume: Any):
         self.costumes.append(costume)
+        self._costumes_by_name.setdefault(costume.name, costume)
+
+    def get_costume(self, name: str) -> Optional[Any]:
+        return self._costumes_by_name.get(name)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -0,0 +1,130 @@
+"""Динамическое ценообразование: цена места зависит от заполненности сектора и срока до показа.
+
+Цены считаются векторно сразу для всего зала — массивом NumPy формы
+(сектор, ряд, место) — и кэшируются по версии раздела билетов и по шагу времени,
+поэтому каталог и схема зала показывают актуальные цены без пересчёта по объектам билетов.
+"""
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class PricingPolicy:
+    """Параметры ценовых кривых.
+
+    цена = базовая цена сектора
+           × (1 + occupancy_weight × заполненность_сектора ^ occupancy_exponent)
+           × множитель срока до показа × надбавка за близость ряда к сцене,
+    в пределах [min_factor, max_factor] от базовой цены сектора.
+    """
+
+    def __init__(self, occupancy_weight: float = 0.8, occupancy_exponent: float = 2.0,
+                 early_days: float = 30.0, early_discount: float = 0.1,
+                 last_minute_days: float = 3.0, last_minute_surge: float = 0.25,
+                 row_premium: float = 0.1, min_factor: float = 0.5, max_factor: float = 2.0,
+                 time_step_hours: float = 1.0):
+        if min_factor > max_factor:
+            raise ValueError("min_factor не может быть больше max_factor")
+        self.occupancy_weight = occupancy_weight
+        self.occupancy_exponent = occupancy_exponent
+        self.early_days = early_days
+        self.early_discount = early_discount
+        self.last_minute_days = last_minute_days
+        self.last_minute_surge = last_minute_surge
+        self.row_premium = row_premium
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.time_step_hours = time_step_hours
+
+    def time_factor(self, days_left: float) -> float:
+        """Скидка за раннюю покупку, наценка в последние дни; после начала показа — 1."""
+        if days_left < 0:
+            return 1.0
+        if days_left >= self.early_days:
+            return 1.0 - self.early_discount
+        if days_left <= self.last_minute_days:
+            return 1.0 + self.last_minute_surge * (1.0 - days_left / self.last_minute_days)
+        return 1.0
+
+
+class DynamicPricer:
+    """Вычисляет и кэширует цены всех мест раздела (постановка в зале)."""
+
+    def __init__(self, policy: Optional[PricingPolicy] = None):
+        self.policy = policy or PricingPolicy()
+        # (постановка, зал) -> (раздел, версия раздела, шаг времени, цены, минимум по свободным местам)
+        self._cache: Dict[Tuple[Optional[str], str], Tuple[Any, int, int, np.ndarray, float]] = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def time_bucket(self, setting: Any, now: Optional[datetime] = None) -> int:
+        """Номер шага времени до показа: цены меняются со временем только при его смене."""
+        hours_left = _seconds_left(setting, now) / 3600
+        return int(hours_left // self.policy.time_step_hours)
+
+    def hall_prices(self, setting: Any, hall: Any, partition: Any,
+                    now: Optional[datetime] = None) -> np.ndarray:
+        """Цены всех мест раздела, массив (сектор, ряд, место); занятые места тоже оценены."""
+        return self._entry(setting, hall, partition, now)[0]
+
+    def min_free_price(self, setting: Any, hall: Any, partition: Any,
+                       now: Optional[datetime] = None) -> float:
+        """Самая низкая цена среди свободных мест (0.0, если свободных нет)."""
+        return self._entry(setting, hall, partition, now)[1]
+
+    def quote(self, ticket: Any, setting: Any, hall: Any, partition: Any,
+              now: Optional[datetime] = None) -> float:
+        return float(self.hall_prices(setting, hall, partition, now)[ticket.sector, ticket.row, ticket.seat])
+
+    def _entry(self, setting: Any, hall: Any, partition: Any,
+               now: Optional[datetime]) -> Tuple[np.ndarray, float]:
+        key = (partition.setting_name, partition.hall_id)
+        bucket = self.time_bucket(setting, now)
+        with self._lock:
+            cached = self._cache.get(key)
+        # После загрузки состояния версии разделов начинаются с нуля: сверяем и сам раздел
+        if (cached is not None and cached[0] is partition
+                and cached[1] == partition.version and cached[2] == bucket):
+            return cached[3], cached[4]
+        version = partition.version
+        status = partition.seat_status(hall)
+        taken = seat_mask(status.sold) | seat_mask(status.held)
+        prices = self._evaluate(setting, taken, _seconds_left(setting, now) / 86400)
+        prices.flags.writeable = False
+        free = prices[~taken]
+        min_free = float(free.min()) if free.size else 0.0
+        with self._lock:
+            self._cache[key] = (partition, version, bucket, prices, min_free)
+        return prices, min_free
+
+    def _evaluate(self, setting: Any, taken: np.ndarray, days_left: float) -> np.ndarray:
+        policy = self.policy
+        sectors, rows, seats = taken.shape
+        base = np.asarray(setting.sector_prices(sectors), dtype=np.float64)[:, None, None]
+        occupancy = taken.reshape(sectors, -1).mean(axis=1)[:, None, None]
+        demand = 1.0 + policy.occupancy_weight * occupancy ** policy.occupancy_exponent
+        # Первый ряд (ближе к сцене) дороже последнего на row_premium
+        closeness = 1.0 - np.arange(rows, dtype=np.float64) / max(rows - 1, 1)
+        row_factor = (1.0 + policy.row_premium * closeness)[None, :, None]
+        prices = base * demand * row_factor * policy.time_factor(days_left)
+        prices = np.clip(prices, base * policy.min_factor, base * policy.max_factor)
+        return np.round(np.broadcast_to(prices, (sectors, rows, seats)), 2)
+
+
+def seat_mask(seat_map: Any) -> np.ndarray:
+    """Битовая карта мест как булев массив (сектор, ряд, место)."""
+    bits = np.unpackbits(np.frombuffer(seat_map.to_bytes(), dtype=np.uint8), bitorder="little")
+    shape = (seat_map.sectors, seat_map.rows_per_sector, seat_map.seats_per_row)
+    return bits[:seat_map.size].reshape(shape).astype(bool)
+
+
+def _seconds_left(setting: Any, now: Optional[datetime]) -> float:
+    if not isinstance(setting.date, datetime):
+        return 0.0
+    now = now or datetime.now(setting.date.tzinfo)
+    return (setting.date - now).total_seconds()
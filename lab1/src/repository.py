@@ -0,0 +1,295 @@
+"""SQLite-репозиторий состояния театра.
+
+Билеты лежат в индексированной таблице tickets (постановка, зал, сектор, ряд, место,
+продан): продажа — это UPDATE одной строки, а не перезапись всего файла. Граф
+остальных сущностей (сотрудники, постановки, репетиции, залы) невелик и хранится
+нормализованным снимком без билетов (см. snapshot.py) в таблице documents.
+
+При загрузке в память поднимаются сущности и проданные билеты; у постановок с
+виртуальными билетами (TicketBlock) остальные билеты в память не читаются.
+
+База открывается в режиме WAL, поэтому её могут делить несколько процессов:
+читатели не ждут писателя, а записи упорядочены транзакциями BEGIN IMMEDIATE.
+Таблица changes — журнал команд с номерами версий: процесс, отставший от базы,
+повторяет команды после своей версии вместо полной перезагрузки. Таблица holds —
+удержания мест с общим для процессов сроком (время Unix), чтобы бронь, созданная
+одним процессом, соблюдалась при продаже через другой.
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from snapshot import dump_snapshot, load_snapshot
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_id TEXT PRIMARY KEY,
+    setting TEXT,
+    hall_id TEXT NOT NULL,
+    sector INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    seat INTEGER NOT NULL,
+    price REAL NOT NULL,
+    sold INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tickets_by_seat ON tickets (setting, hall_id, sector, row, seat);
+CREATE INDEX IF NOT EXISTS tickets_by_sold ON tickets (setting, hall_id, sold);
+CREATE TABLE IF NOT EXISTS changes (
+    version INTEGER PRIMARY KEY,
+    command TEXT NOT NULL,
+    args TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS holds (
+    ticket_id TEXT PRIMARY KEY,
+    hold_id TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS holds_by_hold ON holds (hold_id);
+"""
+
+ENTITIES_DOCUMENT = "entities"
+# Сколько миллисекунд ждать, пока другой процесс держит блокировку записи
+BUSY_TIMEOUT_MS = 10000
+
+TicketRow = Tuple[str, Any, str, int, int, int, float, int]
+
+
+class SQLiteTheaterRepository:
+    """Хранилище театра в файле SQLite; соединение разделяется потоками под блокировкой."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Транзакции открываются явно (transaction), вне их каждый запрос фиксируется сразу
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=BUSY_TIMEOUT_MS / 1000)
+        self._lock = threading.RLock()
+        self._depth = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def transaction(self, mode: str = "IMMEDIATE"):
+        """Транзакция на несколько вызовов: вложенные transaction() входят в внешнюю.
+
+        IMMEDIATE сразу берёт блокировку записи, так что проверка и изменение внутри
+        транзакции не перемежаются с записями других процессов; DEFERRED — для
+        согласованного чтения нескольких таблиц.
+        """
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self._conn
+                finally:
+                    self._depth -= 1
+                return
+            self._conn.execute(f"BEGIN {mode}")
+            self._depth = 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._depth = 0
+
+    def data_version(self) -> int:
+        """Меняется, когда изменения в базу зафиксировало другое соединение (PRAGMA data_version)."""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM documents WHERE name = ?", (ENTITIES_DOCUMENT,)).fetchone()
+        return row is None
+
+    def save(self, theater: Any):
+        """Полностью заменяет содержимое базы состоянием театра."""
+        rows = [_ticket_row(t) for t in theater.ticket_manager.iter_tickets()]
+        document = _entities_document(theater)
+        with self.transaction():
+            # Удержания живут только в памяти процессов, а загруженное состояние их не содержит
+            self._conn.execute("DELETE FROM holds")
+            self._conn.execute("DELETE FROM tickets")
+            self._conn.executemany("INSERT INTO tickets VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._write_document(document)
+
+    def save_entities(self, theater: Any):
+        """Перезаписывает граф сущностей; билеты не затрагиваются."""
+        document = _entities_document(theater)
+        with self.transaction():
+            self._write_document(document)
+
+    def add_tickets(self, tickets: Iterable[Any]):
+        """Добавляет строки билетов (например, после привязки постановки к залу)."""
+        rows = [_ticket_row(t) for t in tickets]
+        with self.transaction():
+            self._conn.executemany("INSERT OR REPLACE INTO tickets VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def mark_sold(self, ticket_ids: Iterable[str], prices: Optional[Dict[str, float]] = None,
+                  hold_id: Optional[str] = None) -> int:
+        """Отмечает билеты проданными одной транзакцией; возвращает число изменённых строк.
+
+        prices — цены продажи, если они отличаются от назначенных при привязке к залу.
+        Билет под действующим удержанием продаётся только по его же брони hold_id.
+        """
+        prices = prices or {}
+        ticket_ids = list(ticket_ids)
+        now = time.time()
+        with self.transaction():
+            cursor = self._conn.executemany(
+                "UPDATE tickets SET sold = 1, price = COALESCE(?, price) WHERE ticket_id = ? AND sold = 0 "
+                "AND NOT EXISTS (SELECT 1 FROM holds WHERE holds.ticket_id = tickets.ticket_id "
+                "AND holds.hold_id IS NOT ? AND holds.expires_at > ?)",
+                [(prices.get(ticket_id), ticket_id, hold_id, now) for ticket_id in ticket_ids])
+            sold = cursor.rowcount
+            # Проданные билеты больше не удержаны; чужие действующие удержания остаются
+            self._conn.executemany(
+                "DELETE FROM holds WHERE ticket_id = ? AND (hold_id IS ? OR expires_at <= ?)",
+                [(ticket_id, hold_id, now) for ticket_id in ticket_ids])
+            return sold
+
+    def next_hold_id(self) -> str:
+        """Номер новой брони, единый для всех процессов базы."""
+        with self.transaction():
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'hold_seq'").fetchone()
+            value = (row[0] if row else 0) + 1
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('hold_seq', ?)", (value,))
+        return str(value)
+
+    def add_hold(self, hold_id: str, ticket_ids: Iterable[str], expires_at: float):
+        """Записывает удержание билетов до expires_at (время Unix); просроченные строки удаляются."""
+        with self.transaction():
+            self._conn.execute("DELETE FROM holds WHERE expires_at <= ?", (time.time(),))
+            self._conn.executemany("INSERT OR REPLACE INTO holds VALUES (?, ?, ?)",
+                                   [(ticket_id, hold_id, expires_at) for ticket_id in ticket_ids])
+
+    def release_hold(self, hold_id: str):
+        with self.transaction():
+            self._conn.execute("DELETE FROM holds WHERE hold_id = ?", (hold_id,))
+
+    def active_holds(self) -> List[Tuple[str, List[str], float]]:
+        """Действующие удержания: (номер брони, билеты, срок)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT hold_id, ticket_id, expires_at FROM holds WHERE expires_at > ? ORDER BY hold_id",
+                (time.time(),)).fetchall()
+        holds: Dict[str, Tuple[List[str], float]] = {}
+        for hold_id, ticket_id, expires_at in rows:
+            holds.setdefault(hold_id, ([], expires_at))[0].append(ticket_id)
+        return [(hold_id, ticket_ids, expires_at) for hold_id, (ticket_ids, expires_at) in holds.items()]
+
+    def load(self) -> Any:
+        """Восстанавливает театр: сущности, карты мест и билеты."""
+        with self.transaction("DEFERRED"):
+            row = self._conn.execute(
+                "SELECT body FROM documents WHERE name = ?", (ENTITIES_DOCUMENT,)).fetchone()
+            if row is None:
+                raise ValueError(f"В базе {self.path} нет сохранённого театра")
+            data = json.loads(row[0])
+            for entry in data["settings"]:
+                self._attach_tickets(entry)
+
+        theater = load_snapshot(data)
+        # Карты мест в документе не хранятся: занятые места — это проданные билеты
+        hall_manager = theater.resource_manager.hall_manager
+        for ticket in theater.ticket_manager.iter_sold_tickets():
+            hall_manager.get_hall_by_id(ticket.hall_id).seat_map.occupy(ticket.sector, ticket.row, ticket.seat)
+        return theater
+
+    def current_version(self) -> int:
+        """Номер последней записи журнала изменений (0 — записей ещё не было)."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def append_change(self, command: str, args: Dict[str, Any]) -> int:
+        """Дописывает команду в журнал изменений; возвращает её версию."""
+        body = json.dumps(args, ensure_ascii=False, separators=(",", ":"))
+        with self.transaction():
+            version = self.current_version() + 1
+            self._conn.execute("INSERT INTO changes VALUES (?, ?, ?)", (version, command, body))
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+        return version
+
+    def changes_since(self, version: int) -> Optional[List[Tuple[int, str, Dict[str, Any]]]]:
+        """Команды после version по порядку или None, если часть из них уже удалена из журнала."""
+        with self.transaction("DEFERRED"):
+            current = self.current_version()
+            if current == version:
+                return []
+            rows = self._conn.execute(
+                "SELECT version, command, args FROM changes WHERE version > ? ORDER BY version",
+                (version,)).fetchall()
+        if version > current or not rows or rows[0][0] != version + 1:
+            return None
+        return [(v, command, json.loads(args)) for v, command, args in rows]
+
+    def trim_changes(self, keep: int):
+        """Оставляет в журнале изменений только последние keep записей."""
+        with self.transaction():
+            self._conn.execute("DELETE FROM changes WHERE version <= ?", (self.current_version() - keep,))
+
+    def _attach_tickets(self, entry: Dict[str, Any]):
+        """Подставляет билеты постановки из таблицы tickets в запись снимка."""
+        for other in entry.get("other_halls", []):
+            self._attach_hall_tickets(entry["name"], other)
+        self._attach_hall_tickets(entry["name"], entry)
+
+    def _attach_hall_tickets(self, setting_name: str, entry: Dict[str, Any]):
+        """Билеты постановки в одном зале (текущем или прежнем) — по ключу (постановка, зал)."""
+        if entry.get("hall_id") is None:
+            return
+        key = (setting_name, entry["hall_id"])
+        if "ticket_block" in entry:
+            # У блока в памяти нужны только изменённые билеты — проданные
+            rows = self._conn.execute(
+                "SELECT ticket_id, price, sector, row, seat FROM tickets "
+                "WHERE setting = ? AND hall_id = ? AND sold = 1", key)
+            entry["ticket_block"]["tickets"] = [
+                {"ticket_id": tid, "price": price, "sector": sector, "row": seat_row, "seat": seat,
+                 "hall_id": entry["hall_id"], "setting_name": setting_name, "is_sold": True}
+                for tid, price, sector, seat_row, seat in rows
+            ]
+        else:
+            rows = self._conn.execute(
+                "SELECT ticket_id, price, sector, row, seat, sold FROM tickets "
+                "WHERE setting = ? AND hall_id = ? ORDER BY rowid", key)
+            entry["tickets"] = [(tid, price, sector, seat_row, seat, bool(sold))
+                                for tid, price, sector, seat_row, seat, sold in rows]
+
+    def _write_document(self, document: str):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO documents (name, body) VALUES (?, ?)", (ENTITIES_DOCUMENT, document))
+
+
+def _entities_document(theater: Any) -> str:
+    data = dump_snapshot(theater, tickets=False)
+    for hall in data["halls"]:
+        hall.pop("seat_map", None)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _ticket_row(ticket: Any) -> TicketRow:
+    setting_name = ticket.setting.name if ticket.setting else None
+    return (ticket.ticket_id, setting_name, ticket.hall_id, ticket.sector, ticket.row, ticket.seat,
+            ticket.price, int(ticket.is_sold))
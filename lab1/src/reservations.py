@@ -0,0 +1,38 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable
+
+
+class HallLockRegistry:
+    """Блокировки по залам: продажи в разных залах идут параллельно, в одном — по очереди."""
+
+    def __init__(self):
+        self._locks: Dict[str, threading.RLock] = {}
+        self._guard = threading.Lock()
+
+    def lock_for(self, hall_id: str) -> threading.RLock:
+        lock = self._locks.get(hall_id)
+        if lock is None:
+            with self._guard:
+                lock = self._locks.setdefault(hall_id, threading.RLock())
+        return lock
+
+    @contextmanager
+    def locked(self, hall_ids: Iterable[str]):
+        """Захватывает блокировки залов в отсортированном порядке (без взаимных блокировок)."""
+        locks = [self.lock_for(hall_id) for hall_id in sorted(set(hall_ids))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    @contextmanager
+    def locked_all(self):
+        """Захватывает блокировки всех известных залов (например, для снимка состояния)."""
+        with self._guard:
+            hall_ids = list(self._locks)
+        with self.locked(hall_ids):
+            yield
@@ -0,0 +1,439 @@
+"""Расписание показов и репетиций: поиск пересечений и подбор времени репетиций.
+
+Каждый показ (Setting) и каждая репетиция (Repetition) занимают на время
+[date, date + durability часов) свои ресурсы: зал постановки, её режиссёра и
+актёров (у репетиции — ещё и отмеченных в attendance_list). Для каждого ресурса
+ведётся дерево интервалов, поэтому пересечение находится за O(log n) на вставку,
+а список всех пересечений с событием — за O(log n + k).
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+Resource = Tuple[str, str]  # ("hall", id зала) или ("staff", имя сотрудника)
+
+
+class _Node:
+    __slots__ = ("key", "start", "end", "item", "priority", "max_end", "left", "right")
+
+    def __init__(self, key: Tuple[float, int], end: float, item: Any, priority: float):
+        self.key = key
+        self.start = key[0]
+        self.end = end
+        self.item = item
+        self.priority = priority
+        self.max_end = end
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+    def update(self):
+        self.max_end = self.end
+        if self.left is not None and self.left.max_end > self.max_end:
+            self.max_end = self.left.max_end
+        if self.right is not None and self.right.max_end > self.max_end:
+            self.max_end = self.right.max_end
+
+
+class IntervalTree:
+    """Дерево полуоткрытых интервалов [start, end): декартово дерево по началу
+    интервала, в узлах — наибольший конец в поддереве.
+
+    Вставка и удаление — O(log n) в среднем; first_overlap — O(log n),
+    overlapping — O(log n + k), где k — число найденных интервалов.
+    """
+
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self._size = 0
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, start: float, end: float, item: Any) -> Tuple[float, int]:
+        """Добавляет интервал; возвращает ключ для remove."""
+        self._seq += 1
+        node = _Node((start, self._seq), end, item, random.random())
+        self._root = _insert(self._root, node)
+        self._size += 1
+        return node.key
+
+    def remove(self, key: Tuple[float, int]) -> bool:
+        size = self._size
+        self._root = self._remove(self._root, key)
+        return self._size < size
+
+    def _remove(self, node: Optional[_Node], key: Tuple[float, int]) -> Optional[_Node]:
+        if node is None:
+            return None
+        if key < node.key:
+            node.left = self._remove(node.left, key)
+        elif key > node.key:
+            node.right = self._remove(node.right, key)
+        else:
+            self._size -= 1
+            return _merge(node.left, node.right)
+        node.update()
+        return node
+
+    def first_overlap(self, start: float, end: float) -> Optional[Tuple[float, float, Any]]:
+        """Какой-нибудь интервал, пересекающийся с [start, end), или None."""
+        node = self._root
+        while node is not None:
+            if node.start < end and node.end > start:
+                return node.start, node.end, node.item
+            # Если пересечение есть, оно есть и в левом поддереве, как только там
+            # найдётся интервал, заканчивающийся позже start
+            if node.left is not None and node.left.max_end > start:
+                node = node.left
+            elif node.start < end:
+                node = node.right
+            else:
+                return None
+        return None
+
+    def overlapping(self, start: float, end: float) -> List[Tuple[float, float, Any]]:
+        """Все интервалы, пересекающиеся с [start, end), по возрастанию начала."""
+        found: List[Tuple[float, float, Any]] = []
+        _collect(self._root, start, end, found)
+        return found
+
+    def __iter__(self) -> Iterator[Tuple[float, float, Any]]:
+        stack, node = [], self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.start, node.end, node.item
+            node = node.right
+
+
+def _insert(node: Optional[_Node], new: _Node) -> _Node:
+    if node is None:
+        return new
+    if new.key < node.key:
+        node.left = _insert(node.left, new)
+        if node.left.priority > node.priority:
+            node = _rotate_right(node)
+    else:
+        node.right = _insert(node.right, new)
+        if node.right.priority > node.priority:
+            node = _rotate_left(node)
+    node.update()
+    return node
+
+
+def _rotate_right(node: _Node) -> _Node:
+    top = node.left
+    node.left = top.right
+    top.right = node
+    node.update()
+    return top
+
+
+def _rotate_left(node: _Node) -> _Node:
+    top = node.right
+    node.right = top.left
+    top.left = node
+    node.update()
+    return top
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+def _collect(node: Optional[_Node], start: float, end: float, found: List[Tuple[float, float, Any]]):
+    if node is None or node.max_end <= start:
+        return
+    _collect(node.left, start, end, found)
+    if node.start < end:
+        if node.end > start:
+            found.append((node.start, node.end, node.item))
+        _collect(node.right, start, end, found)
+
+
+class Conflict:
+    """Два события, одновременно занимающие один ресурс."""
+
+    def __init__(self, resource: Resource, event: Any, other: Any):
+        self.resource = resource
+        self.event = event
+        self.other = other
+
+    def __repr__(self) -> str:
+        return f"Conflict({self.resource}, {self.event.name!r}, {self.other.name!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        kind, name = self.resource
+        return {
+            "resource": kind,
+            "name": name,
+            "event": self.event.name,
+            "event_date": _isoformat(self.event.date),
+            "other": self.other.name,
+            "other_date": _isoformat(self.other.date),
+        }
+
+
+class Scheduler:
+    """Индекс занятости залов и сотрудников показами и репетициями.
+
+    События добавляются независимо от пересечений: add и update возвращают
+    найденные пересечения, а решать, отклонять ли событие, — вызывающему коду.
+    После изменения состава или зала постановки её нужно переиндексировать
+    через update (вместе с ней переиндексируются и её репетиции).
+    """
+
+    def __init__(self):
+        self._trees: Dict[Resource, IntervalTree] = {}
+        # id события -> (событие, [(ресурс, ключ в дереве)])
+        self._bookings: Dict[int, Tuple[Any, List[Tuple[Resource, Tuple[float, int]]]]] = {}
+        self._settings: Dict[str, Any] = {}
+        self._repetitions: Dict[str, List[Any]] = {}
+
+    @classmethod
+    def from_theater(cls, theater: Any) -> "Scheduler":
+        scheduler = cls()
+        for setting in theater.performance_manager.settings:
+            scheduler.add(setting)
+        for repetition in theater.performance_manager.repetitions:
+            scheduler.add(repetition)
+        return scheduler
+
+    def __len__(self) -> int:
+        return len(self._bookings)
+
+    def add(self, event: Any) -> List[Conflict]:
+        """Добавляет показ или репетицию; возвращает пересечения с уже добавленными."""
+        if _is_repetition(event):
+            if event.setting is not None:
+                self._repetitions.setdefault(event.setting.name, []).append(event)
+        else:
+            self._settings.setdefault(event.name, event)
+        return self._book(event)
+
+    def remove(self, event: Any):
+        self._unbook(event)
+        if _is_repetition(event):
+            repetitions = self._repetitions.get(event.setting.name, []) if event.setting is not None else []
+            if event in repetitions:
+                repetitions.remove(event)
+        elif self._settings.get(event.name) is event:
+            del self._settings[event.name]
+
+    def update(self, event: Any) -> List[Conflict]:
+        """Переиндексирует событие после смены даты, зала или состава."""
+        events = [event]
+        if not _is_repetition(event):
+            events += self._repetitions.get(event.name, [])
+        conflicts: List[Conflict] = []
+        for item in events:
+            self._unbook(item)
+        for item in events:
+            conflicts += self._book(item)
+        return conflicts
+
+    def attach(self, event: Any, resource: Resource) -> List[Conflict]:
+        """Занимает ресурс событием (для постановки — и всеми её репетициями) без
+        переиндексации остальных ресурсов: например, при добавлении актёра в состав.
+        """
+        events = [event]
+        if not _is_repetition(event):
+            events += self._repetitions.get(event.name, [])
+        conflicts: List[Conflict] = []
+        for item in events:
+            interval = _interval(item)
+            _, bookings = self._bookings.setdefault(id(item), (item, []))
+            if interval is None or any(booked == resource for booked, _ in bookings):
+                continue
+            tree = self._tree(resource)
+            conflicts += [Conflict(resource, item, other) for _, _, other in tree.overlapping(*interval)]
+            bookings.append((resource, tree.insert(interval[0], interval[1], item)))
+        return conflicts
+
+    def conflicts_for(self, event: Any) -> List[Conflict]:
+        """Текущие пересечения добавленного события."""
+        interval = _interval(event)
+        if interval is None:
+            return []
+        conflicts = []
+        for resource in self.resources_of(event):
+            tree = self._trees.get(resource)
+            for _, _, other in tree.overlapping(*interval) if tree is not None else ():
+                if other is not event:
+                    conflicts.append(Conflict(resource, event, other))
+        return conflicts
+
+    def conflicts(self) -> List[Conflict]:
+        """Все пересечения расписания, каждая пара событий на ресурсе — один раз."""
+        conflicts = []
+        for resource, tree in self._trees.items():
+            for start, end, event in tree:
+                for other_start, _, other in tree.overlapping(start, end):
+                    if (other_start, id(other)) > (start, id(event)):
+                        conflicts.append(Conflict(resource, event, other))
+        return conflicts
+
+    def is_free(self, resources: List[Resource], start: float, end: float) -> bool:
+        return all(self._trees[r].first_overlap(start, end) is None for r in resources if r in self._trees)
+
+    def resources_of(self, event: Any) -> List[Resource]:
+        """Зал, режиссёр и актёры события; для репетиции — ещё и отмеченные на ней."""
+        setting = event
+        names: List[str] = []
+        if _is_repetition(event):
+            names = [person.name for person in event.attendance_list]
+            if event.setting is None:
+                return [("staff", name) for name in dict.fromkeys(names)]
+            # После загрузки у репетиции своя копия постановки: состав и зал берём у основной
+            setting = self._settings.get(event.setting.name, event.setting)
+        resources: List[Resource] = []
+        hall_id = setting.hall.hall_id if setting.hall is not None else getattr(setting, "_pending_hall_id", None)
+        if hall_id is not None:
+            resources.append(("hall", hall_id))
+        if setting.director is not None:
+            names.append(setting.director.name)
+        names += [actor.name for actor in setting.cast]
+        resources += [("staff", name) for name in dict.fromkeys(names)]
+        return resources
+
+    def earliest_slot(self, resources: List[Resource], hours: float, not_before: datetime,
+                      deadline: Optional[datetime] = None, day_start: int = 10,
+                      day_end: int = 22) -> Optional[datetime]:
+        """Самое раннее начало после not_before, при котором все ресурсы свободны
+        hours часов подряд в пределах рабочего дня [day_start, day_end) и событие
+        заканчивается не позже deadline; None — если такого времени нет.
+        """
+        duration = timedelta(hours=hours)
+        if duration > timedelta(hours=day_end - day_start) or hours <= 0:
+            return None
+        start = not_before
+        while deadline is None or start + duration <= deadline:
+            day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+            if start < day + timedelta(hours=day_start):
+                start = day + timedelta(hours=day_start)
+            if start + duration > day + timedelta(hours=day_end):
+                start = day + timedelta(days=1, hours=day_start)
+                continue
+            begin, end = start.timestamp(), (start + duration).timestamp()
+            # Сдвигаемся за конец первого найденного пересечения: каждый шаг — O(log n)
+            blocking = [tree.first_overlap(begin, end) for tree in
+                        (self._trees.get(resource) for resource in resources) if tree is not None]
+            blocking = [interval for interval in blocking if interval is not None]
+            if not blocking:
+                if deadline is not None and start + duration > deadline:
+                    return None
+                return start
+            start = datetime.fromtimestamp(max(interval[1] for interval in blocking), start.tzinfo)
+        return None
+
+    def _tree(self, resource: Resource) -> IntervalTree:
+        tree = self._trees.get(resource)
+        if tree is None:
+            tree = self._trees[resource] = IntervalTree()
+        return tree
+
+    def _book(self, event: Any) -> List[Conflict]:
+        interval = _interval(event)
+        bookings: List[Tuple[Resource, Tuple[float, int]]] = []
+        conflicts: List[Conflict] = []
+        if interval is not None:
+            for resource in self.resources_of(event):
+                tree = self._tree(resource)
+                conflicts += [Conflict(resource, event, other) for _, _, other in tree.overlapping(*interval)]
+                bookings.append((resource, tree.insert(interval[0], interval[1], event)))
+        self._bookings[id(event)] = (event, bookings)
+        return conflicts
+
+    def _unbook(self, event: Any):
+        _, bookings = self._bookings.pop(id(event), (event, []))
+        for resource, key in bookings:
+            self._trees[resource].remove(key)
+
+
+class RehearsalPlan:
+    """Предложенное расписание репетиций: слоты и то, что не удалось разместить."""
+
+    def __init__(self):
+        self.slots: List[Tuple[Any, datetime, datetime]] = []
+        self.unscheduled: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "slots": [{"setting": setting.name, "start": start.isoformat(), "end": end.isoformat()}
+                      for setting, start, end in self.slots],
+            "unscheduled": self.unscheduled,
+        }
+
+
+def plan_rehearsals(scheduler: Scheduler, settings: List[Any], count: int, hours: float,
+                    not_before: datetime, day_start: int = 10, day_end: int = 22) -> RehearsalPlan:
+    """Жадно подбирает каждой постановке count репетиций по hours часов до её показа.
+
+    Постановки обходятся по сроку показа (раньше показ — раньше выбор), при равном
+    сроке — сначала с большим составом; каждой репетиции достаётся самое раннее
+    время, когда свободны зал, режиссёр и весь состав. Найденные слоты временно
+    занимают ресурсы, так что репетиции разных постановок не пересекаются между
+    собой; индекс scheduler после планирования остаётся прежним.
+    """
+    plan = RehearsalPlan()
+    booked: List[Any] = []
+    order = sorted((s for s in settings if isinstance(s.date, datetime)),
+                   key=lambda s: (s.date, -len(s.cast)))
+    try:
+        for setting in order:
+            resources = scheduler.resources_of(setting)
+            start = not_before
+            for placed in range(count):
+                slot = scheduler.earliest_slot(resources, hours, start, setting.date, day_start, day_end)
+                if slot is None:
+                    plan.unscheduled[setting.name] = count - placed
+                    break
+                end = slot + timedelta(hours=hours)
+                plan.slots.append((setting, slot, end))
+                placeholder = _Placeholder(setting, slot, hours)
+                scheduler.add(placeholder)
+                booked.append(placeholder)
+                start = end
+    finally:
+        for placeholder in booked:
+            scheduler.remove(placeholder)
+    return plan
+
+
+class _Placeholder:
+    """Предварительно занятый слот репетиции на время планирования."""
+
+    def __init__(self, setting: Any, date: datetime, durability: float):
+        self.name = f"Репетиция: {setting.name}"
+        self.setting = setting
+        self.date = date
+        self.durability = durability
+        self.attendance_list: List[Any] = []
+
+
+def _is_repetition(event: Any) -> bool:
+    return hasattr(event, "attendance_list")
+
+
+def _interval(event: Any) -> Optional[Tuple[float, float]]:
+    if not isinstance(event.date, datetime) or event.durability <= 0:
+        return None
+    start = event.date.timestamp()
+    return start, start + event.durability * 3600
+
+
+def _isoformat(date: Any) -> str:
+    return date.isoformat() if hasattr(date, "isoformat") else str(date)
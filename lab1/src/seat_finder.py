@@ -0,0 +1,117 @@
+from bisect import bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class RowRuns:
+    """Свободные отрезки мест одного ряда: отсортированные полуинтервалы [start, end)."""
+
+    def __init__(self, seats_per_row: int, taken: Iterable[int] = ()):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        start = 0
+        for seat in sorted(set(taken)):
+            if seat > start:
+                self.starts.append(start)
+                self.ends.append(seat)
+            start = seat + 1
+        if start < seats_per_row:
+            self.starts.append(start)
+            self.ends.append(seats_per_row)
+
+    def take(self, seat: int):
+        i = bisect_right(self.starts, seat) - 1
+        if i < 0 or seat >= self.ends[i]:
+            return
+        start, end = self.starts[i], self.ends[i]
+        del self.starts[i], self.ends[i]
+        if seat + 1 < end:
+            self.starts.insert(i, seat + 1)
+            self.ends.insert(i, end)
+        if start < seat:
+            self.starts.insert(i, start)
+            self.ends.insert(i, seat)
+
+    def free(self, seat: int):
+        i = bisect_right(self.starts, seat) - 1
+        if i >= 0 and seat < self.ends[i]:
+            return
+        start, end = seat, seat + 1
+        if i >= 0 and self.ends[i] == seat:
+            start = self.starts[i]
+            del self.starts[i], self.ends[i]
+            i -= 1
+        if i + 1 < len(self.starts) and self.starts[i + 1] == seat + 1:
+            end = self.ends[i + 1]
+            del self.starts[i + 1], self.ends[i + 1]
+        self.starts.insert(i + 1, start)
+        self.ends.insert(i + 1, end)
+
+    def best_block(self, count: int, center: float) -> Optional[Tuple[float, int]]:
+        """Самый близкий к центру блок из count мест: (отклонение от центра, первое место)."""
+        best: Optional[Tuple[float, int]] = None
+        pivot = bisect_right(self.starts, center)
+        # Обходим отрезки от центра в обе стороны и останавливаемся, как только
+        # ближайший край отрезка дальше уже найденного лучшего блока
+        left, right = pivot - 1, pivot
+        while left >= 0 or right < len(self.starts):
+            edge_left = center - (self.ends[left] - 1) if left >= 0 else float("inf")
+            edge_right = self.starts[right] - center if right < len(self.starts) else float("inf")
+            if best is not None and min(edge_left, edge_right) > best[0]:
+                break
+            for i in (left, right):
+                if not 0 <= i < len(self.starts) or self.ends[i] - self.starts[i] < count:
+                    continue
+                first = min(max(round(center - (count - 1) / 2), self.starts[i]), self.ends[i] - count)
+                candidate = (abs(first + (count - 1) / 2 - center), first)
+                if best is None or candidate < best:
+                    best = candidate
+            left, right = left - 1, right + 1
+        return best
+
+
+class FreeSeatIndex:
+    """Индекс свободных отрезков по рядам для поиска лучших соседних мест.
+
+    Поиск стоит O(рядов · log мест): в каждом ряду бинарным поиском находится
+    отрезок у центра ряда, и просматриваются только ближайшие к нему отрезки.
+    """
+
+    def __init__(self, sectors: int, rows_per_sector: int, seats_per_row: int,
+                 taken: Iterable[Tuple[int, int, int]] = ()):
+        self.sectors = sectors
+        self.rows_per_sector = rows_per_sector
+        self.seats_per_row = seats_per_row
+        taken_by_row: Dict[Tuple[int, int], List[int]] = {}
+        for sector, row, seat in taken:
+            taken_by_row.setdefault((sector, row), []).append(seat)
+        self._rows = [
+            [RowRuns(seats_per_row, taken_by_row.get((sector, row), ())) for row in range(rows_per_sector)]
+            for sector in range(sectors)
+        ]
+
+    def take(self, sector: int, row: int, seat: int):
+        self._rows[sector][row].take(seat)
+
+    def free(self, sector: int, row: int, seat: int):
+        self._rows[sector][row].free(seat)
+
+    def find_best(self, count: int,
+                  sector_allowed: Callable[[int], bool] = lambda sector: True) -> Optional[Tuple[int, int, int]]:
+        """Лучший блок: меньший номер сектора, затем ближе к центру ряда, затем ближе к сцене.
+
+        Возвращает (сектор, ряд, первое место) или None.
+        """
+        if count <= 0 or count > self.seats_per_row:
+            return None
+        center = (self.seats_per_row - 1) / 2
+        for sector in range(self.sectors):
+            if not sector_allowed(sector):
+                continue
+            best = None
+            for row, runs in enumerate(self._rows[sector]):
+                block = runs.best_block(count, center)
+                if block is not None and (best is None or (block[0], row) < best[:2]):
+                    best = (block[0], row, block[1])
+            if best is not None:
+                return sector, best[1], best[2]
+        return None
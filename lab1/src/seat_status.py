@@ -0,0 +1,57 @@
+from collections import deque
+from typing import Any, Deque, List, Optional, Tuple
+
+from seats import SeatMap
+
+SEAT_AVAILABLE = "available"
+SEAT_HELD = "held"
+SEAT_SOLD = "sold"
+
+# Сколько последних изменений хранится для ответа дельтой
+CHANGE_LOG_SIZE = 1024
+
+
+def seat_state(ticket: Any) -> str:
+    if ticket.is_sold:
+        return SEAT_SOLD
+    if ticket.held_by is not None:
+        return SEAT_HELD
+    return SEAT_AVAILABLE
+
+
+class SeatStatusMap:
+    """Состояние мест раздела: битовые карты проданных и удержанных мест с номером версии.
+
+    Последние изменения хранятся в ограниченном журнале, поэтому клиент, знающий
+    версию, получает только изменившиеся места, а не всю схему зала.
+    """
+
+    def __init__(self, sectors: int, rows_per_sector: int, seats_per_row: int, version: int = 0):
+        self.sold = SeatMap(sectors, rows_per_sector, seats_per_row)
+        self.held = SeatMap(sectors, rows_per_sector, seats_per_row)
+        self.version = version
+        self._log: Deque[Tuple[int, int, str]] = deque(maxlen=CHANGE_LOG_SIZE)
+
+    def set(self, ticket: Any, version: int):
+        """Записывает текущее состояние места билета как изменение с номером version."""
+        state = seat_state(ticket)
+        place = (ticket.sector, ticket.row, ticket.seat)
+        if state == SEAT_SOLD:
+            self.sold.occupy(*place)
+            self.held.release(*place)
+        elif state == SEAT_HELD:
+            self.held.occupy(*place)
+        else:
+            self.held.release(*place)
+        self.version = version
+        self._log.append((version, self.sold.index(*place), state))
+
+    def changes_since(self, version: int) -> Optional[List[Tuple[int, str]]]:
+        """Изменения после version: [(индекс места, состояние)] или None, если журнал их уже не хранит."""
+        if version == self.version:
+            return []
+        if version > self.version or not self._log or self._log[0][0] > version + 1:
+            return None
+        # Для места, менявшегося несколько раз, достаточно последнего состояния
+        latest = {index: state for v, index, state in self._log if v > version}
+        return list(latest.items())
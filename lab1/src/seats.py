@@ -1,4 +1,6 @@
-from typing import Dict, Any, Optional
+import base64
+from typing import Dict, Any, List, Optional, Tuple
+
 
 
 class Seat:
@@ -18,6 +20,101 @@ class Seat:
         return seat
 
 
+class SeatMap:
+    """Битовая карта занятости мест зала: один бит на место и счётчик занятых."""
+
+    def __init__(self, sectors: int, rows_per_sector: int, seats_per_row: int):
+        self.sectors = sectors
+        self.rows_per_sector = rows_per_sector
+        self.seats_per_row = seats_per_row
+        self.size = sectors * rows_per_sector * seats_per_row
+        self._bits = bytearray((self.size + 7) // 8)
+        self.occupied_count = 0
+
+    def index(self, sector: int, row: int, seat: int) -> int:
+        return (sector * self.rows_per_sector + row) * self.seats_per_row + seat
+
+    def is_occupied(self, sector: int, row: int, seat: int) -> bool:
+        idx = self.index(sector, row, seat)
+        return bool(self._bits[idx >> 3] & (1 << (idx & 7)))
+
+    def occupy(self, sector: int, row: int, seat: int) -> bool:
+        """Занимает место; возвращает False, если оно уже было занято."""
+        idx = self.index(sector, row, seat)
+        mask = 1 << (idx & 7)
+        if self._bits[idx >> 3] & mask:
+            return False
+        self._bits[idx >> 3] |= mask
+        self.occupied_count += 1
+        return True
+
+    def release(self, sector: int, row: int, seat: int) -> bool:
+        """Освобождает место; возвращает False, если оно и так было свободно."""
+        idx = self.index(sector, row, seat)
+        mask = 1 << (idx & 7)
+        if not self._bits[idx >> 3] & mask:
+            return False
+        self._bits[idx >> 3] &= ~mask & 0xFF
+        self.occupied_count -= 1
+        return True
+
+    def to_bytes(self) -> bytes:
+        """Биты карты: место с индексом i — бит (i & 7) байта i >> 3."""
+        return bytes(self._bits)
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    def load_base64(self, encoded: str):
+        bits = base64.b64decode(encoded)
+        if len(bits) != len(self._bits):
+            raise ValueError(f"Размер карты мест не совпадает: {len(bits)} != {len(self._bits)}")
+        self._bits[:] = bits
+        self.occupied_count = sum(bin(byte).count("1") for byte in self._bits)
+
+
+class SeatView(Seat):
+    """Место как объект Seat поверх SeatMap (совместимость со старым API hall.seats)."""
+
+    def __init__(self, seat_map: SeatMap, sector: int, row: int, seat_number: int):
+        self._map = seat_map
+        self._sector = sector
+        self._row = row
+        self.seat_number = seat_number
+
+    @property
+    def is_occupied(self) -> bool:
+        return self._map.is_occupied(self._sector, self._row, self.seat_number)
+
+    @is_occupied.setter
+    def is_occupied(self, value: bool):
+        if value:
+            self._map.occupy(self._sector, self._row, self.seat_number)
+        else:
+            self._map.release(self._sector, self._row, self.seat_number)
+
+
+class SeatGridView:
+    """Ленивое представление SeatMap в виде вложенных списков [сектор][ряд][место]."""
+
+    def __init__(self, seat_map: SeatMap, prefix: tuple = ()):
+        self._map = seat_map
+        self._prefix = prefix
+
+    def __len__(self) -> int:
+        return (self._map.sectors, self._map.rows_per_sector, self._map.seats_per_row)[len(self._prefix)]
+
+    def __getitem__(self, i: int):
+        idx = range(len(self))[i]
+        if len(self._prefix) == 2:
+            return SeatView(self._map, self._prefix[0], self._prefix[1], idx)
+        return SeatGridView(self._map, self._prefix + (idx,))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
 class Ticket:
     __type__ = "ticket"
     _counter = 0
@@ -27,13 +124,29 @@ class Ticket:
         cls._counter += 1
         return str(cls._counter)
 
+    @classmethod
+    def _reserve_ids(cls, count: int) -> int:
+        """Резервирует count подряд идущих ID и возвращает первый из них."""
+        first = cls._counter + 1
+        cls._counter += count
+        return first
+
+    @classmethod
+    def _claim_ids(cls, first_id: Optional[int], count: int) -> int:
+        """Занимает диапазон из count ID: заданный (при повторе операции) или новый."""
+        if first_id is None:
+            return cls._reserve_ids(count)
+        if first_id + count - 1 > cls._counter:
+            cls._counter = first_id + count - 1
+        return first_id
+
     @classmethod
     def reset_counter(cls):
         """Сбрасывает счётчик (для тестов)."""
         cls._counter = 0
 
     def __init__(self, price: float, setting: Any, sector: int, row: int, seat: int,
-                 hall_id: str, hall_obj: Optional["AuditoryHall"] = None):
+                 hall_id: str, hall_obj: Optional["AuditoryHall"] = None, ticket_id: Optional[str] = None):
         self.price = price
         self.setting = setting
         self.sector = sector
@@ -41,8 +154,10 @@ class Ticket:
         self.seat = seat
         self.hall_id = hall_id
         self._hall = hall_obj
+        self._block: Optional["TicketBlock"] = None
         self.is_sold = False
-        self.ticket_id = Ticket._next_id()
+        self.held_by: Optional[str] = None
+        self.ticket_id = ticket_id if ticket_id is not None else Ticket._next_id()
 
     def set_ticket_id(self, tid: str):
         """Устанавливает ID билета вручную (при загрузке из JSON)."""
@@ -59,17 +174,49 @@ class Ticket:
             raise ValueError(f"ID зала не совпадает: {self.hall_id} != {hall.hall_id}")
         self._hall = hall
 
-    def sell_ticket(self) -> bool:
+    def sell_ticket(self, hold_id: Optional[str] = None) -> bool:
         from exception import TheaterException
 
+        if self._block is not None:
+            # Виртуальный билет мог быть выведен повторно: продаём его единственный экземпляр
+            stored = self._block.stored_ticket(self)
+            if stored is not None and stored is not self:
+                return stored.sell_ticket(hold_id)
+
         if self.is_sold:
             raise TheaterException(f"Билет {self.ticket_id} уже продан")
+        if self.held_by is not None and self.held_by != hold_id:
+            raise TheaterException(f"Билет {self.ticket_id} удержан другим покупателем")
 
-        # Помечаем билет как проданный и занимаем место
-        self.is_sold = True
+        # Сначала занимаем место: если оно занято, билет остаётся непроданным
         self._hall.occupy_seat(self.sector, self.row, self.seat)
+        self.is_sold = True
+        self.held_by = None
+        if self._block is not None:
+            self._block.retain(self)
         return True
 
+    def cancel_sale(self, held_by: Optional[str] = None):
+        """Откатывает продажу, возвращая место и прежнее удержание (для пакетных покупок)."""
+        self._hall.release_seat(self.sector, self.row, self.seat)
+        self.is_sold = False
+        self.held_by = held_by
+        if self._block is not None and held_by is None:
+            self._block.discard(self)
+
+    def hold(self, hold_id: str):
+        """Помечает билет как удержанный бронью hold_id."""
+        self.held_by = hold_id
+        if self._block is not None:
+            self._block.retain(self)
+
+    def release_hold(self, hold_id: str):
+        if self.held_by != hold_id:
+            return
+        self.held_by = None
+        if self._block is not None and not self.is_sold:
+            self._block.discard(self)
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "__type__": self.__type__,
@@ -85,7 +232,8 @@ class Ticket:
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Ticket":
-        obj = cls(data["price"], None, data["sector"], data["row"], data["seat"], data["hall_id"])
+        obj = cls(data["price"], None, data["sector"], data["row"], data["seat"], data["hall_id"],
+                  ticket_id=data["ticket_id"])
         obj.set_ticket_id(data["ticket_id"])
         obj.is_sold = data.get("is_sold", False)
         obj._pending_setting_name = data.get("setting_name")
@@ -93,3 +241,131 @@ class Ticket:
 
     def link_setting(self, setting: Any):
         self.setting = setting
+
+
+class TicketBlock:
+    """Виртуальные билеты постановки в зале.
+
+    Билет выводится по требованию из (постановка, зал, сектор, ряд, место), цена берётся
+    из таблицы цен по секторам, а ID — из заранее зарезервированного диапазона. Реальными
+    объектами хранятся только билеты, состояние которых изменилось (проданные и удержанные).
+    """
+    __type__ = "ticket_block"
+
+    def __init__(self, setting: Any, hall: "AuditoryHall", price_table: List[float],
+                 first_id: Optional[int] = None):
+        self.setting = setting
+        self.hall = hall
+        self.hall_id = hall.hall_id
+        self.price_table = list(price_table)
+        self._seats_per_sector = hall.rows_per_sector * hall.seats_per_row
+        self.size = hall.capacity
+        self.first_id = Ticket._claim_ids(first_id, self.size)
+        self._stored: Dict[int, Ticket] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, i: int) -> Ticket:
+        return self._ticket_at_index(range(self.size)[i])
+
+    def __iter__(self):
+        for idx in range(self.size):
+            yield self._ticket_at_index(idx)
+
+    def index_of(self, ticket_id: str) -> Optional[int]:
+        try:
+            idx = int(ticket_id) - self.first_id
+        except (TypeError, ValueError):
+            return None
+        return idx if 0 <= idx < self.size else None
+
+    def get(self, ticket_id: str) -> Optional[Ticket]:
+        idx = self.index_of(ticket_id)
+        return None if idx is None else self._ticket_at_index(idx)
+
+    def ticket_at(self, sector: int, row: int, seat: int) -> Ticket:
+        idx = sector * self._seats_per_sector + row * self.hall.seats_per_row + seat
+        return self._ticket_at_index(idx)
+
+    def iter_filtered(self, start: int = 0, sold: Optional[bool] = None):
+        """(индекс, билет) начиная со start; при фильтре sold выводятся только подходящие билеты.
+
+        Проданные билеты всегда сохранены, поэтому признак продажи виртуального билета
+        проверяется по _stored, а объекты строятся только для отдаваемых билетов.
+        """
+        if sold is None:
+            for idx in range(start, self.size):
+                yield idx, self._ticket_at_index(idx)
+            return
+        stored = dict(self._stored)
+        if sold:
+            for idx in sorted(i for i, ticket in stored.items() if i >= start and ticket.is_sold):
+                yield idx, stored[idx]
+            return
+        for idx in range(start, self.size):
+            ticket = stored.get(idx)
+            if ticket is None:
+                yield idx, self._ticket_at_index(idx)
+            elif not ticket.is_sold:
+                yield idx, ticket
+
+    def _ticket_at_index(self, idx: int) -> Ticket:
+        ticket = self._stored.get(idx)
+        if ticket is not None:
+            return ticket
+        sector, rest = divmod(idx, self._seats_per_sector)
+        row, seat = divmod(rest, self.hall.seats_per_row)
+        ticket = Ticket(self.price_table[sector], self.setting, sector, row, seat,
+                        self.hall_id, self.hall, ticket_id=str(self.first_id + idx))
+        ticket._block = self
+        return ticket
+
+    def stored_ticket(self, ticket: Ticket) -> Optional[Ticket]:
+        """Сохранённый экземпляр билета, если он уже материализован."""
+        idx = self.index_of(ticket.ticket_id)
+        return None if idx is None else self._stored.get(idx)
+
+    def retain(self, ticket: Ticket) -> Ticket:
+        """Сохраняет билет как реальный объект (после продажи)."""
+        idx = self.index_of(ticket.ticket_id)
+        ticket._block = self
+        return self._stored.setdefault(idx, ticket)
+
+    def discard(self, ticket: Ticket):
+        """Возвращает билет в виртуальное состояние (например, после снятия удержания)."""
+        idx = self.index_of(ticket.ticket_id)
+        if self._stored.get(idx) is ticket:
+            del self._stored[idx]
+
+    @property
+    def stored_tickets(self) -> List[Ticket]:
+        return list(self._stored.values())
+
+    def stored_rows(self) -> List[Tuple[int, float, bool]]:
+        """Сохранённые билеты строками (индекс места в блоке, цена, продан) — для снимков."""
+        return [(idx, ticket.price, ticket.is_sold) for idx, ticket in self._stored.items()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "__type__": self.__type__,
+            "first_id": self.first_id,
+            "price_table": self.price_table,
+            "tickets": [t.to_dict() for t in self._stored.values()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], setting: Any, hall: "AuditoryHall") -> "TicketBlock":
+        block = cls(setting, hall, data["price_table"], data["first_id"])
+        # Снимки (snapshot.py) хранят сохранённые билеты строками, вложенный формат — словарями
+        for idx, price, sold in data.get("stored", []):
+            ticket = block._ticket_at_index(idx)
+            ticket.price = price
+            ticket.is_sold = sold
+            block._stored[idx] = ticket
+        for ticket_data in data.get("tickets", []):
+            ticket = Ticket.from_dict(ticket_data)
+            ticket.link_hall(hall)
+            ticket.link_setting(setting)
+            block.retain(ticket)
+        return block
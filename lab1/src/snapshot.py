@@ -0,0 +1,568 @@
+"""Нормализованный снимок театра: таблицы сущностей и ссылки на них.
+
+В отличие от вложенного Theater.to_dict, каждая сущность (сотрудник, костюм,
+постановка, репетиция, зал) записывается ровно один раз, а связи хранятся как
+ID — позиции в соответствующей таблице. Размер снимка и время загрузки линейны
+по числу сущностей, а при загрузке восстанавливаются общие объекты (актёр в
+труппе и в составе постановки — один и тот же объект).
+
+Снимок записывается одним из форматов (SNAPSHOT_BACKENDS): JSON или компактным
+бинарным, где билеты лежат упакованными столбцами, а карты мест — сырыми байтами.
+Для бинарного формата снимок сразу строится столбцами (columnar=True): массивы
+заполняются прямо из объектов билетов, без промежуточных строк и словарей.
+"""
+import base64
+import json
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from actions import Setting, Repetition
+from halls import AuditoryHall
+from resources import Stage, Costume, CostumeRoom
+from staff import Staff, Actor, Director
+
+SNAPSHOT_TYPE = "theater_snapshot"
+SNAPSHOT_VERSION = 1
+
+# Строка обычного билета в снимке: [ID, цена, сектор, ряд, место, продан]
+_TICKET_ROW = attrgetter("ticket_id", "price", "sector", "row", "seat", "is_sold")
+_TICKET_COLUMNS = tuple(map(attrgetter, ("ticket_id", "price", "sector", "row", "seat", "is_sold")))
+
+
+class _Table:
+    """Таблица сущностей: объект получает ID при первой встрече."""
+
+    def __init__(self):
+        self.ids: Dict[int, int] = {}
+        self.items: List[Any] = []
+
+    def ref(self, obj: Any) -> int:
+        key = id(obj)
+        if key not in self.ids:
+            self.ids[key] = len(self.items)
+            self.items.append(obj)
+        return self.ids[key]
+
+
+def is_snapshot(data: Dict[str, Any]) -> bool:
+    return data.get("__type__") == SNAPSHOT_TYPE
+
+
+def dump_snapshot(theater: Any, tickets: bool = True, columnar: bool = False) -> Dict[str, Any]:
+    """Строит снимок; tickets=False — без билетов (их хранит, например, SQLite-репозиторий).
+
+    columnar=True — билеты сразу столбцами массивов, а карты мест сырыми байтами;
+    такой снимок пишет только бинарный формат (см. backend_for_path(...).columnar).
+    """
+    from seats import TicketBlock
+
+    staff, costumes, settings = _Table(), _Table(), _Table()
+    managed_staff = [staff.ref(s) for s in theater.staff_manager.staff]
+    managed_costumes = [costumes.ref(c) for c in theater.resource_manager.costumes]
+    managed_settings = [settings.ref(s) for s in theater.performance_manager.settings]
+
+    repetitions = []
+    for rep in theater.performance_manager.repetitions:
+        repetitions.append({
+            "name": rep.name,
+            "durability": rep.durability,
+            "date": _date_str(rep.date),
+            "setting": settings.ref(rep.setting) if isinstance(rep.setting, Setting) else None,
+            "attendance": [staff.ref(s) for s in rep.attendance_list],
+        })
+
+    # Таблицы пополняются по мере обхода ссылок, поэтому идём по индексу
+    settings_data = []
+    i = 0
+    while i < len(settings.items):
+        setting = settings.items[i]
+        entry = {
+            "name": setting.name,
+            "durability": setting.durability,
+            "date": _date_str(setting.date),
+            "director": staff.ref(setting.director) if setting.director is not None else None,
+            "cast": [staff.ref(a) for a in setting.cast],
+            "hall_id": setting.hall.hall_id if setting.hall else None,
+            "base_price": setting.base_price,
+        }
+        if isinstance(setting.tickets, TicketBlock):
+            block = setting.tickets
+            entry["ticket_block"] = {
+                "__type__": block.__type__, "first_id": block.first_id, "price_table": block.price_table}
+            if tickets:
+                # Сохранённые билеты блока — строками (индекс места, цена, продан), а не словарями
+                rows = block.stored_rows()
+                entry["ticket_block"]["stored"] = _stored_columns(rows) if columnar else list(map(list, rows))
+        elif tickets:
+            entry["tickets"] = _ticket_columns(setting.tickets) if columnar else list(map(_TICKET_ROW, setting.tickets))
+        other_halls = _other_hall_entries(theater.ticket_manager, setting, tickets, columnar)
+        if other_halls:
+            entry["other_halls"] = other_halls
+        settings_data.append(entry)
+        i += 1
+        if i == len(settings.items):
+            # Режиссёры могли сослаться на ещё не встреченные постановки
+            for person in list(staff.items):
+                if isinstance(person, Director):
+                    for directed in person.directed_settings:
+                        if isinstance(directed, Setting):
+                            settings.ref(directed)
+
+    staff_data = []
+    for person in staff.items:
+        entry = {"name": person.name, "age": person.get_age(), "salary": person.get_salary()}
+        if isinstance(person, Actor):
+            entry.update({
+                "type": "actor",
+                "role": person.role,
+                "costumes": {k: costumes.ref(v) for k, v in person.assigned_costumes.items()
+                             if isinstance(v, Costume)},
+            })
+        elif isinstance(person, Director):
+            entry.update({
+                "type": "director",
+                "directed_settings": [settings.ids[id(s)] for s in person.directed_settings
+                                      if isinstance(s, Setting)],
+            })
+        else:
+            entry["type"] = "staff"
+        staff_data.append(entry)
+
+    rm = theater.resource_manager
+    return {
+        "__type__": SNAPSHOT_TYPE,
+        "version": SNAPSHOT_VERSION,
+        "name": theater.name,
+        "staff": staff_data,
+        "costumes": [{"name": c.name, "size": c.size, "color": c.color} for c in costumes.items],
+        "settings": settings_data,
+        "repetitions": repetitions,
+        "halls": [_hall_entry(h, columnar) for h in rm.hall_manager.halls],
+        "stages": [s.to_dict() for s in rm.stages],
+        "costume_rooms": [r.to_dict() for r in rm.costume_rooms],
+        "managed": {"staff": managed_staff, "costumes": managed_costumes, "settings": managed_settings},
+    }
+
+
+def load_snapshot(data: Dict[str, Any]) -> Any:
+    from theater import Theater
+
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия снимка: {data.get('version')}")
+
+    theater = Theater(data["name"])
+    costumes = [Costume(c["name"], c["size"], c["color"]) for c in data.get("costumes", [])]
+
+    staff: List[Any] = []
+    for entry in data.get("staff", []):
+        if entry["type"] == "actor":
+            person = Actor(entry["name"], entry["age"], entry["salary"], entry.get("role"))
+            person.assigned_costumes = {k: costumes[v] for k, v in entry.get("costumes", {}).items()}
+        elif entry["type"] == "director":
+            person = Director(entry["name"], entry["age"], entry["salary"])
+        else:
+            person = Staff(entry["name"], entry["age"], entry["salary"])
+        staff.append(person)
+
+    settings: List[Setting] = []
+    ticket_rows: List[List[Any]] = []
+    for entry in data.get("settings", []):
+        director = staff[entry["director"]] if entry.get("director") is not None else None
+        setting = Setting(entry["durability"], entry["name"], _parse_date(entry.get("date")), director)
+        setting.cast = [staff[i] for i in entry.get("cast", [])]
+        setting.base_price = entry.get("base_price", 100.0)
+        setting._pending_hall_id = entry.get("hall_id")
+        setting._pending_ticket_block = entry.get("ticket_block")
+        setting._pending_tickets_data = []
+        ticket_rows.append(entry.get("tickets", []))
+        settings.append(setting)
+
+    for person, entry in zip(staff, data.get("staff", [])):
+        if isinstance(person, Director):
+            person.directed_settings = [settings[i] for i in entry.get("directed_settings", [])]
+
+    rm = theater.resource_manager
+    for hall_data in data.get("halls", []):
+        rm.hall_manager.add_hall(AuditoryHall.from_dict(hall_data))
+    for stage_data in data.get("stages", []):
+        rm.add_stage(Stage.from_dict(stage_data))
+    for room_data in data.get("costume_rooms", []):
+        rm.add_costume_room(CostumeRoom.from_dict(room_data))
+
+    managed = data.get("managed", {})
+    for i in managed.get("staff", []):
+        theater.add_staff(staff[i])
+    for i in managed.get("costumes", []):
+        rm.add_costume(costumes[i])
+    for i in managed.get("settings", []):
+        theater.add_setting(settings[i])
+
+    for entry in data.get("repetitions", []):
+        setting = settings[entry["setting"]] if entry.get("setting") is not None else None
+        rep = Repetition(entry["durability"], entry["name"], _parse_date(entry.get("date")), setting)
+        rep.attendance_list = [staff[i] for i in entry.get("attendance", [])]
+        theater.add_repetition(rep)
+
+    # Билеты привязываются только у постановок театра, как и в Theater.from_dict
+    for i in managed.get("settings", []):
+        setting = settings[i]
+        # Прежние залы — раньше текущего, чтобы разделы постановки шли в порядке привязки
+        for other in data["settings"][i].get("other_halls", []):
+            try:
+                hall = rm.hall_manager.get_hall_by_id(other["hall_id"])
+            except Exception:
+                continue
+            _restore_other_hall(setting, hall, theater.ticket_manager, other)
+        if setting._pending_hall_id:
+            try:
+                hall = rm.hall_manager.get_hall_by_id(setting._pending_hall_id)
+            except Exception:
+                continue
+            setting.link_hall_and_tickets(hall, theater.ticket_manager)
+            _restore_tickets(setting, hall, theater.ticket_manager, ticket_rows[i])
+    return theater
+
+
+def _hall_entry(hall: AuditoryHall, columnar: bool) -> Dict[str, Any]:
+    entry = hall.to_dict()
+    if columnar:
+        entry["seat_map"] = hall.seat_map.to_bytes()
+    return entry
+
+
+def _other_hall_entries(ticket_manager: Any, setting: Setting, tickets: bool, columnar: bool) -> List[Dict[str, Any]]:
+    """Билеты постановки в залах, к которым она была привязана раньше текущего.
+
+    В setting.tickets лежит только последняя привязка, а билеты прежних залов (и
+    продажи в них) есть лишь в разделах менеджера билетов. Каждый блок виртуальных
+    билетов и набор обычных билетов раздела записывается отдельной записью.
+    """
+    from seats import TicketBlock
+
+    current = setting.hall.hall_id if setting.hall else None
+    entries = []
+    for partition in ticket_manager.partitions_for_setting(setting.name):
+        if partition.hall_id == current:
+            continue
+        for block in partition.blocks:
+            if not isinstance(block, TicketBlock) or block.setting is not setting:
+                continue
+            block_entry = {"__type__": block.__type__, "first_id": block.first_id, "price_table": block.price_table}
+            if tickets:
+                rows = block.stored_rows()
+                block_entry["stored"] = _stored_columns(rows) if columnar else list(map(list, rows))
+            entries.append({"hall_id": partition.hall_id, "ticket_block": block_entry})
+        own = [t for t in partition.own_tickets if t.setting is setting]
+        if own:
+            other: Dict[str, Any] = {"hall_id": partition.hall_id}
+            if tickets:
+                other["tickets"] = _ticket_columns(own) if columnar else list(map(_TICKET_ROW, own))
+            entries.append(other)
+    return entries
+
+
+def _restore_other_hall(setting: Setting, hall: AuditoryHall, ticket_manager: Any, entry: Dict[str, Any]):
+    """Восстанавливает раздел прежнего зала постановки: билеты попадают только в менеджер."""
+    from seats import TicketBlock
+
+    if "ticket_block" in entry:
+        block = TicketBlock.from_dict(entry["ticket_block"], setting, hall)
+        ticket_manager.add_block(block)
+        for ticket in block.stored_tickets:
+            if ticket.is_sold:
+                hall.seat_map.occupy(ticket.sector, ticket.row, ticket.seat)
+    else:
+        ticket_manager.add_tickets(_build_tickets(setting, hall, entry.get("tickets", [])))
+
+
+def _restore_tickets(setting: Setting, hall: AuditoryHall, ticket_manager: Any, rows: List[Any]):
+    """Создаёт обычные билеты постановки прямо из строк снимка, без промежуточных словарей.
+
+    Места проданных билетов уже заняты: карта мест зала входит в снимок.
+    """
+    tickets = _build_tickets(setting, hall, rows)
+    if not tickets:
+        return
+    setting.tickets.extend(tickets)
+    ticket_manager.add_tickets(tickets)
+
+
+def _build_tickets(setting: Setting, hall: AuditoryHall, rows: List[Any]) -> List[Any]:
+    from seats import Ticket
+
+    tickets = []
+    for tid, price, sector, row, seat, sold in rows:
+        ticket = Ticket(price, setting, sector, row, seat, hall.hall_id, hall, ticket_id=tid)
+        ticket.is_sold = sold
+        tickets.append(ticket)
+    # Новые билеты не должны получить ID загруженных
+    top = max(map(int, filter(str.isdigit, map(attrgetter("ticket_id"), tickets))), default=0)
+    if top > Ticket._counter:
+        Ticket._counter = top
+    return tickets
+
+
+class JsonSnapshotBackend:
+    """Снимок в виде JSON-документа."""
+
+    name = "json"
+    columnar = False
+
+    def dump(self, data: Dict[str, Any], f: BinaryIO):
+        f.write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def load(self, f: BinaryIO) -> Dict[str, Any]:
+        return json.loads(f.read().decode("utf-8"))
+
+
+class BinarySnapshotBackend:
+    """Бинарный снимок: заголовок JSON без билетов и карт мест, затем секции-столбцы.
+
+    Формат файла: MAGIC, длина заголовка (uint32 LE), заголовок, секции подряд.
+    Билеты постановки хранятся столбцами ID, цен, сектора, ряда, места и
+    признака продажи, сохранённые билеты блока — столбцами индекса места, цены
+    и признака продажи. Снимок, построенный с columnar=True, уже состоит из этих
+    столбцов, и запись только склеивает их байты.
+    """
+
+    name = "binary"
+    columnar = True
+    MAGIC = b"THSNAPB1"
+    _HEADER = struct.Struct("<I")
+
+    def dump(self, data: Dict[str, Any], f: BinaryIO):
+        header = dict(data)
+        sections: List[bytes] = []
+        header["settings"] = [self._pack_setting(entry, sections) for entry in data.get("settings", [])]
+        header["halls"] = [self._pack_hall(hall, sections) for hall in data.get("halls", [])]
+        header["sections"] = [len(section) for section in sections]
+        encoded = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        f.write(self.MAGIC)
+        f.write(self._HEADER.pack(len(encoded)))
+        f.write(encoded)
+        for section in sections:
+            f.write(section)
+
+    def load(self, f: BinaryIO) -> Dict[str, Any]:
+        if f.read(len(self.MAGIC)) != self.MAGIC:
+            raise ValueError("Файл не является бинарным снимком театра")
+        (length,) = self._HEADER.unpack(f.read(self._HEADER.size))
+        data = json.loads(f.read(length).decode("utf-8"))
+        sections = [f.read(size) for size in data.pop("sections")]
+        data["settings"] = [self._unpack_setting(entry, sections) for entry in data["settings"]]
+        data["halls"] = [self._unpack_hall(hall, sections) for hall in data["halls"]]
+        return data
+
+    def _pack_setting(self, entry: Dict[str, Any], sections: List[bytes]) -> Dict[str, Any]:
+        entry = self._pack_tickets(entry, sections)
+        if "other_halls" in entry:
+            entry["other_halls"] = [self._pack_tickets(other, sections) for other in entry["other_halls"]]
+        return entry
+
+    def _unpack_setting(self, entry: Dict[str, Any], sections: List[bytes]) -> Dict[str, Any]:
+        for other in entry.get("other_halls", []):
+            self._unpack_tickets(other, sections)
+        return self._unpack_tickets(entry, sections)
+
+    def _pack_tickets(self, entry: Dict[str, Any], sections: List[bytes]) -> Dict[str, Any]:
+        """Билеты записи постановки (или её прежнего зала) — в секции."""
+        entry = dict(entry)
+        if "ticket_block" in entry:
+            block = dict(entry["ticket_block"])
+            stored = block.pop("stored", None)
+            if stored is not None:
+                if not isinstance(stored, dict):
+                    stored = _stored_columns(stored)
+                block["stored_columns"] = _write_columns(stored, sections)
+            entry["ticket_block"] = block
+        elif "tickets" in entry:
+            columns = entry.pop("tickets")
+            if not isinstance(columns, dict):
+                columns = _columns_from_rows(columns)
+            entry["ticket_columns"] = _write_columns(columns, sections)
+        return entry
+
+    def _unpack_tickets(self, entry: Dict[str, Any], sections: List[bytes]) -> Dict[str, Any]:
+        if "ticket_block" in entry:
+            block = entry["ticket_block"]
+            if "stored_columns" in block:
+                block["stored"] = _read_stored_rows(block.pop("stored_columns"), sections)
+        elif "ticket_columns" in entry:
+            entry["tickets"] = _unpack_ticket_rows(entry.pop("ticket_columns"), sections)
+        return entry
+
+    def _pack_hall(self, hall: Dict[str, Any], sections: List[bytes]) -> Dict[str, Any]:
+        hall = dict(hall)
+        seat_map = hall.pop("seat_map")
+        sections.append(seat_map if isinstance(seat_map, bytes) else base64.b64decode(seat_map))
+        hall["seat_map_section"] = len(sections) - 1
+        return hall
+
+    def _unpack_hall(self, hall: Dict[str, Any], sections: List[bytes]) -> Dict[str, Any]:
+        hall["seat_map"] = base64.b64encode(sections[hall.pop("seat_map_section")]).decode("ascii")
+        return hall
+
+
+SNAPSHOT_BACKENDS = {
+    JsonSnapshotBackend.name: JsonSnapshotBackend(),
+    BinarySnapshotBackend.name: BinarySnapshotBackend(),
+}
+BINARY_EXTENSIONS = (".tsnap", ".bin")
+
+
+def backend_for_path(filepath: str, fmt: Optional[str] = None) -> Any:
+    """Формат записи: явно заданный или по расширению файла (.tsnap/.bin — бинарный)."""
+    if fmt is None:
+        fmt = "binary" if filepath.lower().endswith(BINARY_EXTENSIONS) else "json"
+    if fmt not in SNAPSHOT_BACKENDS:
+        raise ValueError(f"Неизвестный формат снимка: {fmt}")
+    return SNAPSHOT_BACKENDS[fmt]
+
+
+def write_snapshot(data: Dict[str, Any], filepath: str, fmt: Optional[str] = None) -> int:
+    """Записывает готовый снимок через временный файл; возвращает размер в байтах.
+
+    Файл заменяется целиком, поэтому при сбое во время записи остаётся прежняя версия.
+    """
+    backend = backend_for_path(filepath, fmt)
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        backend.dump(data, f)
+        size = f.tell()
+    os.replace(tmp_path, filepath)
+    return size
+
+
+def detect_backend(f: BinaryIO) -> Any:
+    """Формат чтения определяется по сигнатуре файла, а не по расширению."""
+    head = f.read(len(BinarySnapshotBackend.MAGIC))
+    f.seek(0)
+    return SNAPSHOT_BACKENDS["binary" if head == BinarySnapshotBackend.MAGIC else "json"]
+
+
+def _ticket_columns(tickets: List[Any]) -> Dict[str, Any]:
+    """Столбцы обычных билетов, заполненные прямо из объектов: без строк и словарей по билету."""
+    get_id, get_price, get_sector, get_row, get_seat, get_sold = _TICKET_COLUMNS
+    return {
+        "ids": list(map(get_id, tickets)),
+        "prices": array("d", list(map(get_price, tickets))),
+        "coords": [list(map(get, tickets)) for get in (get_sector, get_row, get_seat)],
+        "sold": bytes(map(get_sold, tickets)),
+    }
+
+
+def _columns_from_rows(rows: List[List[Any]]) -> Dict[str, Any]:
+    """Те же столбцы из строк снимка (если бинарным форматом пишут снимок, построенный для JSON)."""
+    if not rows:
+        return {"ids": [], "prices": array("d"), "coords": [[], [], []], "sold": b""}
+    ids, prices, sectors, seat_rows, seats, sold = zip(*rows)
+    return {"ids": list(ids), "prices": array("d", prices), "coords": [sectors, seat_rows, seats],
+            "sold": bytes(sold)}
+
+
+def _stored_columns(rows: List[Any]) -> Dict[str, Any]:
+    """Сохранённые билеты блока столбцами: индекс места в блоке, цена, продан."""
+    indexes, prices, sold = zip(*rows) if rows else ((), (), ())
+    return {"indexes": array("I", indexes), "prices": array("d", prices), "sold": bytes(sold)}
+
+
+def _write_columns(columns: Dict[str, Any], sections: List[bytes]) -> Dict[str, Any]:
+    """Дописывает столбцы в секции и возвращает их описание для заголовка.
+
+    Обычные билеты: ID подряд хранятся одним числом, координаты мест почти всегда
+    помещаются в uint16. Порядок секций: [ID], цены, сектор, ряд, место, продан.
+    """
+    if "indexes" in columns:
+        header = {"count": len(columns["sold"]), "first_section": len(sections)}
+        sections.extend((_pack_array("I", columns["indexes"]), _pack_array("d", columns["prices"]),
+                         bytes(columns["sold"])))
+        return header
+    ids = columns["ids"]
+    header: Dict[str, Any] = {"count": len(ids), "first_section": len(sections)}
+    if not ids:
+        return header
+    header.update(_id_column(ids, sections))
+    try:
+        coords = [array("H", values) for values in columns["coords"]]
+    except OverflowError:
+        coords = [array("I", values) for values in columns["coords"]]
+    header["coord_code"] = coords[0].typecode
+    sections.append(_pack_array("d", columns["prices"]))
+    sections.extend(_pack_array(values.typecode, values) for values in coords)
+    sections.append(bytes(columns["sold"]))
+    return header
+
+
+def _id_column(ids: List[str], sections: List[bytes]) -> Dict[str, Any]:
+    first = ids[0]
+    if first.isdigit():
+        start = int(first)
+        # Сравниваются сами строки: ID с ведущими нулями не превратятся в другие при чтении
+        if ids == list(map(str, range(start, start + len(ids)))):
+            return {"first_id": start}
+    try:
+        numeric = array("q", map(int, ids))
+    except (ValueError, OverflowError):
+        numeric = None
+    if numeric is not None and list(map(str, numeric)) == ids:
+        sections.append(_pack_array("q", numeric))
+        return {"id_code": "q"}
+    # Прочие ID (из старых файлов) остаются в заголовке как есть
+    return {"ids": list(ids)}
+
+
+def _read_stored_rows(columns: Dict[str, Any], sections: List[bytes]) -> List[Tuple[int, float, bool]]:
+    index = columns["first_section"]
+    indexes = _unpack_array("I", sections[index])
+    prices = _unpack_array("d", sections[index + 1])
+    return list(zip(indexes, prices, map(bool, sections[index + 2])))
+
+
+def _unpack_ticket_rows(columns: Dict[str, Any], sections: List[bytes]) -> List[Tuple[Any, ...]]:
+    count = columns["count"]
+    if not count:
+        return []
+    index = columns["first_section"]
+    if "first_id" in columns:
+        ids = map(str, range(columns["first_id"], columns["first_id"] + count))
+    elif "id_code" in columns:
+        ids = map(str, _unpack_array(columns["id_code"], sections[index]))
+        index += 1
+    else:
+        ids = columns["ids"]
+    coord_code = columns["coord_code"]
+    prices = _unpack_array("d", sections[index])
+    sectors, seat_rows, seats = (_unpack_array(coord_code, sections[index + k]) for k in (1, 2, 3))
+    sold = map(bool, sections[index + 4])
+    return list(zip(ids, prices, sectors, seat_rows, seats, sold))
+
+
+def _pack_array(typecode: str, values: Any) -> bytes:
+    packed = values if isinstance(values, array) else array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack_array(typecode: str, raw: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(raw)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _date_str(date: Any) -> str:
+    return date.isoformat() if isinstance(date, datetime) else str(date)
+
+
+def _parse_date(value: Any) -> datetime:
+    try:
+        return datetime.fromisoformat(value) if value else datetime.now()
+    except ValueError:
+        return datetime.now()
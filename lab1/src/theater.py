@@ -1,10 +1,11 @@
-import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from actions import Setting, Repetition
 from halls import AuditoryHall
 from resources import Stage, Costume, CostumeRoom
 from managers import StaffManager, HallManager, PerformanceManager, TicketManager, ResourceManager
+from holds import SeatHold
+from scheduling import Conflict, Scheduler
 
 
 class Theater:
@@ -17,6 +18,7 @@ class Theater:
         self.performance_manager = PerformanceManager()
         self.ticket_manager = TicketManager()
         self.resource_manager = ResourceManager()
+        self.scheduler = Scheduler()
 
     def add_staff(self, staff_member):
         self.staff_manager.add_staff(staff_member)
@@ -24,30 +26,81 @@ class Theater:
     def add_hall(self, hall: AuditoryHall):
         self.resource_manager.hall_manager.add_hall(hall)
 
-    def add_setting(self, setting: Setting):
+    def add_setting(self, setting: Setting) -> List[Conflict]:
+        """Добавить постановку; возвращает пересечения её показа с расписанием."""
         self.performance_manager.add_setting(setting)
+        return self.scheduler.add(setting)
 
-    def add_repetition(self, repetition: Repetition):
+    def add_repetition(self, repetition: Repetition) -> List[Conflict]:
+        """Добавить репетицию; возвращает пересечения по залу и участникам."""
         self.performance_manager.add_repetition(repetition)
-
-    def bind_setting_to_hall(self, setting_name: str, hall_id: str, base_price: float = 100.0) -> List[Any]:
-        """Привязать постановку к залу и создать билеты."""
-        setting = next((s for s in self.performance_manager.settings if s.name == setting_name), None)
+        return self.scheduler.add(repetition)
+
+    def add_actor_to_setting(self, actor: Any, setting: Setting) -> List[Conflict]:
+        """Добавить актёра в состав; возвращает новые пересечения показа и репетиций."""
+        setting.add_cast(actor)
+        return self.scheduler.attach(setting, ("staff", actor.name))
+
+    def mark_attendance(self, repetition: Repetition, actor: Any) -> List[Conflict]:
+        """Отметить актёра на репетиции; возвращает пересечения с его другими событиями."""
+        repetition.check_list(actor)
+        return self.scheduler.attach(repetition, ("staff", actor.name))
+
+    def bind_setting_to_hall(self, setting_name: str, hall_id: str, base_price: float = 100.0,
+                             lazy: bool = False, first_id: Optional[int] = None) -> List[Any]:
+        """Привязать постановку к залу и создать билеты (lazy=True — виртуальные билеты)."""
+        setting = self.performance_manager.get_setting(setting_name)
         if not setting:
             from exception import TheaterException
             raise TheaterException(f"Постановка '{setting_name}' не найдена")
         hall = self.resource_manager.hall_manager.get_hall_by_id(hall_id)
-        tickets = setting.bind_to_hall(hall, base_price)
-        for ticket in tickets:
-            self.ticket_manager.add_ticket(ticket)
+        tickets = setting.bind_to_hall(hall, base_price, lazy=lazy, first_id=first_id)
+        if lazy:
+            self.ticket_manager.add_block(tickets)
+        else:
+            self.ticket_manager.add_tickets(tickets)
+        self.scheduler.update(setting)
         return tickets
 
-    def sell_ticket(self, ticket_id: str) -> bool:
-        ticket = next((t for t in self.ticket_manager.tickets if t.ticket_id == ticket_id), None)
+    def sell_ticket(self, ticket_id: str, hold_id: Optional[str] = None) -> bool:
+        ticket = self.ticket_manager.get_ticket(ticket_id)
         if ticket:
             hall = self.resource_manager.hall_manager.get_hall_by_id(ticket.hall_id)
             ticket.link_hall(hall)
-        return self.ticket_manager.sell_ticket(ticket_id, self.resource_manager.hall_manager)
+        return self.ticket_manager.sell_ticket(ticket_id, self.resource_manager.hall_manager, hold_id)
+
+    def sell_tickets(self, ticket_ids: List[str], hold_id: Optional[str] = None) -> List[Any]:
+        """Продать несколько билетов атомарно: либо все, либо ни одного."""
+        for ticket_id in ticket_ids:
+            ticket = self.ticket_manager.get_ticket(ticket_id)
+            if ticket:
+                ticket.link_hall(self.resource_manager.hall_manager.get_hall_by_id(ticket.hall_id))
+        return self.ticket_manager.sell_tickets(ticket_ids, self.resource_manager.hall_manager, hold_id)
+
+    def find_best_seats(self, setting_name: str, hall_id: str, count: int,
+                        max_price: Optional[float] = None) -> List[Any]:
+        """Лучшие count соседних свободных мест в ряду: ближе к сцене и к центру ряда."""
+        partition = self.ticket_manager.get_partition(setting_name, hall_id)
+        if partition is None:
+            return []
+        hall = self.resource_manager.hall_manager.get_hall_by_id(hall_id)
+        with self.ticket_manager.locks.locked([hall_id]):
+            return partition.find_best_seats(hall, count, max_price)
+
+    def hold_tickets(self, ticket_ids: List[str], ttl: float, hold_id: Optional[str] = None) -> SeatHold:
+        """Удержать билеты на ttl секунд до подтверждения покупки."""
+        return self.ticket_manager.holds.hold(ticket_ids, ttl, hold_id)
+
+    def confirm_hold(self, hold_id: str) -> List[Any]:
+        """Купить все билеты брони атомарно; при ошибке бронь снимается целиком."""
+        hold = self.ticket_manager.holds.take(hold_id)
+        try:
+            return self.sell_tickets(hold.ticket_ids, hold_id)
+        finally:
+            self.ticket_manager.holds.release_tickets(hold)
+
+    def release_hold(self, hold_id: str) -> bool:
+        return self.ticket_manager.holds.release(hold_id)
 
     def create_costume(self, name: str, size: str, color: str) -> Costume:
         """Создать костюм."""
@@ -89,17 +142,42 @@ class Theater:
 
         return theater
 
-    def save_to_file(self, filepath: str):
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(), f, ensure_ascii=False, indent=4)
+    def save_to_file(self, filepath: str, fmt: Optional[str] = None):
+        """Сохраняет нормализованный снимок (см. snapshot.py).
 
-    def load_from_file(self, filepath: str):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            loaded_theater = Theater.from_dict(data)
-            self.name = loaded_theater.name
-            self.staff_manager = loaded_theater.staff_manager
-            self.resource_manager = loaded_theater.resource_manager
-            self.performance_manager = loaded_theater.performance_manager
-            self.ticket_manager = loaded_theater.ticket_manager
+        fmt — "json" или "binary"; по умолчанию выбирается по расширению файла.
+        """
+        from snapshot import backend_for_path, dump_snapshot, write_snapshot
 
+        columnar = backend_for_path(filepath, fmt).columnar
+        write_snapshot(dump_snapshot(self, columnar=columnar), filepath, fmt)
+
+    def load_from_file(self, filepath: str):
+        """Загружает снимок любого формата или файл старого вложенного формата."""
+        self.replace_state(Theater.read_file(filepath))
+
+    @staticmethod
+    def read_file(filepath: str) -> "Theater":
+        """Читает файл в новый объект театра, не затрагивая текущее состояние."""
+        from snapshot import is_snapshot, load_snapshot, detect_backend
+
+        with open(filepath, 'rb') as f:
+            data = detect_backend(f).load(f)
+            return load_snapshot(data) if is_snapshot(data) else Theater.from_dict(data)
+
+    def load_from_repository(self, repository: Any):
+        """Загружает состояние из репозитория (см. repository.py)."""
+        self.replace_state(repository.load())
+
+    def replace_state(self, loaded_theater: "Theater"):
+        """Подменяет состояние загруженным театром (см. read_file)."""
+        # Менеджеры заменяются по одному и без блокировок: пока идёт замена,
+        # вызывающий не должен допускать к театру другие запросы
+        # Подписчики на изменения мест переходят к новому менеджеру билетов
+        loaded_theater.ticket_manager.seat_listeners.extend(self.ticket_manager.seat_listeners)
+        self.name = loaded_theater.name
+        self.staff_manager = loaded_theater.staff_manager
+        self.resource_manager = loaded_theater.resource_manager
+        self.performance_manager = loaded_theater.performance_manager
+        self.ticket_manager = loaded_theater.ticket_manager
+        self.scheduler = Scheduler.from_theater(loaded_theater)
@@ -0,0 +1,360 @@
+import unittest
+import asyncio
+import sys
+import os
+import tempfile
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_theater_service
+from app.routers import build_api_router
+from app.services.theater import CommandJournal, PricingPolicy, SharedSQLiteStore, TheaterService
+from app.services.theater.domain_imports import DynamicPricer
+from app.services.theater.events import RESYNC_EVENT
+from app.services.theater.stats import TheaterStats
+from app.services.theater import saver as saver_module
+
+
+class TestTheaterService(unittest.TestCase):
+    """Тесты сервиса веб-интерфейса: журнал, хранилище, события"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_service(self, **kwargs) -> TheaterService:
+        service = TheaterService(**kwargs)
+        service.add_director("Dir", 50, 100000.0)
+        service.add_setting("Play", 2.0, "2025-06-01T19:00:00", "Dir")
+        service.add_hall("Hall 1", 2, 2, 3, "h1")
+        service.add_hall("Hall 2", 2, 2, 3, "h2")
+        return service
+
+    def test_restart_after_compaction_keeps_both_halls(self):
+        """Сжатие журнала сохраняет билеты и продажи всех залов постановки"""
+        journal = CommandJournal(self.temp_dir, compact_every=1000, fsync=False)
+        service = self.make_service(journal=journal)
+        first = service.bind_setting_to_hall("Play", "h1", 100.0).payload
+        self.assertTrue(service.sell_ticket(first[0].ticket_id).ok)
+        service.bind_setting_to_hall("Play", "h2", 100.0)
+        journal.compact(service.theater)
+        journal.close()
+
+        restored = TheaterService(journal=CommandJournal(self.temp_dir, fsync=False))
+        ticket_manager = restored.theater.ticket_manager
+        self.assertEqual([p.hall_id for p in ticket_manager.partitions_for_setting("Play")], ["h1", "h2"])
+        self.assertEqual(ticket_manager.get_partition("Play", "h1").sold_count, 1)
+        self.assertTrue(ticket_manager.get_ticket(first[0].ticket_id).is_sold)
+        self.assertEqual(restored.stats.sold_count, 1)
+        self.assertFalse(restored.sell_ticket(first[0].ticket_id).ok)
+        self.assertTrue(restored.sell_ticket(first[1].ticket_id).ok)
+
+    def assert_stats_match_rescan(self, service):
+        rescan = TheaterStats.from_theater(service.theater)
+        stats = service.stats
+        self.assertEqual((stats.sold_count, stats.available_count, stats.total_count),
+                         (rescan.sold_count, rescan.available_count, rescan.total_count))
+        self.assertAlmostEqual(stats.revenue, rescan.revenue)
+
+    def test_stats_match_full_rescan(self):
+        """Счётчики продаж, обновляемые по ходу команд, совпадают с полным пересчётом"""
+        service = self.make_service(pricing=PricingPolicy())
+        first = service.bind_setting_to_hall("Play", "h1", 100.0).payload
+        second = service.bind_setting_to_hall("Play", "h2", 70.0).payload
+        self.assert_stats_match_rescan(service)
+        self.assertEqual(service.stats.total_count, 24)
+
+        self.assertTrue(service.sell_ticket(first[0].ticket_id).ok)
+        self.assert_stats_match_rescan(service)
+        self.assertTrue(service.sell_tickets([first[5].ticket_id, second[3].ticket_id, second[11].ticket_id]).ok)
+        self.assert_stats_match_rescan(service)
+        self.assertFalse(service.sell_tickets([second[4].ticket_id, first[0].ticket_id]).ok)
+        self.assert_stats_match_rescan(service)
+        hold = service.hold_tickets([second[7].ticket_id]).payload
+        self.assertTrue(service.confirm_hold(hold.hold_id).ok)
+        self.assert_stats_match_rescan(service)
+        self.assertEqual(service.stats.sold_count, 5)
+
+        path = os.path.join(self.temp_dir, "state.tsnap")
+        service.save_state(path)
+        service.saver.wait()
+        self.assertTrue(service.sell_ticket(first[1].ticket_id).ok)
+        self.assertTrue(service.load_state(path).ok)
+        self.assert_stats_match_rescan(service)
+        self.assertEqual(service.stats.sold_count, 5)
+
+    def test_sale_after_load_reaches_subscribers(self):
+        """После загрузки состояния подписчики получают resync, а затем продажи с новыми версиями"""
+        service = self.make_service()
+        tickets = service.bind_setting_to_hall("Play", "h1", 100.0).payload
+        path = os.path.join(self.temp_dir, "state.tsnap")
+        service.save_state(path)
+        service.saver.wait()
+        for i in range(3):
+            service.sell_ticket(tickets[i].ticket_id)
+
+        async def scenario():
+            subscription = service.events.subscribe(("Play", "h1"))
+            self.assertTrue(service.load_state(path).ok)
+            self.assertEqual(await asyncio.wait_for(subscription.get(), 1), RESYNC_EVENT)
+            self.assertEqual(service.seat_status_view(0, "h1")["version"], 0)
+            self.assertTrue(service.sell_ticket(tickets[5].ticket_id).ok)
+            return await asyncio.wait_for(subscription.get(), 1)
+
+        event = asyncio.run(scenario())
+        self.assertEqual((event["type"], event["version"], event["state"]), ("seat", 1, "sold"))
+
+    def test_quote_after_loading_another_state(self):
+        """Кэш динамических цен не переживает загрузку состояния с теми же версиями разделов"""
+        service = self.make_service(pricing=PricingPolicy())
+        service.bind_setting_to_hall("Play", "h1", 100.0)
+        other = self.make_service()
+        other.bind_setting_to_hall("Play", "h1", 300.0)
+        path = os.path.join(self.temp_dir, "other.tsnap")
+        other.save_state(path)
+        other.saver.wait()
+
+        def quote():
+            ticket_manager = service.theater.ticket_manager
+            partition = ticket_manager.get_partition("Play", "h1")
+            ticket = partition.ticket_at(0, 0, 0)
+            hall = service.theater.resource_manager.hall_manager.get_hall_by_id("h1")
+            args = (ticket, service.settings[0], hall, partition)
+            return ticket, service.pricer.quote(*args), DynamicPricer(service.pricer.policy).quote(*args)
+
+        ticket, cached, fresh = quote()
+        self.assertEqual(cached, fresh)
+        self.assertTrue(service.load_state(path).ok)
+        ticket, cached, fresh = quote()
+        self.assertEqual(cached, fresh)
+        self.assertGreaterEqual(cached, 150.0)
+        self.assertEqual(service.sell_ticket(ticket.ticket_id).payload.price, fresh)
+
+    def test_holds_shared_between_workers(self):
+        """Бронь, созданная одним процессом, соблюдается при продаже через другой"""
+        db_path = os.path.join(self.temp_dir, "theater.db")
+        worker_a = self.make_service(store=SharedSQLiteStore(db_path))
+        tickets = worker_a.bind_setting_to_hall("Play", "h1", 100.0).payload
+        worker_b = TheaterService(store=SharedSQLiteStore(db_path))
+        held, other = tickets[0].ticket_id, tickets[1].ticket_id
+
+        hold = worker_a.hold_tickets([held, other]).payload
+        self.assertFalse(worker_b.sell_ticket(held).ok)
+        self.assertFalse(worker_b.sell_tickets([held]).ok)
+        self.assertFalse(worker_b.hold_tickets([other]).ok)
+        self.assertEqual(worker_a.store.repository.mark_sold([held]), 0)
+
+        self.assertTrue(worker_b.confirm_hold(hold.hold_id).ok)
+        worker_a.sync()
+        self.assertTrue(worker_a.theater.ticket_manager.get_ticket(held).is_sold)
+        self.assertIsNone(worker_a.theater.ticket_manager.holds.get(hold.hold_id))
+
+        second = worker_b.hold_tickets([tickets[2].ticket_id]).payload
+        self.assertNotEqual(second.hold_id, hold.hold_id)
+        self.assertTrue(worker_a.release_hold(second.hold_id).ok)
+        self.assertTrue(worker_b.sell_ticket(tickets[2].ticket_id).ok)
+
+        third = worker_a.hold_tickets([tickets[3].ticket_id]).payload
+        restarted = TheaterService(store=SharedSQLiteStore(db_path))
+        self.assertIsNotNone(restarted.theater.ticket_manager.holds.get(third.hold_id))
+        self.assertFalse(restarted.sell_ticket(tickets[3].ticket_id).ok)
+
+    def test_workers_race_on_the_same_seat(self):
+        """Из двух процессов, продающих одно место, успешен ровно один; конфликт хранилища — не ошибка"""
+        db_path = os.path.join(self.temp_dir, "theater.db")
+        worker_a = self.make_service(store=SharedSQLiteStore(db_path))
+        tickets = worker_a.bind_setting_to_hall("Play", "h1", 100.0).payload
+        worker_b = TheaterService(store=SharedSQLiteStore(db_path))
+        seat = tickets[0].ticket_id
+        barrier = threading.Barrier(2)
+        results = {}
+
+        def sell(name, worker):
+            barrier.wait()
+            results[name] = worker.sell_ticket(seat)
+
+        threads = [threading.Thread(target=sell, args=item) for item in (("a", worker_a), ("b", worker_b))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(result.ok for result in results.values()), [False, True])
+        self.assertEqual(worker_a.store.repository.mark_sold([seat]), 0)
+
+        # Продажа в обход журнала изменений: локальная проверка проходит, а хранилище отказывает
+        other = tickets[1].ticket_id
+        self.assertEqual(worker_a.store.repository.mark_sold([other]), 1)
+        result = worker_b.sell_ticket(other)
+        self.assertFalse(result.ok)
+        worker_b.sync()
+        self.assertTrue(worker_b.theater.ticket_manager.get_ticket(other).is_sold)
+        self.assertEqual(worker_b.stats.sold_count, 2)
+
+
+class TestTheaterEndpoints(unittest.TestCase):
+    """Тесты HTTP-эндпоинтов на сервисе в памяти"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        # Шаблоны страниц ищутся относительно каталога backend
+        self.cwd = os.getcwd()
+        os.chdir(BACKEND_DIR)
+        self.service = TheaterService()
+        self.service.add_director("Dir", 50, 100000.0)
+        self.service.add_setting("Play", 2.0, "2025-06-01T19:00:00", "Dir")
+        self.service.add_setting("Other", 2.0, "2025-06-02T19:00:00", "Dir")
+        self.service.add_hall("Hall 1", 2, 2, 3, "h1")
+        self.service.add_hall("Hall 2", 1, 2, 2, "h2")
+        app = FastAPI()
+        app.include_router(build_api_router())
+        app.dependency_overrides[get_theater_service] = lambda: self.service
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def test_ticket_pages_with_filters(self):
+        """Постраничный обход с каждым фильтром отдаёт все подходящие билеты и их собственные итоги"""
+        service = self.service
+        play_h1 = service.bind_setting_to_hall("Play", "h1", 100.0).payload
+        play_h2 = service.bind_setting_to_hall("Play", "h2", 60.0).payload
+        # Обычные (не виртуальные) билеты в том же обходе, что и блоки
+        service.theater.bind_setting_to_hall("Other", "h2", 40.0)
+        service.state_replaced()
+        other = service.theater.ticket_manager.get_partition("Other", "h2").own_tickets
+        for ticket_id in (play_h1[1].ticket_id, play_h1[7].ticket_id, play_h2[0].ticket_id, other[2].ticket_id):
+            self.assertTrue(service.sell_ticket(ticket_id).ok)
+        everything = [ticket for partition in service.theater.ticket_manager.partitions
+                      for ticket in partition.iter_from(0)]
+
+        for params in ({}, {"setting": "Play"}, {"hall_id": "h2"}, {"sold": "true"}, {"sold": "false"},
+                       {"setting": "Play", "hall_id": "h2", "sold": "false"}, {"setting": "Other", "sold": "true"}):
+            with self.subTest(**params):
+                expected = [t for t in everything
+                            if t.setting.name == params.get("setting", t.setting.name)
+                            and t.hall_id == params.get("hall_id", t.hall_id)
+                            and ("sold" not in params or t.is_sold == (params["sold"] == "true"))]
+                seen, cursor, pages = [], 0, 0
+                while cursor is not None:
+                    body = self.client.get("/info/tickets", params={**params, "cursor": cursor, "limit": 4}).json()
+                    self.assertLessEqual(len(body["tickets"]), 4)
+                    seen += [ticket["ticket_id"] for ticket in body["tickets"]]
+                    cursor = body["next_cursor"]
+                    pages += 1
+                self.assertEqual(seen, [t.ticket_id for t in expected])
+                self.assertEqual(pages, max(1, -(-len(expected) // 4)))
+                sold = [t for t in expected if t.is_sold]
+                self.assertEqual((body["total"], body["sold"], body["available"]),
+                                 (len(expected), len(sold), len(expected) - len(sold)))
+                self.assertAlmostEqual(body["revenue"], sum(t.price for t in sold))
+
+    def test_hall_page_etag(self):
+        """Страница зала: 304 без изменений, новый ETag и свежая схема после продажи и после загрузки"""
+        service = self.service
+        tickets = service.bind_setting_to_hall("Play", "h1", 100.0).payload
+        url = "/tickets/setting/0?hall_id=h1"
+
+        def page(etag=None):
+            return self.client.get(url, headers={"If-None-Match": etag} if etag else {})
+
+        def sold_seats(response):
+            # Кнопки мест плюс одна в легенде
+            return response.text.count('class="seat seat-sold"') - 1
+
+        first = page()
+        self.assertEqual(first.status_code, 200)
+        initial = first.headers["ETag"]
+        self.assertEqual(sold_seats(first), 0)
+        self.assertEqual(page(initial).status_code, 304)
+        self.assertEqual(page(f'"other", {initial.removeprefix("W/")}').status_code, 304)
+
+        service.sell_ticket(tickets[0].ticket_id)
+        after_sale = page(initial)
+        self.assertEqual(after_sale.status_code, 200)
+        self.assertNotEqual(after_sale.headers["ETag"], initial)
+        self.assertEqual(sold_seats(after_sale), 1)
+        self.assertEqual(page(after_sale.headers["ETag"]).status_code, 304)
+
+        # Загруженный раздел снова начинает с версии 0, но ни ETag, ни кэш схемы версии 0 не переиспользуются
+        path = os.path.join(self.temp_dir, "state.tsnap")
+        service.save_state(path)
+        service.saver.wait()
+        self.assertTrue(service.load_state(path).ok)
+        after_load = page(initial)
+        self.assertEqual(after_load.status_code, 200)
+        self.assertNotIn(after_load.headers["ETag"], (initial, after_sale.headers["ETag"]))
+        self.assertEqual(sold_seats(after_load), 1)
+    def gated_writes(self) -> threading.Event:
+        """Фоновая запись снимка ждёт, пока тест не откроет возвращённое событие."""
+        gate = threading.Event()
+        write_snapshot = saver_module.write_snapshot
+
+        def write(data, path):
+            self.assertTrue(gate.wait(5))
+            return write_snapshot(data, path)
+
+        patcher = patch.object(saver_module, "write_snapshot", write)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(gate.set)
+        return gate
+
+    def test_save_status_lifecycle(self):
+        """Статус фонового сохранения: выполняется, затем завершено с размером файла"""
+        self.service.bind_setting_to_hall("Play", "h1", 100.0)
+        gate = self.gated_writes()
+        path = os.path.join(self.temp_dir, "state.tsnap")
+        self.assertTrue(self.service.save_state(path).ok)
+        status = self.client.get("/state/save/status").json()
+        self.assertEqual((status["in_progress"]["state"], status["in_progress"]["path"]), ("running", path))
+        self.assertIsNone(status["last_completed"])
+
+        gate.set()
+        self.service.saver.wait()
+        status = self.client.get("/state/save/status").json()
+        self.assertIsNone(status["in_progress"])
+        last = status["last_completed"]
+        self.assertEqual((last["state"], last["bytes"], last["error"]), ("done", os.path.getsize(path), None))
+        self.assertIsNotNone(last["duration_ms"])
+
+    def test_save_status_failure(self):
+        """Ошибка записи не теряется: статус failed с текстом ошибки"""
+        path = os.path.join(self.temp_dir, "missing", "state.tsnap")
+        self.assertTrue(self.service.save_state(path).ok)
+        self.service.saver.wait()
+        last = self.client.get("/state/save/status").json()["last_completed"]
+        self.assertEqual(last["state"], "failed")
+        self.assertTrue(last["error"])
+        self.assertFalse(os.path.exists(path))
+
+    def test_read_state_waits_for_pending_save(self):
+        """Чтение состояния ждёт сохранения в тот же файл, а не читает недописанный файл"""
+        tickets = self.service.bind_setting_to_hall("Play", "h1", 100.0).payload
+        self.service.sell_ticket(tickets[0].ticket_id)
+        gate = self.gated_writes()
+        path = os.path.join(self.temp_dir, "state.tsnap")
+        self.service.save_state(path)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            read = pool.submit(self.service.read_state, path)
+            with self.assertRaises(TimeoutError):
+                read.result(0.2)
+            gate.set()
+            result = read.result(5)
+        self.assertTrue(result.ok, result.message)
+        loaded = result.payload.ticket_manager.get_partition("Play", "h1")
+        self.assertEqual(loaded.sold_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,8 @@ import sys
 import os
 import tempfile
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from unittest.mock import MagicMock
 
@@ -75,6 +77,36 @@ class TestModels(unittest.TestCase):
         d = hall.to_dict()
         restored = AuditoryHall.from_dict(d)
         self.assertEqual(restored.capacity, 450)
+        self.assertFalse(restored.is_seat_available(0, 0, 0))
+        self.assertEqual(restored.audience_count, 1)
+
+    def test_seat_map_views(self):
+        """Битовая карта мест и совместимое представление hall.seats"""
+        hall = AuditoryHall("Hall", 2, 3, 5, "h1")
+        hall.occupy_seat(1, 2, 4)
+        with self.assertRaises(InvalidSeatException):
+            hall.occupy_seat(1, 2, 4)
+
+        self.assertEqual(len(hall.seats), 2)
+        self.assertEqual(len(hall.seats[0]), 3)
+        self.assertEqual(len(hall.seats[0][0]), 5)
+        self.assertTrue(hall.seats[1][2][4].is_occupied)
+        self.assertTrue(hall.seats[-1][-1][-1].is_occupied)
+        self.assertEqual(hall.seats[1][2][4].to_dict()["is_occupied"], True)
+
+        hall.seats[0][1][2].is_occupied = True
+        self.assertEqual(hall.audience_count, 2)
+        occupied = sum(1 for sector in hall.seats for row in sector for seat in row if seat.is_occupied)
+        self.assertEqual(occupied, 2)
+
+        # Старый формат с явным списком мест по-прежнему читается
+        legacy = {
+            "name": "Old", "sectors": 1, "rows_per_sector": 1, "seats_per_row": 2, "hall_id": "old",
+            "seats": [[[Seat(0).to_dict(), {"seat_number": 1, "is_occupied": True}]]],
+        }
+        old_hall = AuditoryHall.from_dict(legacy)
+        self.assertTrue(old_hall.is_seat_available(0, 0, 0))
+        self.assertFalse(old_hall.is_seat_available(0, 0, 1))
 
     def test_ticket_and_sell(self):
         """Тест билетов и продажи"""
@@ -116,6 +148,40 @@ class TestManagers(unittest.TestCase):
         hall = AuditoryHall("Hall1", 2, 5, 10, "h1")
         hm.add_hall(hall)
         self.assertEqual(hm.get_hall_by_id("h1").name, "Hall1")
+        with self.assertRaises(TheaterException):
+            hm.get_hall_by_id("missing")
+
+    def test_ticket_manager_index(self):
+        """Индекс билетов по ID в TicketManager"""
+        Ticket._counter = 0
+        setting = Setting(2.0, "Play", datetime.now(), Director("Dir", 50, 100000.0))
+        tm = TicketManager()
+        tm.add_tickets(setting.bind_to_hall(AuditoryHall("Hall", 1, 2, 3, "h1")))
+
+        ticket = tm.tickets[4]
+        self.assertIs(tm.get_ticket(ticket.ticket_id), ticket)
+        self.assertIsNone(tm.get_ticket("nonexistent"))
+        self.assertTrue(tm.sell_ticket(ticket.ticket_id, HallManager()))
+        self.assertTrue(ticket.is_sold)
+
+    def test_ticket_partitions(self):
+        """Разделы билетов по (постановка, зал) и их счётчики"""
+        Ticket._counter = 0
+        setting = Setting(2.0, "Play", datetime.now(), Director("Dir", 50, 100000.0))
+        tm = TicketManager()
+        tm.add_tickets(setting.bind_to_hall(AuditoryHall("Hall", 2, 1, 2, "h1"), base_price=100.0))
+
+        partition = tm.get_partition("Play", "h1")
+        self.assertEqual(partition.total_count, 4)
+        self.assertEqual(partition.min_available_price, 80.0)
+        self.assertEqual([p.hall_id for p in tm.partitions_for_setting("Play")], ["h1"])
+        self.assertEqual(tm.partitions_for_setting("Other"), [])
+
+        for ticket in partition.tickets[2:]:
+            tm.sell_ticket(ticket.ticket_id, HallManager())
+        self.assertEqual(partition.sold_count, 2)
+        self.assertEqual(partition.available_count, 2)
+        self.assertEqual(partition.min_available_price, 100.0)
 
     def test_resource_manager(self):
         """Тест ResourceManager"""
@@ -133,6 +199,32 @@ class TestManagers(unittest.TestCase):
         self.assertEqual(len(restored.stages), 1)
 
 
+    def test_name_registries(self):
+        """Поиск по имени в менеджерах: типизированные списки, первый при совпадении имён"""
+        sm = StaffManager()
+        actor = Actor("Anna", 30, 50000.0)
+        director = Director("Dir", 50, 100000.0)
+        for member in (actor, director, Actor("Anna", 40, 1.0)):
+            sm.add_staff(member)
+        self.assertEqual(len(sm.actors), 2)
+        self.assertEqual(sm.directors, [director])
+        self.assertIs(sm.get_actor("Anna"), actor)
+        self.assertIs(sm.get_director("Dir"), director)
+        self.assertIsNone(sm.get_actor("Dir"))
+
+        pm = PerformanceManager()
+        setting = Setting(2.0, "Play", datetime(2025, 6, 1), director)
+        pm.add_setting(setting)
+        first = Repetition(1.0, "Репетиция: Play", datetime(2025, 5, 1), setting)
+        pm.add_repetition(first)
+        pm.add_repetition(Repetition(1.0, "Репетиция: Play", datetime(2025, 5, 2), setting))
+        self.assertIs(pm.get_setting("Play"), setting)
+        self.assertIs(pm.get_repetition("Репетиция: Play"), first)
+        self.assertIsNone(pm.get_setting("Other"))
+
+        restored = ResourceManager.from_dict({"costumes": [Costume("Dress", "M", "Red").to_dict()]})
+        self.assertEqual(restored.get_costume("Dress").color, "Red")
+
 class TestTheater(unittest.TestCase):
     """Тесты Theater"""
 
@@ -175,6 +267,154 @@ class TestTheater(unittest.TestCase):
         self.assertTrue(result)
         self.assertTrue(first_ticket.is_sold)
 
+    def test_bind_with_first_id(self):
+        """Привязка с заданным first_id выдаёт те же ID при повторе (обычные и виртуальные билеты)"""
+        director = Director("Director", 50, 100000.0)
+        self.theater.add_staff(director)
+        self.theater.add_hall(AuditoryHall("Hall", 2, 3, 4, "h1"))
+        self.theater.add_hall(AuditoryHall("Lazy", 2, 3, 4, "h2"))
+        self.theater.add_setting(Setting(2.0, "Play", datetime(2025, 6, 1), director))
+        self.theater.add_setting(Setting(2.0, "Opera", datetime(2025, 6, 2), director))
+
+        tickets = self.theater.bind_setting_to_hall("Play", "h1", first_id=101)
+        self.assertEqual([t.ticket_id for t in tickets[:2]], ["101", "102"])
+        block = self.theater.bind_setting_to_hall("Opera", "h2", lazy=True, first_id=501)
+        self.assertEqual(block[0].ticket_id, "501")
+        self.assertIs(self.theater.ticket_manager.get_ticket("524").setting, block.setting)
+        # Следующие ID не пересекаются с занятыми диапазонами
+        self.assertEqual(Ticket._next_id(), "525")
+
+    def test_lazy_bind_and_sell(self):
+        """Виртуальные билеты: вывод по требованию и хранение только проданных"""
+        director = Director("Dir", 50, 100000.0)
+        self.theater.add_staff(director)
+        self.theater.add_hall(AuditoryHall("Hall", 2, 5, 10, "h1"))
+        self.theater.add_setting(Setting(2.0, "Play", datetime.now(), director))
+
+        block = self.theater.bind_setting_to_hall("Play", "h1", base_price=100.0, lazy=True)
+        self.assertEqual(len(block), 100)
+        self.assertEqual(block.stored_tickets, [])
+        self.assertEqual(self.theater.ticket_manager.ticket_count, 100)
+        self.assertEqual([t.ticket_id for t in block][:2], ["1", "2"])
+        self.assertEqual(block.ticket_at(1, 0, 0).price, 80.0)
+
+        ticket = self.theater.ticket_manager.get_ticket("57")
+        self.assertEqual((ticket.sector, ticket.row, ticket.seat), (1, 0, 6))
+        self.assertIsNone(self.theater.ticket_manager.get_ticket("101"))
+
+        stale = block[56]
+        self.assertTrue(self.theater.sell_ticket("57"))
+        self.assertEqual(len(block.stored_tickets), 1)
+        self.assertTrue(self.theater.ticket_manager.get_ticket("57").is_sold)
+        with self.assertRaises(TheaterException):
+            stale.sell_ticket()
+
+        partition = self.theater.ticket_manager.get_partition("Play", "h1")
+        self.assertEqual((partition.sold_count, partition.available_count), (1, 99))
+        self.assertEqual([t.ticket_id for t in partition.iter_from(98)], ["99", "100"])
+        self.assertEqual([(i, t.ticket_id) for i, t in partition.iter_matching(0, sold=True)], [(56, "57")])
+        unsold = [(i, t.ticket_id) for i, t in partition.iter_matching(55, sold=False)]
+        self.assertEqual(unsold[:3], [(55, "56"), (57, "58"), (58, "59")])
+        self.assertEqual(len(unsold), 44)
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(temp_dir, "theater.json")
+            self.theater.save_to_file(filepath)
+            restored = Theater("Restored")
+            restored.load_from_file(filepath)
+            restored_partition = restored.ticket_manager.get_partition("Play", "h1")
+            self.assertEqual((restored_partition.sold_count, restored_partition.total_count), (1, 100))
+            self.assertTrue(restored.ticket_manager.get_ticket("57").is_sold)
+            hall = restored.resource_manager.hall_manager.get_hall_by_id("h1")
+            self.assertFalse(hall.is_seat_available(1, 0, 6))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_hold_confirm_and_expire(self):
+        """Удержание мест с TTL, подтверждение и истечение"""
+        director = Director("Dir", 50, 100000.0)
+        self.theater.add_staff(director)
+        self.theater.add_hall(AuditoryHall("Hall", 1, 2, 5, "h1"))
+        self.theater.add_setting(Setting(2.0, "Play", datetime.now(), director))
+        block = self.theater.bind_setting_to_hall("Play", "h1", lazy=True)
+        holds = self.theater.ticket_manager.holds
+        now = [0.0]
+        holds._clock = lambda: now[0]
+
+        hold = self.theater.hold_tickets(["1", "2"], ttl=60)
+        self.assertEqual(self.theater.ticket_manager.get_ticket("1").held_by, hold.hold_id)
+        with self.assertRaises(TheaterException):
+            self.theater.sell_ticket("1")
+        with self.assertRaises(TheaterException):
+            self.theater.hold_tickets(["2", "3"], ttl=60)
+        self.assertIsNone(self.theater.ticket_manager.get_ticket("3").held_by)
+
+        self.theater.confirm_hold(hold.hold_id)
+        self.assertTrue(all(t.is_sold and t.held_by is None for t in hold.tickets))
+        with self.assertRaises(TheaterException):
+            self.theater.confirm_hold(hold.hold_id)
+
+        expiring = self.theater.hold_tickets(["5"], ttl=30)
+        self.assertEqual(len(block.stored_tickets), 3)
+        now[0] = 31.0
+        self.assertEqual(holds.expire_due(), 1)
+        self.assertIsNone(holds.get(expiring.hold_id))
+        self.assertEqual(len(block.stored_tickets), 2)
+        self.assertTrue(self.theater.sell_ticket("5"))
+
+    def test_batch_sale_rolls_back(self):
+        """Пакетная покупка: всё или ничего"""
+        director = Director("Dir", 50, 100000.0)
+        self.theater.add_staff(director)
+        hall = AuditoryHall("Hall", 1, 2, 5, "h1")
+        self.theater.add_hall(hall)
+        self.theater.add_setting(Setting(2.0, "Play", datetime.now(), director))
+        block = self.theater.bind_setting_to_hall("Play", "h1", lazy=True)
+        self.theater.sell_ticket("4")
+        hold = self.theater.hold_tickets(["2"], ttl=60)
+
+        for ids in (["1", "3", "4"], ["1", "missing"], ["1", "1"], ["1", "2"]):
+            with self.assertRaises(TheaterException):
+                self.theater.sell_tickets(ids)
+        self.assertEqual(hall.audience_count, 1)
+        self.assertEqual(self.theater.ticket_manager.get_ticket("2").held_by, hold.hold_id)
+        self.assertEqual(len(block.stored_tickets), 2)
+
+        sold = self.theater.sell_tickets(["1", "3"])
+        self.assertEqual([t.ticket_id for t in sold], ["1", "3"])
+        self.assertEqual(hall.audience_count, 3)
+        self.assertEqual(self.theater.ticket_manager.get_partition("Play", "h1").sold_count, 3)
+
+    def test_find_best_seats(self):
+        """Поиск лучших соседних мест по индексу свободных отрезков"""
+        director = Director("Dir", 50, 100000.0)
+        self.theater.add_staff(director)
+        self.theater.add_hall(AuditoryHall("Hall", 2, 2, 7, "h1"))
+        self.theater.add_setting(Setting(2.0, "Play", datetime.now(), director))
+        self.theater.bind_setting_to_hall("Play", "h1", base_price=100.0)
+
+        def coords(tickets):
+            return [(t.sector, t.row, t.seat) for t in tickets]
+
+        self.assertEqual(coords(self.theater.find_best_seats("Play", "h1", 3)), [(0, 0, 2), (0, 0, 3), (0, 0, 4)])
+
+        # Продажа центрального места первого ряда сдвигает лучший блок во второй ряд
+        center = self.theater.ticket_manager.get_partition("Play", "h1").ticket_at(0, 0, 3)
+        self.theater.sell_ticket(center.ticket_id)
+        self.assertEqual(coords(self.theater.find_best_seats("Play", "h1", 3)), [(0, 1, 2), (0, 1, 3), (0, 1, 4)])
+        self.assertEqual(coords(self.theater.find_best_seats("Play", "h1", 2)), [(0, 1, 2), (0, 1, 3)])
+
+        hold = self.theater.hold_tickets([t.ticket_id for t in self.theater.find_best_seats("Play", "h1", 7)], ttl=60)
+        self.assertEqual(coords(self.theater.find_best_seats("Play", "h1", 7)), [(1, 0, s) for s in range(7)])
+        self.theater.release_hold(hold.hold_id)
+        self.assertEqual(self.theater.find_best_seats("Play", "h1", 7)[0].sector, 0)
+
+        self.assertEqual(self.theater.find_best_seats("Play", "h1", 3, max_price=80.0)[0].sector, 1)
+        self.assertEqual(self.theater.find_best_seats("Play", "h1", 3, max_price=10.0), [])
+        self.assertEqual(self.theater.find_best_seats("Play", "h1", 8), [])
+        self.assertEqual(self.theater.find_best_seats("Other", "h1", 1), [])
+
     def test_save_load_theater(self):
         """Сохранение и загрузка театра"""
         director = Director("Director", 50, 100000.0)
@@ -203,9 +443,374 @@ class TestTheater(unittest.TestCase):
 
             loaded_hall = new_theater.resource_manager.hall_manager.get_hall_by_id("main_001")
             self.assertFalse(loaded_hall.is_seat_available(0, 0, 0))
+
+            second_id = new_theater.ticket_manager.tickets[1].ticket_id
+            self.assertIsNotNone(new_theater.ticket_manager.get_ticket(second_id))
+            self.assertTrue(new_theater.sell_ticket(second_id))
+            self.assertFalse(loaded_hall.is_seat_available(0, 0, 1))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_snapshot_preserves_identity(self):
+        """Нормализованный снимок: каждая сущность один раз, общие объекты восстанавливаются"""
+        director = Director("Director", 50, 100000.0)
+        actor = Actor("Actor", 30, 50000.0, "Hamlet")
+        self.theater.add_staff(director)
+        self.theater.add_staff(actor)
+        self.theater.add_hall(AuditoryHall("Hall", 2, 3, 4, "h1"))
+        setting = Setting(2.0, "Play", datetime(2025, 6, 1), director)
+        director.direct_setting(setting)
+        setting.add_cast(actor)
+        self.theater.add_setting(setting)
+        self.theater.assign_costume_to_actor(self.theater.create_costume("Robe", "M", "Red"), actor)
+        rep = Repetition(1.0, "Rehearsal", datetime(2025, 5, 1), setting)
+        rep.check_list(actor)
+        self.theater.add_repetition(rep)
+        self.theater.bind_setting_to_hall("Play", "h1")
+        self.theater.sell_ticket(self.theater.ticket_manager.tickets[5].ticket_id)
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(temp_dir, "theater.json")
+            self.theater.save_to_file(filepath)
+            with open(filepath, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["__type__"], "theater_snapshot")
+
+            restored = Theater("Restored")
+            restored.load_from_file(filepath)
+            r_director, r_actor = restored.staff_manager.staff
+            r_setting = restored.performance_manager.settings[0]
+            r_rep = restored.performance_manager.repetitions[0]
+            self.assertIs(r_setting.director, r_director)
+            self.assertIs(r_setting.cast[0], r_actor)
+            self.assertIs(r_director.directed_settings[0], r_setting)
+            self.assertIs(r_rep.setting, r_setting)
+            self.assertIs(r_rep.attendance_list[0], r_actor)
+            self.assertIs(r_actor.assigned_costumes["Robe"], restored.resource_manager.costumes[0])
+            self.assertEqual(restored.ticket_manager.ticket_count, 24)
+            self.assertTrue(restored.ticket_manager.tickets[5].is_sold)
+            hall = restored.resource_manager.hall_manager.get_hall_by_id("h1")
+            self.assertEqual(hall.audience_count, 1)
+
+            # Файлы старого вложенного формата по-прежнему загружаются
+            # (вложенный формат не умеет циклы режиссёр <-> постановка)
+            director.directed_settings = []
+            with open(filepath, "w", encoding="utf-8") as f:
+                json.dump(self.theater.to_dict(), f)
+            legacy = Theater("Legacy")
+            legacy.load_from_file(filepath)
+            self.assertEqual(legacy.ticket_manager.ticket_count, 24)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_binary_snapshot_round_trip(self):
+        """Бинарный снимок загружается так же, как JSON: обычные и виртуальные билеты"""
+        director = Director("Director", 50, 100000.0)
+        self.theater.add_staff(director)
+        self.theater.add_hall(AuditoryHall("Hall", 2, 3, 4, "h1"))
+        self.theater.add_hall(AuditoryHall("Lazy", 2, 3, 4, "h2"))
+        self.theater.add_setting(Setting(2.0, "Play", datetime(2025, 6, 1), director))
+        self.theater.add_setting(Setting(2.0, "Opera", datetime(2025, 6, 2), director))
+        self.theater.bind_setting_to_hall("Play", "h1")
+        block = self.theater.bind_setting_to_hall("Opera", "h2", lazy=True)
+        eager_id = self.theater.ticket_manager.partitions_for_setting("Play")[0].tickets[7].ticket_id
+        self.theater.sell_tickets([eager_id, block[3].ticket_id])
+        self.theater.ticket_manager.get_ticket(block[3].ticket_id).price = 77.0
+
+        from snapshot import dump_snapshot, write_snapshot
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(temp_dir, "theater.tsnap")
+            self.theater.save_to_file(filepath)
+            with open(filepath, "rb") as f:
+                self.assertEqual(f.read(8), b"THSNAPB1")
+            # Снимок, построенный строками для JSON, бинарный формат тоже принимает
+            rows_path = os.path.join(temp_dir, "rows.tsnap")
+            write_snapshot(dump_snapshot(self.theater), rows_path, "binary")
+
+            for path in (filepath, rows_path):
+                restored = Theater("Restored")
+                restored.load_from_file(path)
+                tm = restored.ticket_manager
+                self.assertEqual(tm.ticket_count, 48)
+                self.assertTrue(tm.get_ticket(eager_id).is_sold)
+                self.assertTrue(tm.get_ticket(block[3].ticket_id).is_sold)
+                self.assertEqual(tm.get_ticket(block[3].ticket_id).price, 77.0)
+                self.assertFalse(tm.get_ticket(block[4].ticket_id).is_sold)
+                hall_manager = restored.resource_manager.hall_manager
+                self.assertEqual(hall_manager.get_hall_by_id("h1").audience_count, 1)
+                self.assertEqual(hall_manager.get_hall_by_id("h2").audience_count, 1)
+                with self.assertRaises(TheaterException):
+                    restored.sell_ticket(block[3].ticket_id)
         finally:
             shutil.rmtree(temp_dir)
 
+    def test_sqlite_repository_round_trip(self):
+        """SQLite-репозиторий: продажа — обновление строки, загрузка восстанавливает занятость"""
+        from repository import SQLiteTheaterRepository
+
+        director = Director("Director", 50, 100000.0)
+        self.theater.add_staff(director)
+        self.theater.add_hall(AuditoryHall("Hall", 2, 3, 4, "h1"))
+        self.theater.add_hall(AuditoryHall("Lazy", 2, 3, 4, "h2"))
+        self.theater.add_setting(Setting(2.0, "Play", datetime(2025, 6, 1), director))
+        self.theater.add_setting(Setting(2.0, "Opera", datetime(2025, 6, 2), director))
+        eager = self.theater.bind_setting_to_hall("Play", "h1")
+        block = self.theater.bind_setting_to_hall("Opera", "h2", lazy=True)
+
+        temp_dir = tempfile.mkdtemp()
+        repository = SQLiteTheaterRepository(os.path.join(temp_dir, "theater.db"))
+        try:
+            self.assertTrue(repository.is_empty())
+            repository.save(self.theater)
+            sold = [eager[2].ticket_id, block[5].ticket_id]
+            self.theater.sell_tickets(sold)
+            self.assertEqual(repository.mark_sold(sold), 2)
+            self.assertEqual(repository.mark_sold(sold), 0)
+
+            restored = Theater("Restored")
+            restored.load_from_repository(repository)
+            tm = restored.ticket_manager
+            self.assertEqual(tm.ticket_count, 48)
+            self.assertTrue(tm.get_ticket(eager[2].ticket_id).is_sold)
+            self.assertTrue(tm.get_ticket(block[5].ticket_id).is_sold)
+            # У блока в памяти только проданный билет
+            self.assertEqual(len(tm.get_partition("Opera", "h2").blocks[0].stored_tickets), 1)
+            for hall_id in ("h1", "h2"):
+                self.assertEqual(restored.resource_manager.hall_manager.get_hall_by_id(hall_id).audience_count, 1)
+        finally:
+            repository.close()
+            shutil.rmtree(temp_dir)
+
+    def test_sqlite_repository_change_log(self):
+        """Журнал изменений SQLite: версии по порядку, откат транзакции, обрезка старых записей"""
+        from repository import SQLiteTheaterRepository
+
+        temp_dir = tempfile.mkdtemp()
+        repository = SQLiteTheaterRepository(os.path.join(temp_dir, "theater.db"))
+        try:
+            self.assertEqual(repository.current_version(), 0)
+            self.assertEqual(repository.changes_since(0), [])
+            for i in range(3):
+                repository.append_change("sell_ticket", {"ticket_id": str(i)})
+            with self.assertRaises(RuntimeError):
+                with repository.transaction():
+                    repository.append_change("sell_ticket", {"ticket_id": "lost"})
+                    raise RuntimeError("откат")
+            self.assertEqual(repository.current_version(), 3)
+            self.assertEqual(repository.changes_since(1),
+                             [(2, "sell_ticket", {"ticket_id": "1"}), (3, "sell_ticket", {"ticket_id": "2"})])
+
+            repository.trim_changes(keep=1)
+            self.assertIsNone(repository.changes_since(1))
+            self.assertEqual(repository.changes_since(2), [(3, "sell_ticket", {"ticket_id": "2"})])
+            self.assertIsNone(repository.changes_since(5))
+        finally:
+            repository.close()
+            shutil.rmtree(temp_dir)
+
+    def test_seat_status_versions_and_deltas(self):
+        """Версия раздела растёт при продаже и удержании, дельта содержит только изменённые места"""
+        director = Director("Director", 50, 100000.0)
+        self.theater.add_staff(director)
+        hall = AuditoryHall("Hall", 2, 3, 4, "h1")
+        self.theater.add_hall(hall)
+        self.theater.add_setting(Setting(2.0, "Play", datetime(2025, 6, 1), director))
+        block = self.theater.bind_setting_to_hall("Play", "h1", lazy=True)
+        partition = self.theater.ticket_manager.get_partition("Play", "h1")
+
+        self.theater.sell_ticket(block[0].ticket_id)
+        status = partition.seat_status(hall)
+        self.assertEqual(status.version, 1)
+        self.assertTrue(status.sold.is_occupied(0, 0, 0))
+        self.assertIsNone(status.changes_since(0))
+        self.assertEqual(status.changes_since(1), [])
+
+        hold = self.theater.hold_tickets([block[5].ticket_id], ttl=60)
+        self.theater.sell_ticket(block[6].ticket_id)
+        self.assertEqual(status.changes_since(1), [(5, "held"), (6, "sold")])
+        self.theater.confirm_hold(hold.hold_id)
+        self.assertEqual(partition.version, 4)
+        self.assertEqual(status.changes_since(1), [(5, "sold"), (6, "sold")])
+        self.assertFalse(status.held.is_occupied(0, 1, 1))
+
+    def test_seat_listeners(self):
+        """Подписчики получают каждое изменение места с уже обновлёнными агрегатами и переживают загрузку"""
+        director = Director("Director", 50, 100000.0)
+        self.theater.add_staff(director)
+        self.theater.add_hall(AuditoryHall("Hall", 1, 2, 2, "h1"))
+        self.theater.add_setting(Setting(2.0, "Play", datetime(2025, 6, 1), director))
+        tickets = self.theater.bind_setting_to_hall("Play", "h1")
+        events = []
+        self.theater.ticket_manager.seat_listeners.append(
+            lambda partition, ticket: events.append((partition.version, ticket.ticket_id, partition.available_count)))
+
+        self.theater.sell_ticket(tickets[0].ticket_id)
+        self.theater.hold_tickets([tickets[1].ticket_id], ttl=60)
+        self.assertEqual(events, [(1, tickets[0].ticket_id, 3), (2, tickets[1].ticket_id, 3)])
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(temp_dir, "theater.json")
+            self.theater.save_to_file(filepath)
+            self.theater.load_from_file(filepath)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.theater.sell_ticket(tickets[2].ticket_id)
+        self.assertEqual(events[-1][1:], (tickets[2].ticket_id, 2))
+
+    def test_dynamic_pricing(self):
+        """Цена растёт с заполненностью сектора и к показу; расчёт кэшируется по версии зала"""
+        from pricing import DynamicPricer, PricingPolicy
+
+        director = Director("Director", 50, 100000.0)
+        self.theater.add_staff(director)
+        hall = AuditoryHall("Hall", 2, 2, 2, "h1")
+        self.theater.add_hall(hall)
+        self.theater.add_setting(Setting(2.0, "Play", datetime(2025, 6, 30), director))
+        tickets = self.theater.bind_setting_to_hall("Play", "h1", 100.0)
+        setting = self.theater.performance_manager.get_setting("Play")
+        partition = self.theater.ticket_manager.get_partition("Play", "h1")
+        pricer = DynamicPricer(PricingPolicy(row_premium=0.0))
+        now = datetime(2025, 6, 15)
+
+        prices = pricer.hall_prices(setting, hall, partition, now)
+        self.assertEqual(prices.shape, (2, 2, 2))
+        self.assertEqual(prices[0, 0, 0], 100.0)
+        self.assertEqual(prices[1, 0, 0], 80.0)
+        self.assertIs(pricer.hall_prices(setting, hall, partition, now), prices)
+
+        self.theater.sell_ticket(tickets[0].ticket_id)
+        self.theater.sell_ticket(tickets[1].ticket_id)
+        prices = pricer.hall_prices(setting, hall, partition, now)
+        self.assertAlmostEqual(prices[0, 1, 1], 100.0 * (1 + 0.8 * 0.5 ** 2))
+        self.assertEqual(prices[1, 1, 1], 80.0)
+        self.assertEqual(pricer.min_free_price(setting, hall, partition, now), 80.0)
+        self.assertEqual(pricer.quote(tickets[3], setting, hall, partition, now), 120.0)
+
+        self.assertLess(pricer.hall_prices(setting, hall, partition, datetime(2025, 5, 1))[1, 1, 1], 80.0)
+        self.assertGreater(pricer.hall_prices(setting, hall, partition, datetime(2025, 6, 29))[1, 1, 1], 80.0)
+
+    def test_ticket_analytics(self):
+        """Разрезы выручки и заполненности по обычным и виртуальным билетам, кэш по версии"""
+        from analytics import TicketAnalytics
+
+        director = Director("Director", 50, 100000.0)
+        self.theater.add_staff(director)
+        self.theater.add_hall(AuditoryHall("Hall", 2, 2, 2, "h1"))
+        self.theater.add_hall(AuditoryHall("Small", 1, 1, 2, "h2"))
+        self.theater.add_setting(Setting(2.0, "Play", datetime(2025, 6, 1, 19), director))
+        self.theater.add_setting(Setting(2.0, "Other", datetime(2025, 6, 2, 19), director))
+        tickets = self.theater.bind_setting_to_hall("Play", "h1", 100.0)
+        virtual = self.theater.bind_setting_to_hall("Other", "h2", 40.0, lazy=True)
+        self.theater.sell_tickets([tickets[0].ticket_id, tickets[7].ticket_id, virtual[1].ticket_id])
+        self.theater.hold_tickets([tickets[1].ticket_id], ttl=60)
+
+        analytics = TicketAnalytics()
+        columns = analytics.columns(self.theater)
+        self.assertEqual(columns.summary(), {"total": 10, "sold": 3, "held": 1, "available": 6,
+                                             "revenue": 220.0, "occupancy": 0.3, "average_price": 73.33})
+        by_date = columns.group(("date",))
+        self.assertEqual([(g["key"]["date"], g["sold"], g["revenue"]) for g in by_date],
+                         [("2025-06-01", 2, 180.0), ("2025-06-02", 1, 40.0)])
+        rows = columns.group(("hall", "sector", "row"))
+        self.assertEqual(rows[0]["key"], {"hall": "h1", "sector": 1, "row": 1})
+        self.assertEqual((rows[0]["sold"], rows[0]["held"]), (1, 1))
+        self.assertEqual([g["key"]["price_band"] for g in columns.group(("price_band",), 50)],
+                         ["0–50", "50–100", "100–150"])
+        with self.assertRaises(ValueError):
+            columns.group(("seat",))
+
+        self.assertIs(analytics.columns(self.theater), columns)
+        self.theater.sell_ticket(tickets[2].ticket_id)
+        self.assertEqual(analytics.columns(self.theater).summary()["sold"], 4)
+        self.assertEqual(analytics.columns(self.theater, hall_id="h2").summary()["revenue"], 40.0)
+        self.theater.ticket_manager.set_sold_price(virtual[1], 55.0)
+        self.assertEqual(analytics.columns(self.theater, hall_id="h2").summary()["revenue"], 55.0)
+
+    def test_sell_ticket_saved_concurrently(self):
+        """Продажа виртуального билета, сохранённого другим потоком, передаёт подписчикам сохранённый билет"""
+        director = Director("Director", 50, 100000.0)
+        self.theater.add_staff(director)
+        self.theater.add_hall(AuditoryHall("Hall", 1, 2, 2, "h1"))
+        self.theater.add_setting(Setting(2.0, "Play", datetime(2025, 6, 1), director))
+        ticket_id = self.theater.bind_setting_to_hall("Play", "h1", lazy=True)[0].ticket_id
+        tm = self.theater.ticket_manager
+        events = []
+        tm.seat_listeners.append(lambda partition, ticket: events.append((ticket.ticket_id, ticket.is_sold)))
+
+        # Поток берёт виртуальный билет до блокировки зала, а бронь сохраняет его экземпляр раньше продажи
+        fetched = threading.Event()
+        get_ticket = tm.get_ticket
+
+        def get_and_signal(tid):
+            ticket = get_ticket(tid)
+            fetched.set()
+            return ticket
+
+        hall = self.theater.resource_manager.hall_manager.get_hall_by_id("h1")
+        status = tm.get_partition("Play", "h1").seat_status(hall)
+        tm.get_ticket = get_and_signal
+        lock = tm.locks.lock_for("h1")
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            lock.acquire()
+            sale = pool.submit(tm.sell_ticket, ticket_id, self.theater.resource_manager.hall_manager, "hold")
+            self.assertTrue(fetched.wait(5))
+            del tm.get_ticket
+            tm.holds.hold([ticket_id], ttl=60, hold_id="hold")
+            lock.release()
+            self.assertTrue(sale.result(5))
+        self.assertEqual(events[-1], (ticket_id, True))
+        self.assertTrue(status.sold.is_occupied(0, 0, 0))
+
+    def test_schedule_conflicts_and_planning(self):
+        """Пересечения по залу и актёрам, переиндексация после загрузки и подбор репетиций"""
+        from scheduling import IntervalTree, plan_rehearsals
+
+        tree = IntervalTree()
+        keys = [tree.insert(start, start + 2, start) for start in (0, 5, 3, 9)]
+        self.assertEqual([item for _, _, item in tree.overlapping(4, 6)], [3, 5])
+        self.assertIsNone(tree.first_overlap(7, 9))
+        tree.remove(keys[1])
+        self.assertEqual([item for _, _, item in tree], [0, 3, 9])
+
+        director = Director("Director", 50, 100000.0)
+        actor = Actor("Actor", 30, 50000.0, "Hamlet")
+        self.theater.add_staff(director)
+        self.theater.add_staff(actor)
+        self.theater.add_hall(AuditoryHall("Hall", 1, 1, 2, "h1"))
+        play = Setting(3.0, "Play", datetime(2025, 6, 10, 19), director)
+        other = Setting(2.0, "Other", datetime(2025, 6, 10, 20), Director("Guest", 40, 1.0))
+        self.assertEqual(self.theater.add_setting(play), [])
+        self.assertEqual(self.theater.add_setting(other), [])
+        self.theater.add_actor_to_setting(actor, play)
+        conflicts = self.theater.add_actor_to_setting(actor, other)
+        self.assertEqual([(c.resource, c.other.name) for c in conflicts], [(("staff", "Actor"), "Play")])
+        self.theater.bind_setting_to_hall("Play", "h1")
+        rehearsal = Repetition(2.0, "Репетиция: Play", datetime(2025, 6, 1, 11), play)
+        self.assertEqual(self.theater.add_repetition(rehearsal), [])
+        clash = Repetition(2.0, "Репетиция: Other", datetime(2025, 6, 1, 12), other)
+        self.assertEqual({c.resource for c in self.theater.add_repetition(clash)}, {("staff", "Actor")})
+        self.assertEqual(len(self.theater.scheduler.conflicts()), 2)
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(temp_dir, "theater.json")
+            self.theater.save_to_file(filepath)
+            self.theater.load_from_file(filepath)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(len(self.theater.scheduler.conflicts()), 2)
+
+        plan = plan_rehearsals(self.theater.scheduler, self.theater.performance_manager.settings,
+                               count=2, hours=2.0, not_before=datetime(2025, 6, 1, 9))
+        slots = [(setting.name, start) for setting, start, _ in plan.slots]
+        # Утро занято репетициями, а актёр свободен только с 14:00
+        self.assertEqual(slots, [("Play", datetime(2025, 6, 1, 14)), ("Play", datetime(2025, 6, 1, 16)),
+                                 ("Other", datetime(2025, 6, 1, 18)), ("Other", datetime(2025, 6, 1, 20))])
+        self.assertEqual(plan.unscheduled, {})
+        self.assertEqual(len(self.theater.scheduler.conflicts()), 2)
+
     def test_exceptions(self):
         """Тест исключений"""
         hall = AuditoryHall("Test", 1, 1, 1, "t1")
@@ -217,6 +822,49 @@ class TestTheater(unittest.TestCase):
             tm.sell_ticket("nonexistent", HallManager())
 
 
+class TestConcurrentSales(unittest.TestCase):
+    """Нагрузочный тест: параллельные покупки одних и тех же мест"""
+
+    def setUp(self):
+        Ticket._counter = 0
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self._switch_interval)
+
+    def _fire_purchases(self, lazy: bool):
+        theater = Theater("Load")
+        director = Director("Dir", 50, 100000.0)
+        theater.add_staff(director)
+        hall = AuditoryHall("Hall", 2, 10, 25, "h1")
+        theater.add_hall(hall)
+        theater.add_setting(Setting(2.0, "Play", datetime.now(), director))
+        tickets = theater.bind_setting_to_hall("Play", "h1", lazy=lazy)
+        ids = [ticket.ticket_id for ticket in tickets] * 8
+
+        def purchase(ticket_id):
+            try:
+                return theater.sell_ticket(ticket_id)
+            except TheaterException:
+                return False
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            results = list(pool.map(purchase, ids))
+
+        partition = theater.ticket_manager.get_partition("Play", "h1")
+        self.assertEqual(sum(results), hall.capacity)
+        self.assertEqual(hall.audience_count, hall.capacity)
+        self.assertEqual(partition.sold_count, hall.capacity)
+        self.assertEqual(partition.available_count, 0)
+
+    def test_no_double_sales(self):
+        self._fire_purchases(lazy=False)
+
+    def test_no_double_sales_lazy(self):
+        self._fire_purchases(lazy=True)
+
+
 if __name__ == '__main__':
     unittest.main()
 